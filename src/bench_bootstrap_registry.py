@@ -0,0 +1,109 @@
+"""
+Benchmark bootstrap server REG/UNREG handling as the registry grows.
+Compares the indexed BootstrapRegistry with the original list of dicts that
+was scanned on every REG and UNREG.
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import time
+
+from bootstrap_server import BootstrapServer
+from protocol import MessageFormatter
+
+
+class LegacyBootstrapServer(BootstrapServer):
+    """The original registry: a list scanned linearly under the lock."""
+
+    def __init__(self, port=5000):
+        super().__init__(port)
+        self.nodes = []
+
+    def handle_reg(self, parts):
+        ip, port, username = parts[2], int(parts[3]), parts[4]
+        with self.lock:
+            for node in self.nodes:
+                if node['port'] == port and node['username'] == username:
+                    if node['ip'] == ip:
+                        return self.format_response("REGOK 9998")
+            neighbors = []
+            if self.nodes:
+                candidates = [n for n in self.nodes if not (n['ip'] == ip and n['port'] == port)]
+                if len(candidates) > 2:
+                    neighbors = random.sample(candidates, 2)
+                else:
+                    neighbors = candidates
+            self.nodes.append({'ip': ip, 'port': port, 'username': username})
+            print(f"[BOOTSTRAP] Registered: {username} at {ip}:{port}")
+            response = f"REGOK {len(neighbors)}"
+            for neighbor in neighbors:
+                response += f" {neighbor['ip']} {neighbor['port']}"
+            return self.format_response(response)
+
+    def handle_unreg(self, parts):
+        ip, port, username = parts[2], int(parts[3]), parts[4]
+        with self.lock:
+            for i, node in enumerate(self.nodes):
+                if node['ip'] == ip and node['port'] == port and node['username'] == username:
+                    del self.nodes[i]
+                    print(f"[BOOTSTRAP] Unregistered: {username}")
+                    return self.format_response("UNROK 0")
+            return self.format_response("UNROK 9999")
+
+
+def address(i):
+    """A distinct synthetic node for every i."""
+    return f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 5000 + i % 50000, f"node{i}"
+
+
+def measure(server_class, registered, operations):
+    """
+    Fill a server with `registered` nodes, then time REG + UNREG pairs.
+
+    Returns:
+        float: Microseconds per REG + UNREG pair at that registry size
+    """
+    server = server_class()
+    # Filled directly: going through REG would take O(N^2) on the legacy list
+    for i in range(registered):
+        ip, port, username = address(i)
+        if isinstance(server.nodes, list):
+            server.nodes.append({'ip': ip, 'port': port, 'username': username})
+        else:
+            server.nodes.add(ip, port, username)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        churn = [address(registered + i) for i in range(operations)]
+        regs = [MessageFormatter.create_reg_message(*node) for node in churn]
+        unregs = [MessageFormatter.create_unreg_message(*node) for node in churn]
+        start = time.perf_counter()
+        for reg, unreg in zip(regs, unregs):
+            server.process_message(reg)
+            server.process_message(unreg)
+        elapsed = time.perf_counter() - start
+    assert len(server.nodes) == registered
+    return elapsed / operations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bootstrap registry scaling benchmark')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Registry sizes to test')
+    parser.add_argument('--operations', type=int, default=2000,
+                        help='REG + UNREG pairs timed per size (legacy runs fewer at large sizes)')
+    args = parser.parse_args()
+
+    print("\n=== Bootstrap REG + UNREG Cost vs Registry Size ===")
+    print(f"{'Nodes':>8}{'Legacy list (us)':>19}{'Indexed (us)':>15}{'Speedup':>10}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        # Keep the legacy run to roughly the same number of scanned entries
+        legacy_ops = max(20, min(args.operations, args.operations * 1000 // size))
+        legacy = measure(LegacyBootstrapServer, size, legacy_ops)
+        indexed = measure(BootstrapServer, size, args.operations)
+        print(f"{size:>8}{legacy:>19.1f}{indexed:>15.1f}{legacy / indexed:>9.1f}x")
+    print("===================================================\n")
+
+
+if __name__ == '__main__':
+    main()
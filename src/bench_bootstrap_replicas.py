@@ -0,0 +1,71 @@
+"""
+Benchmark replicated bootstrap servers.
+Starts 1, 2 and 4 asyncio bootstrap servers on localhost, each replicating to
+the others, spreads a registration burst over them, and reports registration
+throughput and how long the replicas take to agree on every node.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from bootstrap_load_generator import register_burst, spawn_server
+from bootstrap_server_async import request
+from protocol import MessageFormatter
+
+
+async def convergence_time(endpoints, nodes, sample, timeout=30.0):
+    """
+    Seconds until every server knows a sample of the registered nodes, probed
+    with RENEW (RENEWOK 0 means the server has the node).
+    """
+    probes = random.sample(nodes, min(sample, len(nodes)))
+    pending = [(endpoint, node) for endpoint in endpoints for node, _ in probes]
+    start = time.perf_counter()
+    while pending and time.perf_counter() - start < timeout:
+        replies = await asyncio.gather(*(
+            request(*endpoint, MessageFormatter.create_renew_message(*node), 5.0)
+            for endpoint, node in pending), return_exceptions=True)
+        pending = [probe for probe, reply in zip(pending, replies) if reply != ['RENEWOK', '0']]
+        if pending:
+            await asyncio.sleep(0.05)
+    return time.perf_counter() - start if not pending else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replicated bootstrap server throughput')
+    parser.add_argument('--servers', default='1,2,4', help='Replica counts to test')
+    parser.add_argument('--nodes', type=int, default=4000, help='Registrations per burst')
+    parser.add_argument('--concurrency', type=int, default=500, help='Registrations in flight')
+    parser.add_argument('--first-port', type=int, default=56300, help='Port of the first server')
+    parser.add_argument('--sample', type=int, default=200, help='Nodes probed on every replica for convergence')
+    args = parser.parse_args()
+
+    print(f"\n=== Replicated Bootstrap ({args.nodes} registrations, {args.concurrency} concurrent) ===")
+    print(f"{'Servers':>8}{'OK':>7}{'Regs/sec':>11}{'p50 (ms)':>10}{'p99 (ms)':>10}{'Converged':>12}")
+    for count in (int(c) for c in args.servers.split(',')):
+        endpoints = [('127.0.0.1', args.first_port + i) for i in range(count)]
+        processes = []
+        try:
+            for endpoint in endpoints:
+                peers = ','.join(f"{ip}:{port}" for ip, port in endpoints if (ip, port) != endpoint)
+                processes.append(spawn_server('async', endpoint[1], 1024,
+                                              ['--peers', peers] if peers else []))
+            result = asyncio.run(register_burst(None, None, args.nodes, args.concurrency, 5.0,
+                                                unregister=False, endpoints=endpoints))
+            converged = asyncio.run(convergence_time(endpoints, result['nodes'], args.sample))
+            p50, p99 = np.percentile(result['latencies'], [50, 99])
+            print(f"{count:>8}{result['registered']:>7}{result['regs_per_sec']:>11.0f}{p50:>10.1f}{p99:>10.1f}"
+                  f"{(f'{converged:.2f}s' if converged is not None else 'NO'):>12}")
+        finally:
+            for process in processes:
+                process.kill()
+                process.wait()
+    print("=" * 58 + "\n")
+
+
+if __name__ == '__main__':
+    main()
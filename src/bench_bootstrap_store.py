@@ -0,0 +1,97 @@
+"""
+Benchmark the durable bootstrap registry.
+Measures the cost a write-ahead log adds to each REG/UNREG and how long a
+restarted server takes to reload registries of increasing size.
+"""
+
+import argparse
+import contextlib
+import os
+import shutil
+import tempfile
+import time
+
+from bench_bootstrap_registry import address
+from bootstrap_server import BootstrapServer
+from protocol import MessageFormatter
+
+
+def write_overhead(state_dir, sync, operations):
+    """
+    Microseconds per REG + UNREG pair through process_message.
+
+    Args:
+        state_dir (str): Where to keep state, or None for an in-memory server
+        sync (bool): fsync every record
+        operations (int): Pairs to time
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        server = BootstrapServer(port=0, state_dir=state_dir, sync=sync)
+        churn = [address(i) for i in range(operations)]
+        regs = [MessageFormatter.create_reg_message(*node) for node in churn]
+        unregs = [MessageFormatter.create_unreg_message(*node) for node in churn]
+        start = time.perf_counter()
+        for reg, unreg in zip(regs, unregs):
+            server.process_message(reg)
+            server.process_message(unreg)
+        elapsed = time.perf_counter() - start
+        if server.store:
+            server.store.close()
+    return elapsed / operations * 1e6
+
+
+def recovery_time(state_dir, nodes, wal_records):
+    """
+    Milliseconds to restart a server holding `nodes` registrations, with
+    `wal_records` of them still only in the log.
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        server = BootstrapServer(port=0, state_dir=state_dir)
+        for i in range(nodes - wal_records):
+            server.nodes.add(*address(i))
+        server.store.snapshot()
+        for i in range(nodes - wal_records, nodes):
+            ip, port, username = address(i)
+            server.nodes.add(ip, port, username)
+            server.store.log_reg(ip, port, username)
+        server.store.close()
+
+        start = time.perf_counter()
+        restarted = BootstrapServer(port=0, state_dir=state_dir)
+        elapsed = time.perf_counter() - start
+        restarted.store.close()
+    assert len(restarted.nodes) == nodes
+    return elapsed * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bootstrap registry persistence benchmark')
+    parser.add_argument('--operations', type=int, default=5000, help='REG + UNREG pairs timed')
+    parser.add_argument('--sizes', default='1000,10000,100000', help='Registry sizes to recover')
+    parser.add_argument('--wal-records', type=int, default=5000,
+                        help='Registrations left in the log (not yet in a snapshot) at restart')
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix='bs_state_')
+    try:
+        print("\n=== Bootstrap Registry Persistence ===")
+        print("REG + UNREG pair:")
+        baseline = write_overhead(None, False, args.operations)
+        print(f"  in memory:          {baseline:8.1f} us")
+        for label, sync in (('write-ahead log:', False), ('log + fsync:', True)):
+            state_dir = tempfile.mkdtemp(dir=root)
+            cost = write_overhead(state_dir, sync, args.operations if not sync else args.operations // 10)
+            print(f"  {label:<19} {cost:8.1f} us  (+{cost - baseline:.1f} us)")
+
+        print(f"Restart (snapshot + {args.wal_records} log records):")
+        for size in (int(s) for s in args.sizes.split(',')):
+            state_dir = tempfile.mkdtemp(dir=root)
+            elapsed = recovery_time(state_dir, size, min(args.wal_records, size))
+            print(f"  {size:>7} nodes:      {elapsed:8.1f} ms")
+        print("======================================\n")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark first-byte latency of cold downloads served by FileManager.
+Compares lazy generation on the request path against background preparation.
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from file_manager import FileManager
+
+
+def first_byte_latency(fm, filename):
+    """Time from request until the first chunk of a file is available (ms)."""
+    start = time.perf_counter()
+    # Same calls the /download route makes before streaming the body
+    fm.get_file_hash(filename)
+    fm.get_file_size(filename)
+    next(iter(fm.iter_file_chunks(filename)))
+    return (time.perf_counter() - start) * 1000
+
+
+def legacy_first_byte_latency(size):
+    """First-byte latency of the old os.urandom + in-request SHA-256 path (ms)."""
+    start = time.perf_counter()
+    content = os.urandom(size)
+    hashlib.sha256(content).hexdigest()
+    _ = content[:64 * 1024]
+    return (time.perf_counter() - start) * 1000
+
+
+def summarize(label, values):
+    values = sorted(values)
+    avg = sum(values) / len(values)
+    p50 = values[len(values) // 2]
+    print(f"{label:<28} avg={avg:8.2f} ms  p50={p50:8.2f} ms  max={values[-1]:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold download first-byte latency benchmark')
+    parser.add_argument('--files', default='file_names.txt', help='Path to file names list')
+    parser.add_argument('--count', type=int, default=10, help='Number of files to request')
+    args = parser.parse_args()
+
+    with open(args.files, 'r') as f:
+        filenames = [line.strip() for line in f if line.strip()][:args.count]
+
+    work_dir = tempfile.mkdtemp(prefix='fm_bench_')
+    try:
+        # Lazy: first requester pays for generation and hashing
+        lazy = FileManager(os.path.join(work_dir, 'lazy'), 'bench')
+        lazy_times = [first_byte_latency(lazy, name) for name in filenames]
+        sizes = [lazy.get_file_size(name) for name in filenames]
+
+        # Prepared: generation runs in the background at startup
+        prepared = FileManager(os.path.join(work_dir, 'prepared'), 'bench')
+        start = time.perf_counter()
+        prepared.prepare_files(filenames)
+        prepared.wait_until_prepared()
+        prepare_time = time.perf_counter() - start
+        prepared_times = [first_byte_latency(prepared, name) for name in filenames]
+
+        legacy_times = [legacy_first_byte_latency(size) for size in sizes]
+
+        print("\n=== Cold Download First-Byte Latency ===")
+        print(f"Files: {len(filenames)}, Total size: {sum(sizes) / 1024 / 1024:.1f} MB")
+        summarize("Legacy (urandom in request)", legacy_times)
+        summarize("Lazy (seeded in request)", lazy_times)
+        summarize("Prepared at startup", prepared_times)
+        print(f"Background preparation took {prepare_time:.2f} s")
+        print("========================================\n")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
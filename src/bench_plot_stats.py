@@ -0,0 +1,152 @@
+"""
+Benchmark plot_stats log aggregation.
+Generates a synthetic multi-node log set and compares the original row-by-row
+csv.DictReader loop with the chunked, vectorized, parallel log_aggregator.
+"""
+
+import argparse
+import csv
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from log_aggregator import aggregate_logs
+from plot_stats import calculate_statistics
+
+
+FIELDS = ['timestamp', 'event_type', 'query', 'hops', 'latency_ms',
+          'sender_ip', 'sender_port', 'size_bytes', 'status']
+
+
+def generate_logs(log_dir, nodes, events, seed=1):
+    """Write `events` rows spread over `nodes` node logs plus their summaries."""
+    rng = np.random.default_rng(seed)
+    per_node = events // nodes
+    queries = np.array(['Harry Potter', 'Glee', 'Twilight', 'Lord of the Rings', 'Modern Family'])
+    kinds = np.array(['SEARCH_RESULT', 'DOWNLOAD_RESULT', 'FETCH_RESULT', 'FILE_HOSTED', 'REPLICA_ADDED'])
+
+    for n in range(nodes):
+        kind = kinds[rng.choice(5, per_node, p=[0.9, 0.04, 0.04, 0.01, 0.01])]
+        is_search = kind == 'SEARCH_RESULT'
+        is_transfer = np.isin(kind, ['DOWNLOAD_RESULT', 'FETCH_RESULT'])
+        frame = pd.DataFrame({
+            'timestamp': '2026-01-01T00:00:00.000000',
+            'event_type': kind,
+            'query': queries[rng.integers(0, len(queries), per_node)],
+            'hops': np.where(is_search, rng.integers(0, 8, per_node), 0),
+            'latency_ms': np.round(rng.lognormal(3, 1, per_node), 3),
+            'sender_ip': '127.0.0.1',
+            'sender_port': 5000 + n,
+            'size_bytes': np.where(is_transfer, rng.integers(2, 10, per_node) * 1048576, -1),
+            'status': np.where(is_transfer, 'PASSED', '')
+        })
+        frame['size_bytes'] = frame['size_bytes'].astype(object).where(is_transfer, '')
+        frame.to_csv(os.path.join(log_dir, f'node_127.0.0.1_{5000 + n}.csv'), index=False)
+
+        with open(os.path.join(log_dir, f'node_127.0.0.1_{5000 + n}_summary.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['metric', 'value'])
+            for metric, value in (('messages_sent', per_node), ('messages_received', per_node),
+                                  ('bytes_sent', per_node * 40), ('uploads_served', n % 7)):
+                writer.writerow([metric, value])
+
+
+def legacy_aggregate(log_dir):
+    """The original plot_stats loop: every node_*.csv (summaries included) row by row."""
+    latencies = []
+    hops_list = []
+    download_throughputs = []
+    fetch_times = []
+    replica_holders = {}
+
+    for log_file in glob.glob(os.path.join(log_dir, 'node_*.csv')):
+        with open(log_file, 'r') as f:
+            for row in csv.DictReader(f):
+                event_type = row.get('event_type')
+                if event_type == 'SEARCH_RESULT':
+                    try:
+                        latencies.append(float(row['latency_ms']))
+                        hops_list.append(int(row['hops']))
+                    except ValueError:
+                        continue
+                elif event_type == 'DOWNLOAD_RESULT':
+                    try:
+                        duration_s = float(row['latency_ms']) / 1000
+                        size_mb = float(row['size_bytes']) / (1024 * 1024)
+                        if duration_s > 0 and size_mb > 0:
+                            download_throughputs.append(size_mb / duration_s)
+                    except (ValueError, TypeError, KeyError):
+                        continue
+                elif event_type == 'FETCH_RESULT':
+                    if row.get('status') == 'PASSED':
+                        try:
+                            fetch_times.append(float(row['latency_ms']))
+                        except ValueError:
+                            continue
+                elif event_type in ('FILE_HOSTED', 'REPLICA_ADDED'):
+                    replica_holders.setdefault(row['query'], set()).add(log_file)
+
+    return {
+        'latencies': latencies,
+        'hops': hops_list,
+        'download_throughputs': download_throughputs,
+        'fetch_times': fetch_times,
+        'files': len(replica_holders)
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    for key in ('latencies', 'hops', 'download_throughputs', 'fetch_times'):
+        calculate_statistics(result[key])
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='plot_stats aggregation benchmark')
+    parser.add_argument('--nodes', type=int, default=100, help='Node logs to generate')
+    parser.add_argument('--events', type=int, default=10000000, help='Total events over all nodes')
+    parser.add_argument('--workers', type=int, default=None, help='Aggregator processes (default: one per CPU)')
+    parser.add_argument('--data-dir', help='Reuse (or create) the synthetic logs here instead of a temp dir')
+    args = parser.parse_args()
+
+    log_dir = args.data_dir or tempfile.mkdtemp(prefix='plot_bench_')
+    try:
+        if not glob.glob(os.path.join(log_dir, 'node_*.csv')):
+            os.makedirs(log_dir, exist_ok=True)
+            start = time.perf_counter()
+            generate_logs(log_dir, args.nodes, args.events)
+            print(f"Generated {args.events} events in {args.nodes} node logs "
+                  f"({time.perf_counter() - start:.1f}s)")
+
+        legacy, legacy_time = timed(legacy_aggregate, log_dir)
+        vectorized, vector_time = timed(aggregate_logs, log_dir, args.workers)
+
+        same = (len(legacy['latencies']) == len(vectorized['latencies']) and
+                np.isclose(np.mean(legacy['latencies']), np.mean(vectorized['latencies'])) and
+                np.isclose(np.mean(legacy['hops']), np.mean(vectorized['hops'])) and
+                len(legacy['download_throughputs']) == len(vectorized['download_throughputs']) and
+                len(legacy['fetch_times']) == len(vectorized['fetch_times']) and
+                legacy['files'] == len(vectorized['replica_holders']))
+
+        rows = len(legacy['latencies']) + len(legacy['download_throughputs']) + len(legacy['fetch_times'])
+        print("\n=== plot_stats Aggregation (parse + statistics) ===")
+        print(f"Node logs: {len(glob.glob(os.path.join(log_dir, 'node_*_summary.csv')))}, "
+              f"samples: {rows}, CPUs: {os.cpu_count()}")
+        print(f"Legacy csv.DictReader:   {legacy_time:8.2f}s")
+        print(f"Vectorized aggregator:   {vector_time:8.2f}s  ({legacy_time / vector_time:.1f}x, "
+              f"{'results match' if same else 'RESULTS DIFFER'})")
+        print("===================================================\n")
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(log_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
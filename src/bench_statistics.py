@@ -0,0 +1,174 @@
+"""
+Benchmark Statistics event logging and counter throughput.
+Compares the buffered background writer with the old open-write-close logger,
+and the striped counters with the old single-lock counters, both from a few
+long-lived threads and from a thread per datagram as the UDP listener runs them.
+"""
+
+import argparse
+import csv
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+from statistics import Statistics
+
+
+def legacy_log_event(log_file, event_type, query='', hops=0, latency_ms=0,
+                     sender_ip='', sender_port=''):
+    """The original logger: open, write one row and close per event."""
+    with open(log_file, 'a', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            datetime.now().isoformat(), event_type, query, hops,
+            latency_ms, sender_ip, sender_port
+        ])
+
+
+class LockedCounters:
+    """The original counters: every update takes one shared lock."""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages_sent = 0
+        self.bytes_sent = 0
+        self.command_traffic = {}
+    
+    def record_message_sent(self, command=None, size=0):
+        with self.lock:
+            self.messages_sent += 1
+            self.bytes_sent += size
+            if command:
+                traffic = self.command_traffic.setdefault(('sent', command), [0, 0])
+                traffic[0] += 1
+                traffic[1] += size
+
+
+def run_counter_threads(num_threads, updates_per_thread, record_fn):
+    """Call record_fn from several threads and return elapsed seconds."""
+    def worker():
+        for _ in range(updates_per_thread):
+            record_fn('SER', 48)
+    
+    threads = [threading.Thread(target=worker) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def run_counter_per_datagram(datagrams, record_fn, handling=0.002):
+    """
+    Handle each datagram on a new thread, as UDPTransport does: count it,
+    spend `handling` seconds on it (so many handlers are alive at once, as
+    under a flood) and count the reply.
+    """
+    def handler():
+        record_fn('SER', 48)
+        time.sleep(handling)
+        record_fn('SEROK', 60)
+    
+    threads = []
+    start = time.perf_counter()
+    for _ in range(datagrams):
+        t = threading.Thread(target=handler, daemon=True)
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def run_threads(num_threads, events_per_thread, log_fn):
+    """Call log_fn from several threads and return elapsed seconds."""
+    def worker():
+        for i in range(events_per_thread):
+            log_fn('SEARCH_RESULT', 'harry potter', i % 10, 12.5, '127.0.0.1', 5001)
+
+    threads = [threading.Thread(target=worker) for _ in range(num_threads)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def count_rows(path):
+    with open(path, 'r') as f:
+        return sum(1 for _ in f) - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Statistics.log_event throughput benchmark')
+    parser.add_argument('--threads', type=int, default=8, help='Logging threads')
+    parser.add_argument('--events', type=int, default=5000, help='Events per thread')
+    parser.add_argument('--updates', type=int, default=100000, help='Counter updates per thread')
+    parser.add_argument('--datagrams', type=int, default=20000,
+                        help='Counter updates with a thread each')
+    args = parser.parse_args()
+    total = args.threads * args.events
+
+    work_dir = tempfile.mkdtemp(prefix='stats_bench_')
+    try:
+        legacy = Statistics('legacy', log_dir=work_dir)
+        legacy.stop()
+        legacy_time = run_threads(
+            args.threads, args.events,
+            lambda *row: legacy_log_event(legacy.log_file, *row)
+        )
+
+        buffered = Statistics('buffered', log_dir=work_dir)
+        start = time.perf_counter()
+        enqueue_time = run_threads(args.threads, args.events, buffered.log_event)
+        buffered.stop()
+        buffered_time = time.perf_counter() - start
+
+        print("\n=== Statistics.log_event Throughput ===")
+        print(f"Threads: {args.threads}, Events: {total}")
+        print(f"Legacy (open/close per row): {total / legacy_time:12.0f} events/s "
+              f"({count_rows(legacy.log_file)} rows)")
+        print(f"Buffered (caller side):      {total / enqueue_time:12.0f} events/s")
+        print(f"Buffered (until on disk):    {total / buffered_time:12.0f} events/s "
+              f"({count_rows(buffered.log_file)} rows)")
+        print("=======================================\n")
+        
+        updates = args.threads * args.updates
+        locked = LockedCounters()
+        locked_time = run_counter_threads(args.threads, args.updates, locked.record_message_sent)
+        
+        sharded = Statistics('sharded', log_dir=work_dir)
+        sharded_time = run_counter_threads(args.threads, args.updates, sharded.record_message_sent)
+        result = sharded.get_stats()
+        sharded.stop()
+        exact = (result['messages_sent'] == updates and
+                 result['sent_SER_datagrams'] == updates and
+                 result['bytes_sent'] == 48 * updates)
+        
+        locked = LockedCounters()
+        locked_datagram_time = run_counter_per_datagram(args.datagrams, locked.record_message_sent)
+        
+        striped = Statistics('striped', log_dir=work_dir)
+        striped_datagram_time = run_counter_per_datagram(args.datagrams, striped.record_message_sent)
+        datagram_exact = striped.get_stats()['sent_SER_datagrams'] == args.datagrams
+        striped.stop()
+        
+        print("=== Statistics.record_message_sent Throughput ===")
+        print(f"Threads: {args.threads}, Updates: {updates}")
+        print(f"Single lock:      {updates / locked_time:12.0f} updates/s")
+        print(f"Striped counters: {updates / sharded_time:12.0f} updates/s "
+              f"({'exact' if exact else 'MISMATCH'})")
+        print(f"Thread per datagram: {args.datagrams} datagrams")
+        print(f"Single lock:      {locked_datagram_time:12.2f} s")
+        print(f"Striped counters: {striped_datagram_time:12.2f} s "
+              f"({'exact' if datagram_exact else 'MISMATCH'})")
+        print("=================================================\n")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Neighbor assignment policies for the bootstrap server.
+A policy picks the peers a registering node is told to JOIN.
+"""
+
+
+class RandomAssignment:
+    """Up to k registered nodes uniformly at random (the original behaviour)."""
+
+    name = 'random'
+
+    def pick(self, registry, k, now=None):
+        """
+        Args:
+            registry (BootstrapRegistry): Registered nodes
+            k (int): Peers wanted
+            now (float): Current time if leases are on (expired nodes are skipped)
+
+        Returns:
+            list: Registry entries
+        """
+        return registry.sample(k, now)
+
+
+class LowDegreeAssignment:
+    """
+    The k lowest-degree nodes out of a random sample of candidates
+    ("power of d choices").
+
+    Uniform picks hand early nodes a link for every later join, so they
+    become flood hotspots while late nodes sit at the edge. Preferring the
+    least-linked of a few random candidates keeps degrees within a narrow
+    band at O(candidates) per REG, without keeping the registry sorted by
+    degree. The hubs it avoids also shortcut paths, so the average search
+    costs slightly more hops (see bootstrap_assignment_sim.py).
+    """
+
+    name = 'low-degree'
+    CANDIDATES = 4  # Best 2 of 4: power of two choices per peer slot
+
+    def __init__(self, candidates=CANDIDATES):
+        """
+        Args:
+            candidates (int): Random nodes compared per REG; more gives flatter
+                degrees but fewer hubs to shortcut paths, so floods need more hops
+        """
+        self.candidates = candidates
+
+    def pick(self, registry, k, now=None):
+        pool = registry.sample(max(k, self.candidates), now)
+        # sample() returns a random order and sort() is stable, so ties are broken at random
+        pool.sort(key=lambda entry: len(entry['links']))
+        return pool[:k]
+
+
+ASSIGNMENT_POLICIES = {
+    RandomAssignment.name: RandomAssignment,
+    LowDegreeAssignment.name: LowDegreeAssignment
+}
@@ -0,0 +1,147 @@
+"""
+Neighbor assignment simulation.
+Grows an overlay through BootstrapServer's REG handling under each assignment
+policy, churns it, and compares the resulting degree distribution, diameter
+and the hop count a flooding search needs.
+"""
+
+import argparse
+import contextlib
+import os
+import random
+from collections import deque
+
+import numpy as np
+
+from bootstrap_assignment import ASSIGNMENT_POLICIES
+from bootstrap_server import BootstrapServer
+from protocol import MessageFormatter
+from search_engine import SearchEngine
+
+
+def bfs_hops(adjacency, source):
+    """Hop distance from source to every node it can reach."""
+    hops = {source: 0}
+    queue = deque([source])
+    while queue:
+        node = queue.popleft()
+        for neighbor in adjacency[node]:
+            if neighbor not in hops:
+                hops[neighbor] = hops[node] + 1
+                queue.append(neighbor)
+    return hops
+
+
+def simulate(policy, nodes=1000, churn=1000, sources=500, seed=1):
+    """
+    Build one overlay.
+
+    Every node JOINs the peers its REGOK names (JOINs always succeed here).
+    Churn replaces a random node with a new one `churn` times; a node left
+    without neighbours registers again, as Node does when it loses its lease.
+
+    Args:
+        policy (str): Key of ASSIGNMENT_POLICIES
+        nodes (int): Overlay size
+        churn (int): Departures (each followed by a join)
+        sources (int): BFS sources for diameter and hops (all nodes gives exact values)
+        seed (int): Random seed
+
+    Returns:
+        dict: degree_mean/p50/p99/max/std, diameter, avg_hops, reach (share of
+            pairs within SearchEngine.MAX_HOPS) and components
+    """
+    rng = random.Random(seed)
+    server = BootstrapServer(port=0, lease_seconds=None, assignment=ASSIGNMENT_POLICIES[policy](), rng=rng)
+    adjacency = {}  # (ip, port) -> set of neighbour addresses
+    next_id = [0]
+
+    def register(address, username):
+        reply = MessageFormatter.parse_message(server.process_message(
+            MessageFormatter.create_reg_message(*address, username)))
+        for k in range(2, len(reply) - 1, 2):
+            peer = (reply[k], int(reply[k + 1]))
+            adjacency[address].add(peer)
+            adjacency[peer].add(address)
+
+    def join():
+        i = next_id[0]
+        next_id[0] += 1
+        address = (f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 5000 + i % 50000)
+        adjacency[address] = set()
+        register(address, f"n{i}")
+
+    def leave(address):
+        username = server.nodes.get(*address)['username']
+        server.process_message(MessageFormatter.create_unreg_message(*address, username))
+        orphans = []
+        for neighbor in adjacency.pop(address):
+            adjacency[neighbor].discard(address)
+            if not adjacency[neighbor]:
+                orphans.append(neighbor)
+        for orphan in orphans:
+            username = server.nodes.get(*orphan)['username']
+            server.process_message(MessageFormatter.create_unreg_message(*orphan, username))
+            register(orphan, username)
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(nodes):
+            join()
+        for _ in range(churn):
+            leave(rng.choice(list(adjacency)))
+            join()
+
+    degrees = np.array([len(neighbors) for neighbors in adjacency.values()])
+    addresses = list(adjacency)
+    distances = []
+    diameter = 0
+    for source in rng.sample(addresses, min(sources, len(addresses))):
+        hops = bfs_hops(adjacency, source)
+        diameter = max(diameter, max(hops.values()))
+        distances.extend(hops.values())
+    distances = np.array(distances)
+    distances = distances[distances > 0]
+
+    components = 0
+    seen = set()
+    for address in addresses:
+        if address not in seen:
+            components += 1
+            seen.update(bfs_hops(adjacency, address))
+
+    return {
+        'degree_mean': float(degrees.mean()),
+        'degree_p50': float(np.percentile(degrees, 50)),
+        'degree_p99': float(np.percentile(degrees, 99)),
+        'degree_max': int(degrees.max()),
+        'degree_std': float(degrees.std()),
+        'diameter': diameter,
+        'avg_hops': float(distances.mean()),
+        'reach': float(np.mean(distances <= SearchEngine.MAX_HOPS)),
+        'components': components
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bootstrap neighbor assignment simulation')
+    parser.add_argument('--sizes', default='500,1000,2000', help='Overlay sizes to build')
+    parser.add_argument('--churn', type=float, default=1.0, help='Departures as a multiple of the size')
+    parser.add_argument('--sources', type=int, default=500,
+                        help='BFS sources per overlay (diameter is a lower bound below the size)')
+    parser.add_argument('--policies', default='random,low-degree', help='Policies to compare')
+    args = parser.parse_args()
+
+    print(f"\n=== Neighbor Assignment ({args.churn:.0%} churn, hops over {args.sources} sources) ===")
+    print(f"{'Nodes':>6} {'Policy':<11}{'Deg mean':>9}{'p50':>5}{'p99':>6}{'max':>5}{'std':>6}"
+          f"{'Diameter':>10}{'Avg hops':>10}{f'<={SearchEngine.MAX_HOPS} hops':>11}{'Parts':>7}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        for policy in args.policies.split(','):
+            r = simulate(policy, size, int(size * args.churn), args.sources)
+            print(f"{size:>6} {policy:<11}{r['degree_mean']:>9.2f}{r['degree_p50']:>5.0f}{r['degree_p99']:>6.0f}"
+                  f"{r['degree_max']:>5}{r['degree_std']:>6.2f}{r['diameter']:>10}{r['avg_hops']:>10.2f}"
+                  f"{r['reach']:>11.1%}{r['components']:>7}")
+    print("=" * 86 + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+Bootstrap churn simulation.
+Drives BootstrapServer's REG/UNREG/RENEW handling on a virtual clock while
+nodes join, leave and crash, and measures how often a joining node is handed
+dead peers for its two JOIN attempts, with and without registration leases.
+"""
+
+import argparse
+import contextlib
+import os
+import random
+
+import numpy as np
+
+from bootstrap_manager import BootstrapManager
+from bootstrap_server import BootstrapServer
+from protocol import MessageFormatter
+
+
+def simulate(lease_seconds, nodes=500, duration=1800, lifetime=600, crash_share=0.5,
+             renew_interval=BootstrapManager.RENEW_INTERVAL, warmup=120, seed=1):
+    """
+    Run one churn scenario.
+
+    Args:
+        lease_seconds (float): Server lease, or None for the old behaviour
+        nodes (int): Steady-state population
+        duration (int): Virtual seconds simulated
+        lifetime (float): Mean seconds a node stays before leaving or crashing
+        crash_share (float): Share of departures that are crashes (no UNREG)
+        renew_interval (int): Seconds between RENEWs from each live node
+        warmup (int): Seconds before joins are counted
+        seed (int): Random seed
+
+    Returns:
+        dict: joins, join_success (share with at least one live peer or an
+            empty network), isolated, dead_peer_share and stale_entries
+            (mean registry size minus live nodes)
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    now = [0.0]
+    server = BootstrapServer(port=0, lease_seconds=lease_seconds, clock=lambda: now[0])
+
+    live = {}  # (ip, port) -> (username, second it renews at modulo renew_interval)
+    next_id = [0]
+    joins = successes = isolated = peers_total = peers_dead = 0
+    stale = []
+
+    def join():
+        i = next_id[0]
+        next_id[0] += 1
+        address = (f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 5000 + i % 50000)
+        reply = MessageFormatter.parse_message(server.process_message(
+            MessageFormatter.create_reg_message(*address, f"n{i}")))
+        live[address] = (f"n{i}", int(now[0]) % renew_interval)
+        peers = [(reply[k], int(reply[k + 1])) for k in range(2, len(reply) - 1, 2)]
+        return peers
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(nodes):
+            join()
+
+        for second in range(1, duration + 1):
+            now[0] = float(second)
+
+            # Departures: each node leaves with probability 1/lifetime per second
+            for address in [a for a in live if rng.random() < 1 / lifetime]:
+                username, _ = live.pop(address)
+                if rng.random() >= crash_share:
+                    server.process_message(MessageFormatter.create_unreg_message(*address, username))
+
+            # Arrivals keep the population steady
+            for _ in range(np_rng.poisson(nodes / lifetime)):
+                peers = join()
+                if second <= warmup:
+                    continue
+                alive = [p for p in peers if p in live]
+                joins += 1
+                peers_total += len(peers)
+                peers_dead += len(peers) - len(alive)
+                if alive or not peers:
+                    successes += 1
+                else:
+                    isolated += 1
+
+            slot = second % renew_interval
+            for address, (username, renew_slot) in live.items():
+                if renew_slot == slot:
+                    server.process_message(MessageFormatter.create_renew_message(*address, username))
+
+            if lease_seconds and second % server.PURGE_INTERVAL == 0:
+                server.purge_expired()
+            if second > warmup:
+                stale.append(len(server.nodes) - len(live))
+
+    return {
+        'joins': joins,
+        'join_success': successes / joins if joins else 0.0,
+        'isolated': isolated / joins if joins else 0.0,
+        'dead_peer_share': peers_dead / peers_total if peers_total else 0.0,
+        'stale_entries': float(np.mean(stale)) if stale else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bootstrap registry churn simulation')
+    parser.add_argument('--nodes', type=int, default=500, help='Steady-state population')
+    parser.add_argument('--duration', type=int, default=1800, help='Virtual seconds to simulate')
+    parser.add_argument('--lifetime', type=float, default=600, help='Mean node lifetime in seconds')
+    parser.add_argument('--crash-share', type=float, default=0.5, help='Share of departures without UNREG')
+    parser.add_argument('--leases', default='0,120,60,30', help='Lease lengths to compare (0 = no leases)')
+    args = parser.parse_args()
+
+    print(f"\n=== Bootstrap Churn ({args.nodes} nodes, mean lifetime {args.lifetime:.0f}s, "
+          f"{args.crash_share:.0%} crashes, {args.duration}s) ===")
+    print(f"{'Lease':>8}{'Joins':>8}{'Join OK':>10}{'Isolated':>10}{'Dead peers':>12}{'Stale entries':>15}")
+    for lease in (float(x) for x in args.leases.split(',')):
+        result = simulate(lease or None, args.nodes, args.duration, args.lifetime, args.crash_share)
+        print(f"{(f'{lease:.0f}s' if lease else 'none'):>8}{result['joins']:>8}"
+              f"{result['join_success']:>10.1%}{result['isolated']:>10.1%}"
+              f"{result['dead_peer_share']:>12.1%}{result['stale_entries']:>15.0f}")
+    print("=" * 63 + "\n")
+
+
+if __name__ == '__main__':
+    main()
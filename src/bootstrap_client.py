@@ -1,5 +1,10 @@
 """
 Bootstrap server client for node registration.
+
+Not used by Node, which registers through bootstrap_manager.BootstrapManager
+(framed replies, retries and failover between replicated servers). Kept for
+scripts written against its register() API; new code should use
+BootstrapManager.
 """
 
 import socket
@@ -0,0 +1,161 @@
+"""
+Bootstrap server load generator.
+Fires a burst of concurrent REG requests, as when a whole test cluster starts
+at once, and reports registrations/sec, latency percentiles and failures.
+Can spawn the threaded and/or asyncio server itself for a side-by-side run.
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from bootstrap_server_async import request
+from protocol import MessageFormatter, MessageParser
+
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVERS = {
+    'thread': [os.path.join(SRC_DIR, 'bootstrap_server.py')],
+    'async': [os.path.join(SRC_DIR, 'bootstrap_server_async.py')]
+}
+
+
+async def register_burst(host, port, nodes, concurrency, timeout, first_port=20000, unregister=True,
+                         endpoints=None):
+    """
+    Register `nodes` synthetic nodes with at most `concurrency` in flight.
+
+    Args:
+        host (str): Bootstrap server address
+        port (int): Bootstrap server port
+        nodes (int): Registrations to send
+        concurrency (int): Connections open at once
+        timeout (float): Connect and reply timeout per registration, like a node's
+        first_port (int): UDP port of the first synthetic node
+        unregister (bool): UNREG every registered node afterwards (not timed)
+        endpoints (list): (host, port) of replicated servers to spread nodes
+            over round-robin, instead of host:port
+
+    Returns:
+        dict: registered, nodes ((node, server) pairs), failures (reason -> count),
+            elapsed seconds, regs_per_sec and latencies in ms of the successful
+            registrations
+    """
+    endpoints = endpoints or [(host, port)]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = collections.Counter()
+    registered = []
+
+    async def register(i):
+        async with semaphore:
+            node = ('127.0.0.1', first_port + i, f'load_{first_port + i}')
+            server = endpoints[i % len(endpoints)]
+            start = time.perf_counter()
+            try:
+                tokens = await request(*server, MessageFormatter.create_reg_message(*node), timeout)
+            except asyncio.TimeoutError:
+                failures['timeout'] += 1
+                return
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                failures[type(e).__name__] += 1
+                return
+            try:
+                result = MessageParser.parse_regok(tokens)
+            except ValueError:
+                result = None
+            if result is None or result['status'] >= 9996:
+                failures[f"REGOK {result['status']}" if result else 'invalid reply'] += 1
+                return
+            latencies.append((time.perf_counter() - start) * 1000)
+            registered.append((node, server))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(register(i) for i in range(nodes)))
+    elapsed = time.perf_counter() - start
+
+    if unregister:
+        async def unreg(node, server):
+            async with semaphore:
+                try:
+                    await request(*server, MessageFormatter.create_unreg_message(*node), timeout)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError):
+                    pass
+        await asyncio.gather(*(unreg(node, server) for node, server in registered))
+
+    return {
+        'registered': len(registered),
+        'nodes': registered,
+        'failures': dict(failures),
+        'elapsed': elapsed,
+        'regs_per_sec': len(registered) / elapsed if elapsed > 0 else 0.0,
+        'latencies': np.array(latencies)
+    }
+
+
+def spawn_server(kind, port, backlog, extra_args=()):
+    """Start a bootstrap server subprocess and wait until it accepts connections."""
+    command = [sys.executable] + SERVERS[kind] + [str(port)]
+    if kind == 'async':
+        command += ['--backlog', str(backlog)] + list(extra_args)
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=SRC_DIR)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{kind} bootstrap server did not start on port {port}")
+
+
+def print_result(label, result):
+    latencies = result['latencies']
+    p50, p99 = np.percentile(latencies, [50, 99]) if len(latencies) else (float('nan'), float('nan'))
+    failures = ', '.join(f"{reason}: {count}" for reason, count in result['failures'].items()) or 'none'
+    print(f"{label:<10}{result['registered']:>8}{result['regs_per_sec']:>12.1f}"
+          f"{p50:>11.1f}{p99:>11.1f}   {failures}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bootstrap server registration load generator')
+    parser.add_argument('--host', default='127.0.0.1', help='Bootstrap server address')
+    parser.add_argument('--port', type=int, default=5000, help='Bootstrap server port')
+    parser.add_argument('--nodes', type=int, default=500, help='Registrations to send')
+    parser.add_argument('--concurrency', type=int, default=500, help='Registrations in flight at once')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='Per-registration timeout (BootstrapManager uses 5s)')
+    parser.add_argument('--rounds', type=int, default=1, help='Bursts per server')
+    parser.add_argument('--server', choices=['none', 'thread', 'async', 'both'], default='none',
+                        help='Spawn a server on --port instead of using a running one')
+    parser.add_argument('--backlog', type=int, default=1024, help='Backlog of a spawned async server')
+    args = parser.parse_args()
+
+    kinds = {'none': [None], 'both': ['thread', 'async']}.get(args.server, [args.server])
+
+    print(f"\n=== Bootstrap Registration Burst ({args.nodes} nodes, {args.concurrency} concurrent) ===")
+    print(f"{'Server':<10}{'OK':>8}{'Regs/sec':>12}{'p50 (ms)':>11}{'p99 (ms)':>11}   Failures")
+    for kind in kinds:
+        process = spawn_server(kind, args.port, args.backlog) if kind else None
+        try:
+            for _ in range(args.rounds):
+                result = asyncio.run(register_burst(args.host, args.port, args.nodes,
+                                                    args.concurrency, args.timeout))
+                print_result(kind or f"{args.host}:{args.port}", result)
+        finally:
+            if process:
+                process.kill()
+                process.wait()
+    print("=" * 72 + "\n")
+
+
+if __name__ == '__main__':
+    main()
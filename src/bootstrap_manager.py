@@ -1,5 +1,28 @@
 import socket
 import random
+import time
+
+def recv_frame(sock):
+    '''
+    Read one length-prefixed message, however many recv() calls it arrives in.
+    Returns:
+        str: The whole message, length prefix included
+    Raises:
+        ConnectionError: The peer closed before the message was complete
+        ValueError: The first 4 bytes are not a valid length
+    '''
+    data = b""
+    length = None
+    while length is None or len(data) < length:
+        chunk = sock.recv(4096 if length is None else length - len(data))
+        if not chunk:
+            raise ConnectionError(f"connection closed after {len(data)} of {length or 'unknown'} bytes")
+        data += chunk
+        if length is None and len(data) >= 4:
+            if not data[:4].isdigit() or int(data[:4]) < 5:
+                raise ValueError(f"invalid length prefix {data[:4]!r}")
+            length = int(data[:4])
+    return data[:length].decode('utf-8')
 
 class Node:
     def __init__(self, ip, port, username=""):
@@ -11,9 +34,25 @@ class Node:
         return f"{self.ip}:{self.port}"
 
 class BootstrapManager:
-    def __init__(self, bs_ip, bs_port, my_ip, my_port, my_username):
-        self.bs_ip = bs_ip
-        self.bs_port = bs_port
+    RENEW_INTERVAL = 20   # Seconds between lease renewals (a third of the server's default lease)
+    CONNECT_TIMEOUT = 1   # Seconds before moving on to the next bootstrap server
+    REPLY_TIMEOUT = 5     # Seconds to wait for the reply of the only bootstrap server
+    FAILOVER_REPLY_TIMEOUT = 1  # With replicas, a server that accepts but stalls is skipped as fast
+    RETRIES = 4           # Further rounds over all servers after the first round fails
+    BACKOFF_BASE = 0.25   # Seconds; the longest wait before a round doubles each time
+    BACKOFF_MAX = 4.0
+
+    def __init__(self, bs_ip, bs_port, my_ip, my_port, my_username, endpoints=None):
+        '''
+        Args:
+            endpoints (list): (ip, port) of replicated bootstrap servers; defaults
+                              to [(bs_ip, bs_port)]
+        '''
+        self.endpoints = list(endpoints) if endpoints else [(bs_ip, bs_port)]
+        # Nodes start at different replicas to spread the load, then stay on
+        # whichever one last answered
+        self.preferred = random.randrange(len(self.endpoints))
+        self.bs_ip, self.bs_port = self.endpoints[self.preferred]
         self.me = Node(my_ip, my_port, my_username)
         
     def message_with_length(self, message):
@@ -27,95 +66,144 @@ class BootstrapManager:
         length = 4 + len(full_msg)
         return f"{length:04d}{full_msg}"
 
+    def _request(self, message, retries=None):
+        '''
+        Send a request and return the complete reply.
+        Each round tries every server, starting with the preferred one. Between
+        rounds it sleeps a random time up to BACKOFF_BASE * 2^round (capped at
+        BACKOFF_MAX), so nodes turned away by the same overloaded server do not
+        all come back at the same moment.
+        Args:
+            retries (int): Rounds after the first; defaults to RETRIES
+        Returns:
+            str: The reply
+        Raises:
+            OSError, ValueError: The last error if every round failed
+        '''
+        retries = self.RETRIES if retries is None else retries
+        for attempt in range(retries + 1):
+            if attempt:
+                delay = random.uniform(0, min(self.BACKOFF_MAX, self.BACKOFF_BASE * 2 ** (attempt - 1)))
+                print(f"[BOOTSTRAP] Retrying in {delay:.2f}s ({attempt}/{retries})")
+                time.sleep(delay)
+            try:
+                return self._request_round(message)
+            except (OSError, ValueError) as e:
+                last_error = e
+        raise last_error
+
+    def _request_round(self, message):
+        '''
+        Send a request to the preferred bootstrap server, failing over to the
+        other endpoints in turn.
+        '''
+        last_error = None
+        reply_timeout = self.REPLY_TIMEOUT if len(self.endpoints) == 1 else self.FAILOVER_REPLY_TIMEOUT
+        for attempt in range(len(self.endpoints)):
+            index = (self.preferred + attempt) % len(self.endpoints)
+            ip, port = self.endpoints[index]
+            try:
+                s = socket.create_connection((ip, port), timeout=self.CONNECT_TIMEOUT)
+                try:
+                    s.settimeout(reply_timeout)
+                    s.sendall(self.message_with_length(message).encode('utf-8'))
+                    data = recv_frame(s)
+                finally:
+                    s.close()
+                self.preferred = index
+                self.bs_ip, self.bs_port = ip, port
+                return data
+            except (OSError, ValueError) as e:
+                if len(self.endpoints) > 1:
+                    print(f"[BOOTSTRAP] {ip}:{port} unavailable ({e}), trying next server")
+                last_error = e
+        raise last_error
+
+    def _command(self, command, retries=None):
+        '''
+        Send "<command> <ip> <port> <username>" for this node (REG, UNREG, RENEW).
+        Returns:
+            list: Reply tokens, length prefix first
+        '''
+        return self._request(f"{command} {self.me.ip} {self.me.port} {self.me.username}", retries).split()
+
     def connect_to_bs(self):
         '''
         Register node at bootstrap server.
         Returns:
-            list(Node) : List of other nodes
+            list(Node) : List of other nodes, or None if registration failed
+                         (no server answered, or the address is taken)
         '''
-        # Unregister first to be safe (as per project description suggestion)
-        # But maybe we should just register. The provided code did unreg first.
-        # self.unreg_from_bs() 
-        
-        buffer_size = 1024
-        message = f"REG {self.me.ip} {self.me.port} {self.me.username}"
-        
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5)
-            s.connect((self.bs_ip, self.bs_port))
-            s.send(self.message_with_length(message).encode('utf-8'))
-            data = s.recv(buffer_size).decode('utf-8')
-            s.close()
-            
-            print(f"[BOOTSTRAP] Response: {data}")
+            toks = self._command("REG")
             
-            toks = data.split()
+            print(f"[BOOTSTRAP] Response: {' '.join(toks)}")
             
-            if len(toks) < 3:
+            if len(toks) < 3 or toks[1] != "REGOK":
                 print("Invalid message")
-                return []
-            
-            if toks[1] != "REGOK":
-                print(f"Registration failed: {toks[1]}")
-                return []
+                return None
             
             num = int(toks[2])
             
+            if num == 9998:
+                # Already registered: a retried REG whose first reply was lost, or a
+                # restart before the lease ran out. Either way we got no peers, so
+                # register afresh (as the original client always did)
+                if self._command("UNREG")[1:3] == ["UNROK", "0"]:
+                    toks = self._command("REG")
+                    print(f"[BOOTSTRAP] Response: {' '.join(toks)}")
+                    num = int(toks[2]) if len(toks) > 2 and toks[1] == "REGOK" else 9999
+            
+            if num >= 9996:
+                print(f"Registration failed: {num}")
+                return None
             if num == 0:
                 return []
-            elif num == 1:
-                # Expecting: length REGOK 1 IP1 Port1
-                if len(toks) >= 5:
-                    return [Node(toks[3], int(toks[4]))]
-            else:
-                # Expecting: length REGOK N IP1 Port1 IP2 Port2 ...
-                # We need to parse all of them and pick 2 random ones?
-                # The project description says:
-                # "BS will actually return all the nodes known to it. However, you should use only the first 2 nodes to connect."
-                # Wait, "use only the first 2 nodes".
-                # The provided code shuffled them.
-                # Let's parse all available nodes first.
-                
-                nodes = []
-                # Stride is 2: IP, Port
-                # Start index 3
-                for i in range(3, len(toks)-1, 2):
-                    nodes.append(Node(toks[i], int(toks[i+1])))
-                
-                # The provided code shuffled and returned 2.
-                # Project guide says "use only the first 2 nodes to connect" (line 106).
-                # But line 22 says "4th node ... should join only to 2 randomly selected nodes from the list".
-                # So shuffling is good.
-                
-                if len(nodes) > 2:
-                    random.shuffle(nodes)
-                    return nodes[:2]
-                return nodes
+            
+            # Expecting: length REGOK N IP1 Port1 IP2 Port2 ...
+            # The project guide says a new node "should join only to 2 randomly
+            # selected nodes from the list", so shuffle before taking 2.
+            nodes = []
+            # Stride is 2: IP, Port
+            # Start index 3
+            for i in range(3, len(toks)-1, 2):
+                nodes.append(Node(toks[i], int(toks[i+1])))
+            
+            if len(nodes) > 2:
+                random.shuffle(nodes)
+                return nodes[:2]
+            return nodes
                 
-        except Exception as e:
+        except (OSError, ValueError, IndexError) as e:
             print(f"[ERROR] Bootstrap connection failed: {e}")
-            return []
+            return None
             
     def unreg_from_bs(self):
         '''
         Unregister node at bootstrap server.
         '''
-        buffer_size = 1024
-        message = f"UNREG {self.me.ip} {self.me.port} {self.me.username}"
-
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(5)
-            s.connect((self.bs_ip, self.bs_port))
-            s.send(self.message_with_length(message).encode('utf-8'))
-            data = s.recv(buffer_size).decode('utf-8')
-            s.close()
-            
-            toks = data.split()
-            if len(toks) > 1 and toks[1] == "UNROK":
-                return True
-            return False
-        except Exception as e:
+            toks = self._command("UNREG")
+            return len(toks) > 2 and toks[1] == "UNROK" and toks[2] == "0"
+        except (OSError, ValueError) as e:
             print(f"[ERROR] Bootstrap unreg failed: {e}")
             return False
+
+    def renew(self):
+        '''
+        Renew this node's registration lease.
+        Returns:
+            bool: True if renewed, False if the server no longer knows this node
+                  (lease expired or server restarted), None if unreachable
+        '''
+        try:
+            # No retries: the next renewal comes round well within the lease
+            toks = self._command("RENEW", retries=0)
+
+            if len(toks) > 2 and toks[1] == "RENEWOK":
+                return toks[2] == "0"
+            # A server without leases answers ERROR; keep the registration as is
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Bootstrap lease renewal failed: {e}")
+            return None
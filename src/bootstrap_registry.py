@@ -0,0 +1,182 @@
+"""
+Registry of nodes known to the bootstrap server.
+"""
+
+import heapq
+import random
+
+
+class BootstrapRegistry:
+    """
+    Registered nodes indexed by (ip, port).
+
+    Entries live in a list so a random sample is k index draws. A dict maps
+    each address to its list position, and removal swaps the last entry into
+    the hole, so REG, UNREG and lookups are O(1) and sampling is O(k) however
+    many nodes are registered. Not thread-safe; the server holds its lock.
+
+    Entries may carry a lease expiry time. Expiries go into a min-heap that is
+    cleaned lazily: a renewal pushes a new item and the outdated one is skipped
+    when it surfaces, so purging costs O(log N) per expired or renewed lease.
+
+    Each entry also keeps the addresses it was linked to when the server
+    handed out peers, in both directions, so len(entry['links']) is the
+    node's approximate overlay degree. It only counts links made through this
+    registry (a failed JOIN or a link made via a replica is not seen), and
+    removing a node drops its links from its neighbours too.
+    """
+
+    def __init__(self, rng=random):
+        """
+        Args:
+            rng: random.Random used for sampling (simulations pass a seeded
+                one); defaults to the module-level generator
+        """
+        self.rng = rng
+        self.entries = []  # {'ip', 'port', 'username', 'expires': t or None, 'links': {(ip, port)}}
+        self.index = {}    # (ip, port) -> position in entries
+        self.expiry = []   # Heap of (expires, ip, port), possibly outdated
+        self.on_expire = None  # Called with each entry dropped for an expired lease
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __contains__(self, address):
+        return address in self.index
+
+    def get(self, ip, port):
+        """Entry registered at ip:port, or None."""
+        position = self.index.get((ip, port))
+        return None if position is None else self.entries[position]
+
+    def add(self, ip, port, username, expires=None):
+        """
+        Register a node. The caller checks the address is free first.
+
+        Args:
+            expires (float): Lease expiry time, or None for no lease
+
+        Returns:
+            dict: The new entry
+        """
+        entry = {'ip': ip, 'port': port, 'username': username, 'expires': expires, 'links': set()}
+        self.index[(ip, port)] = len(self.entries)
+        self.entries.append(entry)
+        if expires is not None:
+            heapq.heappush(self.expiry, (expires, ip, port))
+        return entry
+
+    def load(self, nodes, expires=None):
+        """
+        Bulk-fill an empty registry (much faster than add() per node).
+
+        Args:
+            nodes (dict): (ip, port) -> username
+            expires (float): Lease expiry for every node, or None
+        """
+        self.entries = [{'ip': ip, 'port': port, 'username': username, 'expires': expires, 'links': set()}
+                        for (ip, port), username in nodes.items()]
+        self.index = {address: position for position, address in enumerate(nodes)}
+        self.expiry = [(expires, ip, port) for ip, port in nodes] if expires is not None else []
+        heapq.heapify(self.expiry)
+
+    def link(self, entry, neighbors):
+        """Record that entry was given neighbors as its overlay peers."""
+        address = (entry['ip'], entry['port'])
+        for neighbor in neighbors:
+            entry['links'].add((neighbor['ip'], neighbor['port']))
+            neighbor['links'].add(address)
+
+    def renew(self, ip, port, expires):
+        """
+        Extend the lease of the node at ip:port.
+
+        Returns:
+            dict: The renewed entry, or None if the address is not registered
+        """
+        entry = self.get(ip, port)
+        if entry is not None:
+            entry['expires'] = expires
+            if expires is not None:
+                heapq.heappush(self.expiry, (expires, ip, port))
+        return entry
+
+    def expire(self, now):
+        """
+        Remove every node whose lease ran out at or before now.
+
+        Returns:
+            list: The removed entries
+        """
+        removed = []
+        while self.expiry and self.expiry[0][0] <= now:
+            _, ip, port = heapq.heappop(self.expiry)
+            entry = self.get(ip, port)
+            # Skip items outdated by a renewal, an UNREG or a re-registration
+            if entry is not None and self._expired(entry, now):
+                removed.append(self._drop_expired(entry))
+        return removed
+
+    def _drop_expired(self, entry):
+        self.remove(entry['ip'], entry['port'])
+        if self.on_expire:
+            self.on_expire(entry)
+        return entry
+
+    @staticmethod
+    def _expired(entry, now):
+        return entry['expires'] is not None and entry['expires'] <= now
+
+    def remove(self, ip, port):
+        """
+        Unregister the node at ip:port.
+
+        Returns:
+            dict: The removed entry, or None if the address was not registered
+        """
+        position = self.index.pop((ip, port), None)
+        if position is None:
+            return None
+        entry = self.entries[position]
+        last = self.entries.pop()
+        if last is not entry:
+            self.entries[position] = last
+            self.index[(last['ip'], last['port'])] = position
+        for neighbor in entry['links']:
+            neighbor_entry = self.get(*neighbor)
+            if neighbor_entry is not None:
+                neighbor_entry['links'].discard((ip, port))
+        return entry
+
+    def sample(self, k, now=None):
+        """
+        Pick up to k distinct registered nodes uniformly at random.
+
+        Args:
+            k (int): Nodes wanted
+            now (float): If given, only nodes whose lease is still valid are
+                picked; expired ones that turn up are removed on the spot.
+
+        Returns:
+            list: Entries in random order
+        """
+        while True:
+            picked = self._sample(k)
+            if now is None:
+                return picked
+            dead = [entry for entry in picked if self._expired(entry, now)]
+            if not dead:
+                return picked
+            for entry in dead:
+                self._drop_expired(entry)
+
+    def _sample(self, k):
+        count = len(self.entries)
+        if count <= k:
+            picked = list(self.entries)
+            self.rng.shuffle(picked)
+            return picked
+        return [self.entries[i] for i in self.rng.sample(range(count), k)]
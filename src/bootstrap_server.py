@@ -1,17 +1,50 @@
 import socket
 from bootstrap_manager import Node
+from bootstrap_assignment import LowDegreeAssignment
+from bootstrap_registry import BootstrapRegistry
+from bootstrap_store import RegistryStore
+import random
 from random import shuffle
 import threading
-import random
+import time
 import sys
 
 class BootstrapServer:
     """Bootstrap server for managing node registration."""
-    def __init__(self, port=5000):
+
+    LEASE_SECONDS = 60.0   # Registrations expire unless renewed within this
+    PURGE_INTERVAL = 5.0   # Seconds between expired-lease sweeps
+
+    def __init__(self, port=5000, lease_seconds=LEASE_SECONDS, clock=time.monotonic,
+                 state_dir=None, sync=False, assignment=None, rng=random):
+        """
+        Args:
+            port (int): TCP port to listen on
+            lease_seconds (float): Lease granted by REG and RENEW; None disables leases
+            clock (callable): Time source for leases (simulations pass a virtual clock)
+            state_dir (str): Persist the registry here and reload it on start; None keeps it in memory
+            sync (bool): fsync every registry change (see RegistryStore)
+            assignment: Policy choosing the peers handed to a new node
+                        (see bootstrap_assignment); defaults to LowDegreeAssignment
+            rng: random.Random the registry samples peers from (simulations pass
+                 a seeded one); defaults to the module-level generator
+        """
         self.port = port
-        self.nodes = []  # List of {'ip': ip, 'port': port, 'username': username}
+        self.nodes = BootstrapRegistry(rng)  # {'ip': ip, 'port': port, 'username': username} by address
         self.lock = threading.Lock()
         self.running = True
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+        self.assignment = assignment or LowDegreeAssignment()
+        self.replicator = None  # Set by servers that forward changes to peer bootstrap servers
+        self.store = None
+        if state_dir:
+            self.store = RegistryStore(state_dir, sync=sync)
+            start = time.perf_counter()
+            restored = self.store.load(self.nodes, self._lease_expiry())
+            print(f"[BOOTSTRAP] Restored {restored} node(s) from {state_dir} "
+                  f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+            self.nodes.on_expire = lambda node: self.store.log_unreg(node['ip'], node['port'])
 
     def start(self):
         """Start the bootstrap server."""
@@ -20,6 +53,8 @@ class BootstrapServer:
         self.sock.bind(('0.0.0.0', self.port))
         self.sock.listen(5)
         print(f"[BOOTSTRAP] Server started on port {self.port}")
+        if self.lease_seconds:
+            threading.Thread(target=self._purge_loop, daemon=True).start()
 
         while self.running:
             try:
@@ -29,6 +64,28 @@ class BootstrapServer:
                 if self.running:
                     print(f"[ERROR] Accept error: {e}")
 
+    def _purge_loop(self):
+        while self.running:
+            time.sleep(self.PURGE_INTERVAL)
+            self.purge_expired()
+
+    def purge_expired(self):
+        """
+        Drop nodes whose lease ran out (crashed nodes never UNREG).
+
+        Returns:
+            list: The removed entries
+        """
+        with self.lock:
+            removed = self.nodes.expire(self.clock())
+        if removed:
+            print(f"[BOOTSTRAP] Lease expired for {len(removed)} node(s): "
+                  f"{', '.join(node['username'] for node in removed[:5])}{'...' if len(removed) > 5 else ''}")
+        return removed
+
+    def _lease_expiry(self):
+        return self.clock() + self.lease_seconds if self.lease_seconds else None
+
     def handle_client(self, client_sock):
         """Handle client connections."""
         try:
@@ -55,6 +112,10 @@ class BootstrapServer:
             return self.handle_reg(parts)
         elif command == 'UNREG':
             return self.handle_unreg(parts)
+        elif command == 'RENEW':
+            return self.handle_renew(parts)
+        elif command == 'SYNC':
+            return self.handle_sync(parts)
         else:
             return self.format_error()
 
@@ -69,24 +130,25 @@ class BootstrapServer:
         username = parts[4]
 
         with self.lock:
-            # Check if already registered
-            for node in self.nodes:
-                if node['port'] == port and node['username'] == username:
-                     if node['ip'] == ip:
-                         return self.format_response(f"REGOK 9998")
+            # Check if the address is already taken
+            existing = self.nodes.get(ip, port)
+            if existing is not None:
+                if existing['username'] == username:
+                    # The node is evidently alive, so its lease restarts
+                    self.nodes.renew(ip, port, self._lease_expiry())
+                    self._publish('RENEW', ip, port, username)
+                    return self.format_response("REGOK 9998")
+                return self.format_response("REGOK 9997")
             
-            # Select random nodes to return
-            neighbors = []
-            if self.nodes:
-                # Return up to 2 random nodes
-                candidates = [n for n in self.nodes if not (n['ip'] == ip and n['port'] == port)]
-                if len(candidates) > 2:
-                    neighbors = random.sample(candidates, 2)
-                else:
-                    neighbors = candidates
+            # Up to 2 live nodes chosen by the assignment policy (the new node is not registered yet)
+            neighbors = self.assignment.pick(self.nodes, 2, self.clock() if self.lease_seconds else None)
 
             # Register new node
-            self.nodes.append({'ip': ip, 'port': port, 'username': username})
+            entry = self.nodes.add(ip, port, username, self._lease_expiry())
+            self.nodes.link(entry, neighbors)
+            if self.store:
+                self.store.log_reg(ip, port, username)
+            self._publish('REG', ip, port, username)
             print(f"[BOOTSTRAP] Registered: {username} at {ip}:{port}")
 
             # Construct response
@@ -109,14 +171,72 @@ class BootstrapServer:
 
         with self.lock:
             # Find and remove node
-            for i, node in enumerate(self.nodes):
-                if node['ip'] == ip and node['port'] == port and node['username'] == username:
-                    del self.nodes[i]
-                    print(f"[BOOTSTRAP] Unregistered: {username}")
-                    return self.format_response("UNROK 0")
+            existing = self.nodes.get(ip, port)
+            if existing is not None and existing['username'] == username:
+                self.nodes.remove(ip, port)
+                if self.store:
+                    self.store.log_unreg(ip, port)
+                self._publish('UNREG', ip, port, username)
+                print(f"[BOOTSTRAP] Unregistered: {username}")
+                return self.format_response("UNROK 0")
             
             return self.format_response("UNROK 9999")
 
+    def handle_renew(self, parts):
+        """Handle lease renewal."""
+        # Format: length RENEW IP_address port_no username
+        if len(parts) < 5:
+            return self.format_error()
+
+        ip = parts[2]
+        port = int(parts[3])
+        username = parts[4]
+
+        with self.lock:
+            existing = self.nodes.get(ip, port)
+            if existing is not None and existing['username'] == username:
+                self.nodes.renew(ip, port, self._lease_expiry())
+                self._publish('RENEW', ip, port, username)
+                return self.format_response("RENEWOK 0")
+            
+            # Unknown (expired, or the server restarted): the node must REG again
+            return self.format_response("RENEWOK 9999")
+
+    def handle_sync(self, parts):
+        """Apply registry changes replicated by a peer bootstrap server."""
+        # Format: length SYNC count (op IP_address port_no username)*
+        # Applied locally only: changes are never forwarded again
+        try:
+            count = int(parts[2])
+            records = [(op, ip, int(port), username) for op, ip, port, username
+                       in zip(*[iter(parts[3:])] * 4)]
+        except (IndexError, ValueError):
+            return self.format_error()
+        if len(records) != count or len(parts) != 3 + 4 * count:
+            return self.format_error()
+
+        with self.lock:
+            for op, ip, port, username in records:
+                existing = self.nodes.get(ip, port)
+                if op in ('REG', 'RENEW'):
+                    # A RENEW for an unknown node means we missed its REG
+                    if existing is None:
+                        self.nodes.add(ip, port, username, self._lease_expiry())
+                        if self.store:
+                            self.store.log_reg(ip, port, username)
+                    elif existing['username'] == username:
+                        self.nodes.renew(ip, port, self._lease_expiry())
+                elif op == 'UNREG':
+                    if existing is not None and existing['username'] == username:
+                        self.nodes.remove(ip, port)
+                        if self.store:
+                            self.store.log_unreg(ip, port)
+        return self.format_response(f"SYNCOK {count}")
+
+    def _publish(self, op, ip, port, username):
+        if self.replicator:
+            self.replicator.publish(op, ip, port, username)
+
     def format_response(self, content):
         """Format response with length prefix."""
         # Add length prefix
@@ -232,9 +352,11 @@ if __name__ == '__main__':
             port = int(sys.argv[1])
         except ValueError:
             print(f"[ERROR] Invalid port: {sys.argv[1]}")
-            print("Usage: python bootstrap_server.py [port]")
-            print("Example: python bootstrap_server.py 5000")
+            print("Usage: python bootstrap_server.py [port] [state_dir]")
+            print("Example: python bootstrap_server.py 5000 bs_state")
             sys.exit(1)
+    # Optional directory to persist the registry across restarts
+    state_dir = sys.argv[2] if len(sys.argv) > 2 else None
     
     print("=" * 60)
     print("BOOTSTRAP SERVER - Distributed File Search System")
@@ -245,7 +367,7 @@ if __name__ == '__main__':
     print("=" * 60)
     print()
     
-    server = BootstrapServer(port=port)
+    server = BootstrapServer(port=port, state_dir=state_dir)
     try:
         server.start()
     except KeyboardInterrupt:
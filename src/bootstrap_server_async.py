@@ -0,0 +1,303 @@
+"""
+asyncio bootstrap server.
+Speaks the same REG/UNREG/RENEW protocol as bootstrap_server.py, but serves every
+connection on one event loop with a configurable listen backlog and
+per-connection read/write timeouts, so a burst of nodes starting together is
+queued by the kernel instead of refused. Several servers can run as replicas
+that stream registry changes to each other.
+"""
+
+import argparse
+import asyncio
+import threading
+
+from bootstrap_assignment import ASSIGNMENT_POLICIES, LowDegreeAssignment
+from bootstrap_server import BootstrapServer
+from protocol import MessageFormatter
+
+
+MAX_FRAME = 9999  # Largest length a 4-digit prefix can announce
+
+
+async def read_frame(reader):
+    """
+    Read one length-prefixed message.
+
+    Args:
+        reader (asyncio.StreamReader): Connection to read from
+
+    Returns:
+        str: The complete message, prefix included
+
+    Raises:
+        ValueError: If the prefix is not a valid length
+        asyncio.IncompleteReadError: If the peer closes mid-frame
+    """
+    prefix = await reader.readexactly(4)
+    length = int(prefix)
+    if not 5 <= length <= MAX_FRAME:
+        raise ValueError(f"Invalid frame length {length}")
+    body = await reader.readexactly(length - 4)
+    return (prefix + body).decode('utf-8')
+
+
+async def request(host, port, message, timeout):
+    """
+    Send one request and read the whole length-prefixed reply.
+
+    Returns:
+        list: Reply tokens without the length prefix
+    """
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        writer.write(message.encode('utf-8'))
+        await writer.drain()
+        reply = await asyncio.wait_for(read_frame(reader), timeout)
+        return MessageFormatter.parse_message(reply)
+    finally:
+        writer.close()
+
+
+class Replicator:
+    """
+    Streams local registry changes to peer bootstrap servers.
+
+    Each peer has its own queue and task, so a slow or dead peer delays no one
+    else. Changes are batched into SYNC frames (one connection per batch) and a
+    batch is retried until the peer acknowledges it, keeping per-peer order.
+    A batch the peer answers with ERROR is dropped rather than retried, since
+    resending the same frame cannot succeed and would block everything queued
+    behind it. Replicas converge eventually; anything lost is repaired by the
+    nodes themselves, since a RENEW the server doesn't recognise makes the node
+    register again.
+    """
+
+    MAX_BATCH_CHARS = 9000   # Keeps a SYNC frame under the 4-digit length limit
+    MAX_PENDING = 100000     # Changes queued per peer before new ones are dropped
+    RETRY_DELAY = 1.0
+
+    def __init__(self, peers, timeout=5.0):
+        """
+        Args:
+            peers (list): (ip, port) of the other bootstrap servers
+            timeout (float): Connect and acknowledgement timeout per batch
+        """
+        self.peers = peers
+        self.timeout = timeout
+        self.queues = {}
+        self.tasks = []
+        self.replicated = 0  # Changes acknowledged, summed over peers
+        self.dropped = 0     # Changes not queued: peer backlog full, or too long for a frame
+        self.rejected = 0    # Changes in batches a peer answered with ERROR
+
+    def start(self):
+        """Start one sender task per peer (call from the server's event loop)."""
+        for peer in self.peers:
+            queue = asyncio.Queue()
+            self.queues[peer] = queue
+            self.tasks.append(asyncio.create_task(self._send_loop(peer, queue)))
+
+    def stop(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def publish(self, op, ip, port, username):
+        """Queue one change for every peer (called on the event loop)."""
+        record = f"{op} {ip} {port} {username}"
+        if len(record) + 1 > self.MAX_BATCH_CHARS:
+            # A REG frame can carry a username almost 10k long; its SYNC record never fits
+            self.dropped += len(self.queues)
+            print(f"[BOOTSTRAP] Not replicating {op} {ip}:{port}: {len(record)}-char record exceeds a SYNC frame")
+            return
+        for queue in self.queues.values():
+            if queue.qsize() >= self.MAX_PENDING:
+                self.dropped += 1
+            else:
+                queue.put_nowait(record)
+
+    @property
+    def pending(self):
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    async def _send_loop(self, peer, queue):
+        batch = []
+        size = 0
+        carry = None  # Record taken from the queue that did not fit the current batch
+        failing = False
+        while True:
+            if not batch:
+                record = carry if carry is not None else await queue.get()
+                carry = None
+                batch, size = [record], len(record) + 1
+            # Add a record only if the batch stays within the frame limit
+            while carry is None and not queue.empty():
+                record = queue.get_nowait()
+                if size + len(record) + 1 > self.MAX_BATCH_CHARS:
+                    carry = record
+                else:
+                    batch.append(record)
+                    size += len(record) + 1
+
+            message = MessageFormatter.format_message(f"SYNC {len(batch)} {' '.join(batch)}")
+            try:
+                tokens = await request(peer[0], peer[1], message, self.timeout)
+                if tokens[:1] == ['ERROR']:
+                    self.rejected += len(batch)
+                    print(f"[BOOTSTRAP] {peer[0]}:{peer[1]} rejected a batch of {len(batch)} changes, dropping it")
+                elif tokens[:1] == ['SYNCOK']:
+                    self.replicated += len(batch)
+                else:
+                    raise ValueError(f"unexpected reply {tokens}")
+                batch = []
+                if failing:
+                    print(f"[BOOTSTRAP] Replication to {peer[0]}:{peer[1]} resumed")
+                    failing = False
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError) as e:
+                if not failing:
+                    print(f"[BOOTSTRAP] Replication to {peer[0]}:{peer[1]} failing ({e}), retrying")
+                    failing = True
+                await asyncio.sleep(self.RETRY_DELAY)
+
+
+class AsyncBootstrapServer(BootstrapServer):
+    """Bootstrap server on asyncio; registry handling is inherited unchanged."""
+
+    DEFAULT_BACKLOG = 1024
+    DEFAULT_READ_TIMEOUT = 5.0   # Seconds a client has to send its full request
+    DEFAULT_WRITE_TIMEOUT = 5.0  # Seconds to flush the response
+
+    def __init__(self, port=5000, host='0.0.0.0', backlog=DEFAULT_BACKLOG,
+                 read_timeout=DEFAULT_READ_TIMEOUT, write_timeout=DEFAULT_WRITE_TIMEOUT,
+                 lease_seconds=BootstrapServer.LEASE_SECONDS, state_dir=None, sync=False, peers=None,
+                 assignment=None):
+        """
+        Args:
+            port (int): TCP port to listen on
+            host (str): Address to bind
+            backlog (int): Listen backlog (the kernel caps it at net.core.somaxconn)
+            read_timeout (float): Per-connection timeout for reading the request
+            write_timeout (float): Per-connection timeout for sending the response
+            lease_seconds (float): Registration lease; None disables leases
+            state_dir (str): Persist the registry here and reload it on start
+            sync (bool): fsync every registry change
+            peers (list): (ip, port) of replica bootstrap servers to stream changes to
+            assignment: Neighbor assignment policy (see bootstrap_assignment)
+        """
+        super().__init__(port, lease_seconds=lease_seconds, state_dir=state_dir, sync=sync,
+                         assignment=assignment)
+        self.host = host
+        self.backlog = backlog
+        self.read_timeout = read_timeout
+        self.write_timeout = write_timeout
+        self.loop = None
+        self.server = None
+        self.ready = threading.Event()  # Set once the socket is listening
+        self.connections = 0
+        self.timeouts = 0
+        if peers:
+            self.replicator = Replicator(peers)
+
+    def start(self):
+        """Start the bootstrap server (blocks until stop())."""
+        try:
+            asyncio.run(self.serve())
+        except asyncio.CancelledError:
+            pass
+
+    async def serve(self):
+        """Listen and serve connections until stop()."""
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port,
+            backlog=self.backlog, reuse_address=True
+        )
+        print(f"[BOOTSTRAP] Async server started on port {self.port} (backlog {self.backlog})")
+        self.ready.set()
+        purger = asyncio.create_task(self._purge_task()) if self.lease_seconds else None
+        if self.replicator:
+            self.replicator.start()
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            if purger:
+                purger.cancel()
+            if self.replicator:
+                self.replicator.stop()
+
+    async def _purge_task(self):
+        while True:
+            await asyncio.sleep(self.PURGE_INTERVAL)
+            self.purge_expired()
+
+    def stop(self):
+        """Stop serving; safe to call from any thread."""
+        self.running = False
+        if self.loop and self.server:
+            self.loop.call_soon_threadsafe(self.server.close)
+
+    async def handle_connection(self, reader, writer):
+        """Serve one request/response exchange."""
+        self.connections += 1
+        peer = writer.get_extra_info('peername')
+        try:
+            try:
+                message = await asyncio.wait_for(read_frame(reader), self.read_timeout)
+                response = self.process_message(message)
+            except ValueError:
+                response = self.format_error()
+            writer.write(response.encode('utf-8'))
+            await asyncio.wait_for(writer.drain(), self.write_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            print(f"[BOOTSTRAP] Connection from {peer} timed out")
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass  # Client went away before finishing its request
+        except Exception as e:
+            print(f"[ERROR] Client handling error: {e}")
+        finally:
+            writer.close()
+
+
+def somaxconn():
+    """The kernel's backlog cap, or None where it cannot be read."""
+    try:
+        with open('/proc/sys/net/core/somaxconn') as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='asyncio bootstrap server')
+    parser.add_argument('port', type=int, nargs='?', default=5000, help='Port to listen on')
+    parser.add_argument('--backlog', type=int, default=AsyncBootstrapServer.DEFAULT_BACKLOG,
+                        help='Listen backlog')
+    parser.add_argument('--read-timeout', type=float, default=AsyncBootstrapServer.DEFAULT_READ_TIMEOUT,
+                        help='Seconds a client has to send its request')
+    parser.add_argument('--write-timeout', type=float, default=AsyncBootstrapServer.DEFAULT_WRITE_TIMEOUT,
+                        help='Seconds to send the response')
+    parser.add_argument('--lease', type=float, default=AsyncBootstrapServer.LEASE_SECONDS,
+                        help='Registration lease in seconds nodes must RENEW within (0 disables)')
+    parser.add_argument('--state-dir', help='Persist the registry here (write-ahead log + snapshot)')
+    parser.add_argument('--sync', action='store_true', help='fsync every registry change')
+    parser.add_argument('--peers', default='',
+                        help='Comma-separated ip:port of replica bootstrap servers to replicate to')
+    parser.add_argument('--assignment', choices=sorted(ASSIGNMENT_POLICIES), default=LowDegreeAssignment.name,
+                        help='How peers are chosen for a registering node')
+    args = parser.parse_args()
+
+    cap = somaxconn()
+    if cap is not None and args.backlog > cap:
+        print(f"[WARNING] Backlog {args.backlog} exceeds net.core.somaxconn={cap}; the kernel uses {cap}")
+
+    peers = [(host, int(port)) for host, port in
+             (peer.rsplit(':', 1) for peer in args.peers.split(',') if peer)]
+    server = AsyncBootstrapServer(port=args.port, backlog=args.backlog,
+                                  read_timeout=args.read_timeout, write_timeout=args.write_timeout,
+                                  lease_seconds=args.lease or None, state_dir=args.state_dir, sync=args.sync,
+                                  peers=peers, assignment=ASSIGNMENT_POLICIES[args.assignment]())
+    try:
+        server.start()
+    except KeyboardInterrupt:
+        print("\n[BOOTSTRAP] Shutting down...")
@@ -0,0 +1,120 @@
+"""
+Durable bootstrap registry state.
+Registrations are appended to a write-ahead log and periodically compacted
+into a snapshot, so a restarted bootstrap server reloads its registry instead
+of making every node register again.
+"""
+
+import os
+
+
+class RegistryStore:
+    """
+    Snapshot plus write-ahead log for a BootstrapRegistry.
+
+    Files in state_dir:
+        registry.snapshot - 'BSSNAP 1 <count>' header, then 'ip port username' lines
+        registry.wal      - 'REG ip port username' / 'UNREG ip port' lines since it
+
+    Replaying a log record sets or deletes one address, so replaying a log
+    whose records are already in the snapshot (a crash between writing the
+    snapshot and truncating the log) ends in the same state. Leases are not
+    logged: restored nodes get a fresh lease and renew as usual.
+    Not thread-safe; the server calls it under its lock.
+    """
+
+    SNAPSHOT_EVERY = 10000  # Log records before the log is compacted into a snapshot
+    SNAPSHOT_VERSION = 1
+
+    def __init__(self, state_dir, sync=False, snapshot_every=SNAPSHOT_EVERY):
+        """
+        Args:
+            state_dir (str): Directory holding the snapshot and log
+            sync (bool): fsync every record (survives power loss, not just a crash)
+            snapshot_every (int): Log records between snapshots
+        """
+        self.state_dir = state_dir
+        self.snapshot_file = os.path.join(state_dir, 'registry.snapshot')
+        self.wal_file = os.path.join(state_dir, 'registry.wal')
+        self.sync = sync
+        self.snapshot_every = snapshot_every
+        self.registry = None
+        self.wal = None
+        self.records = 0  # Records in the current log
+
+    def load(self, registry, expires=None):
+        """
+        Rebuild the registry from the snapshot and log, then open the log.
+
+        Args:
+            registry (BootstrapRegistry): Empty registry to fill
+            expires (float): Lease expiry given to every restored node
+
+        Returns:
+            int: Nodes restored
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        self.registry = registry
+        nodes = {}  # (ip, port) -> username
+
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, 'r') as f:
+                header = f.readline().split()
+                if header[:2] != ['BSSNAP', str(self.SNAPSHOT_VERSION)]:
+                    raise ValueError(f"Unsupported snapshot header in {self.snapshot_file}")
+                for line in f.read().splitlines():
+                    ip, port, username = line.split()
+                    nodes[(ip, int(port))] = username
+
+        valid_bytes = 0
+        if os.path.exists(self.wal_file):
+            with open(self.wal_file, 'rb') as f:
+                for raw in f:
+                    if not raw.endswith(b'\n'):
+                        break  # Torn final record from a crash mid-write
+                    parts = raw.decode('utf-8').split()
+                    if parts[0] == 'REG':
+                        nodes[(parts[1], int(parts[2]))] = parts[3]
+                    elif parts[0] == 'UNREG':
+                        nodes.pop((parts[1], int(parts[2])), None)
+                    valid_bytes += len(raw)
+                    self.records += 1
+
+        registry.load(nodes, expires)
+
+        self.wal = open(self.wal_file, 'a', encoding='utf-8')
+        self.wal.truncate(valid_bytes)
+        return len(nodes)
+
+    def log_reg(self, ip, port, username):
+        self._append(f"REG {ip} {port} {username}\n")
+
+    def log_unreg(self, ip, port):
+        self._append(f"UNREG {ip} {port}\n")
+
+    def _append(self, record):
+        self.wal.write(record)
+        self.wal.flush()
+        if self.sync:
+            os.fsync(self.wal.fileno())
+        self.records += 1
+        if self.records >= self.snapshot_every:
+            self.snapshot()
+
+    def snapshot(self):
+        """Write the whole registry as a snapshot and empty the log."""
+        tmp_file = self.snapshot_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(f"BSSNAP {self.SNAPSHOT_VERSION} {len(self.registry)}\n")
+            f.writelines(f"{e['ip']} {e['port']} {e['username']}\n" for e in self.registry)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.snapshot_file)
+        self.wal.truncate(0)
+        self.wal.seek(0)
+        self.records = 0
+
+    def close(self):
+        if self.wal:
+            self.wal.close()
+            self.wal = None
@@ -0,0 +1,183 @@
+"""
+Run-to-run performance comparison.
+Loads a baseline and a candidate log directory, compares latency and hop
+percentiles, messages per node and query success rate with bootstrap
+confidence intervals, flags significant regressions and draws overlaid CDFs.
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+
+from log_aggregator import aggregate_logs
+from plot_stats import calculate_statistics, plot_cdf
+
+
+# series -> (metric label, percentile or 'mean', higher is worse)
+SERIES_METRICS = {
+    'latencies': [('Latency p50 (ms)', 50, True), ('Latency p90 (ms)', 90, True),
+                  ('Latency p99 (ms)', 99, True), ('Latency mean (ms)', 'mean', True)],
+    'hops': [('Hops p50', 50, True), ('Hops p90', 90, True), ('Hops mean', 'mean', True)],
+    'messages_per_node': [('Messages per node (mean)', 'mean', True)]
+}
+
+
+def _stats(values, statistics):
+    """Evaluate percentiles and/or the mean of one sample."""
+    percentiles = [s for s in statistics if s != 'mean']
+    results = dict(zip(percentiles, np.percentile(values, percentiles))) if percentiles else {}
+    if 'mean' in statistics:
+        results['mean'] = calculate_statistics(values)['mean']
+    return [results[s] for s in statistics]
+
+
+def bootstrap_series(baseline, candidate, statistics, resamples, max_samples, rng, confidence):
+    """
+    Bootstrap the candidate-minus-baseline difference of several statistics.
+
+    Both samples are resampled independently. Samples larger than max_samples
+    are first subsampled, which only widens (never narrows) the intervals.
+
+    Returns:
+        list: (baseline value, candidate value, ci_low, ci_high) per statistic
+    """
+    base_full = _stats(baseline, statistics)
+    cand_full = _stats(candidate, statistics)
+
+    if len(baseline) > max_samples:
+        baseline = rng.choice(baseline, max_samples, replace=False)
+    if len(candidate) > max_samples:
+        candidate = rng.choice(candidate, max_samples, replace=False)
+
+    diffs = np.empty((resamples, len(statistics)))
+    for i in range(resamples):
+        base = baseline[rng.integers(0, len(baseline), len(baseline))]
+        cand = candidate[rng.integers(0, len(candidate), len(candidate))]
+        diffs[i] = np.subtract(_stats(cand, statistics), _stats(base, statistics))
+
+    tail = (1 - confidence) / 2 * 100
+    lows, highs = np.percentile(diffs, [tail, 100 - tail], axis=0)
+    return list(zip(base_full, cand_full, lows, highs))
+
+
+def bootstrap_rate(base_hits, base_total, cand_hits, cand_total, resamples, rng, confidence):
+    """Bootstrap the difference of two success rates (binomial resampling)."""
+    base_rate = base_hits / base_total
+    cand_rate = cand_hits / cand_total
+    diffs = (rng.binomial(cand_total, cand_rate, resamples) / cand_total -
+             rng.binomial(base_total, base_rate, resamples) / base_total)
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.percentile(diffs, [tail, 100 - tail])
+    return base_rate, cand_rate, low, high
+
+
+def verdict(low, high, higher_is_worse):
+    """REGRESSION / improved when the interval excludes zero, else no change."""
+    if low > 0 or high < 0:
+        worse = (low > 0) == higher_is_worse
+        return 'REGRESSION' if worse else 'improved'
+    return '-'
+
+
+def compare(baseline_dir, candidate_dir, resamples=1000, max_samples=20000,
+            confidence=0.95, seed=0, workers=None):
+    """
+    Compare two runs.
+
+    Returns:
+        tuple: (rows, baseline data, candidate data). Each row is a dict with
+            metric, baseline, candidate, change, ci_low, ci_high and verdict.
+    """
+    rng = np.random.default_rng(seed)
+    baseline = aggregate_logs(baseline_dir, workers)
+    candidate = aggregate_logs(candidate_dir, workers)
+
+    rows = []
+    for series, metrics in SERIES_METRICS.items():
+        base_values = np.asarray(baseline[series], dtype=np.float64)
+        cand_values = np.asarray(candidate[series], dtype=np.float64)
+        if not len(base_values) or not len(cand_values):
+            continue
+        results = bootstrap_series(base_values, cand_values, [m[1] for m in metrics],
+                                   resamples, max_samples, rng, confidence)
+        for (label, _, higher_is_worse), (base, cand, low, high) in zip(metrics, results):
+            rows.append({'metric': label, 'baseline': base, 'candidate': cand, 'change': cand - base,
+                         'ci_low': low, 'ci_high': high,
+                         'verdict': verdict(low, high, higher_is_worse)})
+
+    if baseline['queries_issued'] and candidate['queries_issued']:
+        base, cand, low, high = bootstrap_rate(
+            baseline['queries_succeeded'], baseline['queries_issued'],
+            candidate['queries_succeeded'], candidate['queries_issued'],
+            resamples, rng, confidence)
+        rows.append({'metric': 'Query success rate (%)', 'baseline': base * 100, 'candidate': cand * 100,
+                     'change': (cand - base) * 100, 'ci_low': low * 100, 'ci_high': high * 100,
+                     'verdict': verdict(low, high, higher_is_worse=False)})
+
+    return rows, baseline, candidate
+
+
+def print_table(rows, confidence):
+    header = f"{'Metric':<26}{'Baseline':>11}{'Candidate':>11}{'Change':>10}  {int(confidence * 100)}% CI of change"
+    print("\n=== Run Comparison (candidate vs baseline) ===")
+    print(header)
+    print("-" * (len(header) + 12))
+    for row in rows:
+        relative = f"{row['change'] / row['baseline'] * 100:+.1f}%" if row['baseline'] else 'n/a'
+        ci = f"[{row['ci_low']:+.2f}, {row['ci_high']:+.2f}]"
+        print(f"{row['metric']:<26}{row['baseline']:>11.2f}{row['candidate']:>11.2f}{relative:>10}  "
+              f"{ci:<22}{row['verdict']}")
+    regressions = [row['metric'] for row in rows if row['verdict'] == 'REGRESSION']
+    print(f"\nSignificant regressions: {', '.join(regressions) if regressions else 'none'}")
+    print("==============================================\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare a candidate run against a baseline run')
+    parser.add_argument('baseline', help='Baseline log directory')
+    parser.add_argument('candidate', help='Candidate log directory')
+    parser.add_argument('--resamples', type=int, default=1000, help='Bootstrap resamples')
+    parser.add_argument('--max-samples', type=int, default=20000,
+                        help='Subsample larger series to this size before bootstrapping')
+    parser.add_argument('--confidence', type=float, default=0.95, help='Confidence level of the intervals')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for reproducible intervals')
+    parser.add_argument('--out-dir', default='.', help='Where the CDF plots and comparison.csv go')
+    parser.add_argument('--fail-on-regression', action='store_true',
+                        help='Exit with status 1 if any significant regression is found')
+    args = parser.parse_args()
+
+    for log_dir in (args.baseline, args.candidate):
+        if not os.path.isdir(log_dir):
+            print(f"Log directory '{log_dir}' not found.")
+            return 2
+
+    rows, baseline, candidate = compare(args.baseline, args.candidate, args.resamples,
+                                        args.max_samples, args.confidence, args.seed)
+    print_table(rows, args.confidence)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    labels = [f"baseline ({args.baseline})", f"candidate ({args.candidate})"]
+    for series, label, name in (('latencies', 'Latency (ms)', 'compare_cdf_latency.png'),
+                                ('hops', 'Hops', 'compare_cdf_hops.png'),
+                                ('messages_per_node', 'Messages per Node', 'compare_cdf_messages.png')):
+        plot_cdf([baseline[series], candidate[series]], label,
+                 os.path.join(args.out_dir, name), series_labels=labels)
+
+    report = os.path.join(args.out_dir, 'comparison.csv')
+    with open(report, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=['metric', 'baseline', 'candidate', 'change',
+                                               'ci_low', 'ci_high', 'verdict'])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"Saved {report}")
+
+    if args.fail_on_regression and any(row['verdict'] == 'REGRESSION' for row in rows):
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
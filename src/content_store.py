@@ -0,0 +1,195 @@
+"""
+Disk-backed content store for generated files.
+Keeps file content in a node-local directory and serves it through memory maps.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+
+
+class ContentStore:
+    """Stores file blobs on disk with a small index of sizes and hashes."""
+
+    INDEX_FILE = 'index.json'
+    CHUNK_SIZE = 64 * 1024  # Bytes handed out per read when streaming
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        self.index_file = os.path.join(root_dir, self.INDEX_FILE)
+        self.index = {}  # filename -> {'blob': str, 'size': int, 'hash': str}
+        self.lock = threading.Lock()
+
+        os.makedirs(root_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Load the index from disk, dropping entries whose blob is gone."""
+        if not os.path.exists(self.index_file):
+            return
+
+        try:
+            with open(self.index_file, 'r') as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"[STORE] Ignoring unreadable index {self.index_file}: {e}")
+            return
+
+        for filename, entry in index.items():
+            path = os.path.join(self.root_dir, entry['blob'])
+            if os.path.exists(path) and os.path.getsize(path) == entry['size']:
+                self.index[filename] = entry
+
+    def _save_index(self):
+        """Atomically write the index to disk. Caller must hold the lock."""
+        tmp_file = self.index_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            json.dump(self.index, f)
+        os.replace(tmp_file, self.index_file)
+
+    def _blob_name(self, filename):
+        """Map a filename to a safe on-disk blob name."""
+        return hashlib.sha1(filename.encode('utf-8')).hexdigest() + '.bin'
+
+    def contains(self, filename):
+        """Check whether content for a file is stored."""
+        with self.lock:
+            return filename in self.index
+
+    def put(self, filename, content, hash_val=None):
+        """
+        Store file content.
+
+        Args:
+            filename (str): Name of the file.
+            content (bytes): File content.
+            hash_val (str): SHA256 hash of content, calculated if not given.
+
+        Returns:
+            dict: Index entry for the stored file.
+        """
+        if hash_val is None:
+            hash_val = hashlib.sha256(content).hexdigest()
+
+        blob = self._blob_name(filename)
+        path = os.path.join(self.root_dir, blob)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+        return self._add_entry(filename, blob, len(content), hash_val)
+
+    def put_chunks(self, filename, chunks):
+        """
+        Store file content produced piece by piece, hashing it on the way.
+
+        Args:
+            filename (str): Name of the file.
+            chunks (iterable): Iterable of bytes objects making up the content.
+
+        Returns:
+            dict: Index entry for the stored file.
+        """
+        blob = self._blob_name(filename)
+        path = os.path.join(self.root_dir, blob)
+        tmp_path = path + '.tmp'
+        hasher = hashlib.sha256()
+        size = 0
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                hasher.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+        os.replace(tmp_path, path)
+
+        return self._add_entry(filename, blob, size, hasher.hexdigest())
+
+    def _add_entry(self, filename, blob, size, hash_val):
+        """Record a stored blob in the index."""
+        entry = {'blob': blob, 'size': size, 'hash': hash_val}
+        with self.lock:
+            self.index[filename] = entry
+            self._save_index()
+        return entry
+
+    def update_entry(self, filename, **fields):
+        """Attach extra metadata (e.g. chunk hashes) to a stored file."""
+        with self.lock:
+            if filename not in self.index:
+                raise KeyError(filename)
+            self.index[filename].update(fields)
+            self._save_index()
+
+    def get_entry(self, filename):
+        """Get the index entry of a file, or None if not stored."""
+        with self.lock:
+            entry = self.index.get(filename)
+            return dict(entry) if entry else None
+
+    def get_path(self, filename):
+        """Get the on-disk path of a stored file."""
+        entry = self.get_entry(filename)
+        if entry is None:
+            raise KeyError(filename)
+        return os.path.join(self.root_dir, entry['blob'])
+
+    def get_size(self, filename):
+        """Get the size in bytes of a stored file."""
+        entry = self.get_entry(filename)
+        if entry is None:
+            raise KeyError(filename)
+        return entry['size']
+
+    def get_hash(self, filename):
+        """Get the SHA256 hash of a stored file."""
+        entry = self.get_entry(filename)
+        if entry is None:
+            raise KeyError(filename)
+        return entry['hash']
+
+    def read(self, filename):
+        """Read the full content of a stored file."""
+        return b''.join(self.iter_chunks(filename))
+
+    def iter_chunks(self, filename, start=0, end=None, chunk_size=None):
+        """
+        Stream a byte range of a stored file from a memory map.
+
+        Args:
+            filename (str): Name of the file.
+            start (int): First byte offset.
+            end (int): Offset one past the last byte (defaults to file size).
+            chunk_size (int): Bytes per yielded chunk.
+
+        Yields:
+            bytes: Consecutive slices of the requested range.
+        """
+        path = self.get_path(filename)
+        chunk_size = chunk_size or self.CHUNK_SIZE
+
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            end = size if end is None else min(end, size)
+            if start >= end:
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for offset in range(start, end, chunk_size):
+                    yield mm[offset:min(offset + chunk_size, end)]
+
+    def remove(self, filename):
+        """Remove a file from the store."""
+        with self.lock:
+            entry = self.index.pop(filename, None)
+            if entry is None:
+                return False
+            self._save_index()
+
+        try:
+            os.remove(os.path.join(self.root_dir, entry['blob']))
+        except OSError:
+            pass
+        return True
@@ -0,0 +1,160 @@
+"""
+Concurrent download manager built on Node.download_file.
+Runs download jobs on a bounded thread pool and tracks their progress.
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DownloadJob:
+    """A single queued or running download."""
+
+    def __init__(self, job_id, ip, port, filename, alt_sources=None):
+        self.job_id = job_id
+        self.ip = ip
+        self.port = port
+        self.filename = filename
+        self.alt_sources = alt_sources or []
+
+        self.status = 'queued'  # queued -> running -> done | failed | integrity_failed
+        self.bytes_received = 0
+        self.total_bytes = 0
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.future = None
+
+    def update_progress(self, bytes_received, total_bytes):
+        """Progress callback handed to Node.download_file."""
+        self.bytes_received = bytes_received
+        self.total_bytes = total_bytes
+
+    @property
+    def progress(self):
+        """Fraction of the file received (0.0 - 1.0)."""
+        if not self.total_bytes:
+            return 1.0 if self.status == 'done' else 0.0
+        return min(self.bytes_received / self.total_bytes, 1.0)
+
+    @property
+    def throughput(self):
+        """Average transfer rate in bytes/second."""
+        if self.started_at is None:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.bytes_received / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        integrity = ' PASSED' if self.result and self.result['integrity'] else ''
+        return (f"#{self.job_id} {self.filename} from {self.ip}:{self.port} "
+                f"[{self.status}{integrity}] {self.progress * 100:5.1f}% "
+                f"{self.throughput / 1024 / 1024:.2f} MB/s")
+
+
+class DownloadManager:
+    """Accepts download jobs and runs them concurrently on a bounded pool."""
+
+    def __init__(self, node, max_workers=3):
+        self.node = node
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+        self.jobs = {}  # job_id -> DownloadJob
+        self.lock = threading.Lock()
+        self.job_ids = itertools.count(1)
+
+    def submit(self, ip, port, filename, alt_sources=None):
+        """
+        Queue a download.
+
+        Args:
+            ip (str): IP of the source node
+            port (int): Port of the source node
+            filename (str): File to download
+            alt_sources (list): Optional (ip, port) tuples for failover and repairs
+
+        Returns:
+            DownloadJob: The queued job.
+        """
+        job = DownloadJob(next(self.job_ids), ip, port, filename, alt_sources)
+        with self.lock:
+            self.jobs[job.job_id] = job
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        """Execute a job and record its outcome."""
+        job.status = 'running'
+        job.started_at = time.time()
+
+        try:
+            result = self.node.download_file(
+                job.ip, job.port, job.filename, job.alt_sources, progress=job.update_progress
+            )
+        except Exception as e:
+            # A job must never stay 'running' because the transfer code raised
+            print(f"[ERROR] Download #{job.job_id} of '{job.filename}' crashed: {e}")
+            result = {
+                'filename': job.filename, 'ip': job.ip, 'port': job.port, 'status': 'error',
+                'size': job.bytes_received, 'duration': time.time() - job.started_at,
+                'first_byte': None, 'integrity': None
+            }
+
+        job.finished_at = time.time()
+        job.result = result
+        if result['status'] != 'ok':
+            job.status = 'failed'
+            status = result['status'].upper()
+        elif result['integrity'] is False:
+            job.status = 'integrity_failed'
+            status = 'INTEGRITY_FAILED'
+        else:
+            job.status = 'done'
+            status = 'PASSED' if result['integrity'] else 'OK'
+
+        self.node.statistics.log_event(
+            event_type='DOWNLOAD_RESULT',
+            query=job.filename,
+            latency_ms=result['duration'] * 1000,
+            sender_ip=result['ip'],
+            sender_port=result['port'],
+            size_bytes=result['size'],
+            status=status
+        )
+        return job
+
+    def get_job(self, job_id):
+        """Get a job by id."""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self):
+        """Get all jobs in submission order."""
+        with self.lock:
+            return list(self.jobs.values())
+
+    def active_count(self):
+        """Number of jobs queued or running."""
+        return sum(1 for job in self.list_jobs() if job.status in ('queued', 'running'))
+
+    def wait_all(self, timeout=None):
+        """Block until every submitted job has finished."""
+        for job in self.list_jobs():
+            job.future.result(timeout=timeout)
+
+    def print_jobs(self):
+        """Print progress of all jobs."""
+        jobs = self.list_jobs()
+        if not jobs:
+            print("No downloads")
+            return
+        print("\n=== Downloads ===")
+        for job in jobs:
+            print(f"  {job}")
+        print("=================\n")
+
+    def shutdown(self, wait=False):
+        """Stop accepting jobs."""
+        self.executor.shutdown(wait=wait)
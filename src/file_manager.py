@@ -1,55 +1,161 @@
 import hashlib
-import random
-import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from content_store import ContentStore
+from merkle import MerkleTree
 
 class FileManager:
     """Handles file generation, storage, and hashing."""
-    
-    def __init__(self):
-        self.file_cache = {}  # filename -> bytes
-        self.hashes = {}      # filename -> hash
-    
+
+    GENERATION_CHUNK = 1024 * 1024  # Bytes produced per PRNG call
+    PREPARE_WORKERS = 2
+
+    def __init__(self, storage_dir='storage', node_id=''):
+        # Content lives on disk so resident memory does not grow with the catalog
+        self.store = ContentStore(storage_dir)
+        self.node_id = node_id
+        self.lock = threading.Lock()
+        self.file_locks = {}  # filename -> lock guarding its generation
+        self.prepare_futures = []
+
     def get_file_content(self, filename):
         """
         Get file content. Generates it if not present.
-        
+
         Args:
             filename (str): Name of the file.
-            
+
         Returns:
             bytes: File content.
         """
-        if filename not in self.file_cache:
-            self._generate_file(filename)
-        
-        return self.file_cache[filename]
-    
+        self._ensure_file(filename)
+        return self.store.read(filename)
+
     def get_file_hash(self, filename):
         """Get SHA256 hash of a file."""
-        if filename not in self.hashes:
-            if filename in self.file_cache:
-                self.hashes[filename] = self._calculate_hash(self.file_cache[filename])
-            else:
+        self._ensure_file(filename)
+        return self.store.get_hash(filename)
+
+    def get_file_size(self, filename):
+        """Get size of a file in bytes."""
+        self._ensure_file(filename)
+        return self.store.get_size(filename)
+
+    def iter_file_chunks(self, filename, start=0, end=None):
+        """Stream a byte range of a file from disk without loading it whole."""
+        self._ensure_file(filename)
+        return self.store.iter_chunks(filename, start, end)
+
+    def get_merkle_tree(self, filename):
+        """
+        Get the chunk Merkle tree of a file, computing and indexing it once.
+
+        Args:
+            filename (str): Name of the file.
+
+        Returns:
+            MerkleTree: Tree over the file's chunks.
+        """
+        self._ensure_file(filename)
+        entry = self.store.get_entry(filename)
+        if 'merkle' in entry:
+            return MerkleTree(entry['merkle'], entry['size'], entry['merkle_chunk_size'])
+
+        tree = MerkleTree.from_chunks(
+            self.store.iter_chunks(filename, chunk_size=MerkleTree.CHUNK_SIZE)
+        )
+        self.store.update_entry(filename, merkle=tree.leaves, merkle_chunk_size=tree.chunk_size)
+        return tree
+
+    def import_file(self, filename, content):
+        """
+        Store content obtained from another node so this node can serve it.
+
+        Args:
+            filename (str): Name of the file.
+            content (bytes): Verified file content.
+
+        Returns:
+            str: SHA256 hash of the stored content.
+        """
+        entry = self.store.put(filename, content)
+        self.get_merkle_tree(filename)
+        return entry['hash']
+
+    def prepare_files(self, filenames):
+        """
+        Generate and hash files (whole-file and per-chunk) in the background
+        so downloads never wait on it.
+
+        Args:
+            filenames (list): Files this node serves.
+
+        Returns:
+            list: Futures that complete once each file is stored.
+        """
+        executor = ThreadPoolExecutor(
+            max_workers=self.PREPARE_WORKERS, thread_name_prefix='file-prepare'
+        )
+        futures = [executor.submit(self.get_merkle_tree, f) for f in filenames]
+        executor.shutdown(wait=False)
+        for filename, future in zip(filenames, futures):
+            future.add_done_callback(
+                lambda done, name=filename: self._report_prepare_error(name, done)
+            )
+        self.prepare_futures.extend(futures)
+        return futures
+
+    def _report_prepare_error(self, filename, future):
+        """Log a failed background preparation; the file is generated on demand instead."""
+        error = future.exception()
+        if error is not None:
+            print(f"[ERROR] Failed to prepare '{filename}': {error}")
+
+    def wait_until_prepared(self, timeout=None):
+        """Block until background preparation has finished."""
+        for future in list(self.prepare_futures):
+            future.result(timeout=timeout)
+
+    def _ensure_file(self, filename):
+        """Generate a file once, even if several requests ask for it together."""
+        if self.store.contains(filename):
+            return
+
+        with self.lock:
+            file_lock = self.file_locks.setdefault(filename, threading.Lock())
+
+        with file_lock:
+            if not self.store.contains(filename):
                 self._generate_file(filename)
-        
-        return self.hashes[filename]
-    
+
+        # Once stored, later calls return above, so the lock is no longer needed
+        with self.lock:
+            self.file_locks.pop(filename, None)
+
+    def _file_seed(self, filename):
+        """Derive a stable PRNG seed from the node and filename."""
+        digest = hashlib.sha256(f"{self.node_id}:{filename}".encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big')
+
     def _generate_file(self, filename):
-        """Generate random file content between 2-10 MB."""
+        """Generate deterministic pseudo-random file content between 2-10 MB."""
+        rng = np.random.default_rng(self._file_seed(filename))
+
         # Size in bytes (2MB to 10MB)
-        size = random.randint(2 * 1024 * 1024, 10 * 1024 * 1024)
-        
-        # Generate random bytes
-        # Using os.urandom might be slow for 10MB, let's use a faster way or just random bytes
-        # For simulation, repeating a small pattern is faster but less "random".
-        # Let's use random.getrandbits for a seed and generate.
-        # Actually, os.urandom is fine for 10MB.
-        content = os.urandom(size)
-        
-        self.file_cache[filename] = content
-        self.hashes[filename] = self._calculate_hash(content)
-        
-        print(f"[FILE] Generated '{filename}': {size/1024/1024:.2f} MB, Hash: {self.hashes[filename]}")
+        size = int(rng.integers(2 * 1024 * 1024, 10 * 1024 * 1024, endpoint=True))
+
+        def chunks():
+            remaining = size
+            while remaining > 0:
+                n = min(self.GENERATION_CHUNK, remaining)
+                yield rng.bytes(n)
+                remaining -= n
+
+        # Written and hashed chunk by chunk, so only one chunk is ever in memory
+        entry = self.store.put_chunks(filename, chunks())
+
+        print(f"[FILE] Generated '{filename}': {size/1024/1024:.2f} MB, Hash: {entry['hash']}")
 
     def _calculate_hash(self, data):
         """Calculate SHA256 hash of data."""
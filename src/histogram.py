@@ -0,0 +1,176 @@
+"""
+Fixed-memory streaming histogram with logarithmic buckets.
+"""
+
+import math
+
+
+class LogHistogram:
+    """
+    Log-bucketed histogram in the spirit of HDR histograms.
+
+    Buckets grow geometrically, so any recorded value is reported within
+    `precision` relative error while memory stays fixed no matter how many
+    values are recorded. Count, sum, min and max are tracked exactly.
+    """
+
+    def __init__(self, min_value=0.01, max_value=3600000.0, precision=0.01):
+        """
+        Args:
+            min_value (float): Smallest value resolved; anything below lands in the zero bucket.
+            max_value (float): Largest value resolved; anything above is clamped into the top bucket.
+            precision (float): Relative width of each bucket (0.01 = 1%).
+        """
+        self.min_value = min_value
+        self.max_value = max_value
+        self.precision = precision
+        self.log_base = math.log1p(precision)
+        self.num_buckets = int(math.log(max_value / min_value) / self.log_base) + 1
+
+        self.counts = [0] * self.num_buckets
+        self.zero_count = 0
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = None
+        self.max = None
+
+    def _bucket(self, value):
+        """Index of the bucket holding value (value >= min_value)."""
+        index = int(math.log(value / self.min_value) / self.log_base)
+        return min(index, self.num_buckets - 1)
+
+    def _bucket_value(self, index):
+        """Value reported for a bucket: its upper bound."""
+        return self.min_value * math.exp((index + 1) * self.log_base)
+
+    def record(self, value):
+        """Add a value."""
+        if value < self.min_value:
+            self.zero_count += 1
+        else:
+            self.counts[self._bucket(value)] += 1
+
+        self.count += 1
+        self.total += value
+        self.total_sq += value * value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, pct):
+        """
+        Get the value at a percentile.
+
+        Args:
+            pct (float): Percentile in [0, 100].
+
+        Returns:
+            float: Value at the percentile, or None if nothing was recorded.
+        """
+        if not self.count:
+            return None
+
+        rank = max(1, math.ceil(pct / 100.0 * self.count))
+        seen = self.zero_count
+        if seen >= rank:
+            return self.min
+
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                # Never report outside what was actually observed
+                return max(self.min, min(self._bucket_value(index), self.max))
+        return self.max
+
+    def __len__(self):
+        """Number of recorded values."""
+        return self.count
+    
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    @property
+    def std_dev(self):
+        """Sample standard deviation."""
+        if self.count < 2:
+            return None
+        variance = (self.total_sq - self.total * self.total / self.count) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def summary(self):
+        """Count, mean, min, max and p50/p90/p99."""
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99)
+        }
+
+    def cdf(self):
+        """
+        Cumulative distribution over non-empty buckets.
+
+        Returns:
+            list: (value, fraction of recorded values <= value) pairs.
+        """
+        points = []
+        if not self.count:
+            return points
+        seen = self.zero_count
+        if seen:
+            points.append((self.min, seen / self.count))
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count:
+                seen += bucket_count
+                value = max(self.min, min(self._bucket_value(index), self.max))
+                points.append((value, seen / self.count))
+        return points
+
+    def merge(self, other):
+        """Add another histogram with the same bucket layout into this one."""
+        if (other.min_value, other.max_value, other.precision) != \
+                (self.min_value, self.max_value, self.precision):
+            raise ValueError("Cannot merge histograms with different bucket layouts")
+
+        for index, bucket_count in enumerate(other.counts):
+            self.counts[index] += bucket_count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def to_dict(self):
+        """Serializable form (only non-empty buckets are kept)."""
+        return {
+            'min_value': self.min_value,
+            'max_value': self.max_value,
+            'precision': self.precision,
+            'buckets': {str(i): c for i, c in enumerate(self.counts) if c},
+            'zero_count': self.zero_count,
+            'count': self.count,
+            'total': self.total,
+            'total_sq': self.total_sq,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a histogram from to_dict() output."""
+        hist = cls(data['min_value'], data['max_value'], data['precision'])
+        for index, bucket_count in data['buckets'].items():
+            hist.counts[int(index)] = bucket_count
+        hist.zero_count = data['zero_count']
+        hist.count = data['count']
+        hist.total = data['total']
+        hist.total_sq = data['total_sq']
+        hist.min = data['min']
+        hist.max = data['max']
+        return hist
@@ -0,0 +1,447 @@
+"""
+Vectorized aggregation of node logs for plot_stats.py.
+Node event logs are read in blocks into typed pandas columns, filtered with
+vectorized masks and processed in parallel, one worker per node file.
+aggregate_logs_incremental() keeps per-file byte offsets and histogram
+aggregates in a cache so repeated runs only parse newly appended rows.
+"""
+
+import csv
+import glob
+import hashlib
+import io
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from histogram import LogHistogram
+from protocol import MessageFormatter
+
+
+BLOCK_BYTES = 64 * 1024 * 1024  # Bytes parsed per read_csv call; bounds memory per worker
+HEAD_BYTES = 4096               # Prefix hashed to notice a log rewritten by a restarted node
+CACHE_VERSION = 2
+
+# Per-command traffic rows of a summary CSV; other commands were never counted separately
+COMMAND_METRIC = re.compile(r'(sent|received)_({})_(datagrams|bytes)'.format(
+    '|'.join(sorted(MessageFormatter.OVERLAY_COMMANDS | {'UNKNOWN'}))))
+
+# Only the columns the analysis needs, with compact types
+EVENT_DTYPES = {
+    'event_type': 'category',
+    'query': 'category',
+    'hops': 'float64',
+    'latency_ms': 'float64',
+    'size_bytes': 'float64',
+    'status': 'category'
+}
+
+SAMPLE_KEYS = ('latencies', 'hops', 'download_throughputs', 'download_times', 'fetch_times')
+
+# Bucket layouts (min_value, max_value, precision) used when samples are cached as histograms
+HISTOGRAM_LAYOUTS = {
+    'latencies': (0.01, 3600000.0, 0.01),         # ms
+    'hops': (1, 1000, 0.01),
+    'download_throughputs': (0.001, 1000000.0, 0.01),  # MB/s
+    'download_times': (0.001, 86400.0, 0.01),     # s
+    'fetch_times': (0.01, 3600000.0, 0.01)        # ms
+}
+
+
+def find_node_logs(log_dir):
+    """Node event logs, without the _summary.csv files the node_*.csv glob also matches."""
+    return sorted(path for path in glob.glob(os.path.join(log_dir, 'node_*.csv'))
+                  if not path.endswith('_summary.csv'))
+
+
+def _parse_block(block, header):
+    """Parse complete CSV lines (no header row) into a typed DataFrame."""
+    # Logs written before size_bytes/status existed lack those columns
+    columns = [c for c in EVENT_DTYPES if c in header]
+    dtypes = {c: EVENT_DTYPES[c] for c in columns}
+    try:
+        return pd.read_csv(io.BytesIO(block), header=None, names=header,
+                           usecols=columns, dtype=dtypes)
+    except ValueError:
+        # A malformed number somewhere: reread as text and coerce bad values to NaN
+        chunk = pd.read_csv(io.BytesIO(block), header=None, names=header,
+                            usecols=columns, dtype=str)
+        for column, dtype in dtypes.items():
+            if dtype == 'float64':
+                chunk[column] = pd.to_numeric(chunk[column], errors='coerce')
+        return chunk
+
+
+def read_event_blocks(log_file, offset=0, header=None, block_bytes=BLOCK_BYTES):
+    """
+    Read a node log from a byte offset in typed blocks.
+    Only complete lines are parsed, so a row still being written is left for
+    the next read.
+
+    Args:
+        log_file (str): Path to node_<id>.csv
+        offset (int): Byte offset of the first unread row (0 = start of file)
+        header (list): Column names; read from the file when offset is 0
+        block_bytes (int): Bytes parsed per block
+
+    Yields:
+        tuple: (DataFrame with the EVENT_DTYPES columns present, header,
+            byte offset just past the block)
+    """
+    with open(log_file, 'rb') as f:
+        if offset == 0:
+            line = f.readline()
+            if not line.endswith(b'\n'):
+                return
+            header = next(csv.reader([line.decode('utf-8')]))
+            offset = len(line)
+        f.seek(offset)
+
+        pending = b''
+        while True:
+            data = f.read(block_bytes)
+            if not data:
+                break
+            data = pending + data
+            end = data.rfind(b'\n') + 1
+            pending = data[end:]
+            if end:
+                offset += end
+                yield _parse_block(data[:end], header), header, offset
+
+
+def _new_parts():
+    return {key: [] for key in SAMPLE_KEYS}, set(), set()
+
+
+def _new_query_state():
+    # open_answered: whether the last query issued so far has an answer (None: no query yet)
+    return {'issued': 0, 'succeeded': 0, 'open_answered': None}
+
+
+def _count_queries(chunk, state):
+    """
+    Update query success counts from a chunk, in log order.
+    A query succeeds if it matched locally or any SEARCH_RESULT arrives before
+    the node issues its next query. The last query stays open across chunks.
+    """
+    event_type = chunk['event_type']
+    rows = chunk.loc[event_type.isin(['QUERY_ISSUED', 'SEARCH_RESULT'])]
+    if not len(rows):
+        return
+    issued = (rows['event_type'] == 'QUERY_ISSUED').to_numpy()
+    answered = ~issued
+    if 'status' in rows:
+        answered |= (rows['status'] == 'LOCAL_HIT').to_numpy()
+    # Group 0 is the query left open by earlier chunks, 1..n the ones issued here
+    group = np.cumsum(issued)
+
+    if state['open_answered'] is False and answered[group == 0].any():
+        state['succeeded'] += 1
+        state['open_answered'] = True
+
+    new_queries = int(group[-1])
+    if new_queries:
+        answered_groups = np.unique(group[answered & (group > 0)])
+        state['issued'] += new_queries
+        state['succeeded'] += len(answered_groups)
+        state['open_answered'] = bool(len(answered_groups) and answered_groups[-1] == new_queries)
+
+
+def _extract(chunk, parts, hosted, replicas, queries):
+    """
+    Append one chunk's samples to parts, its hosted/replicated filenames to
+    the sets and its query outcomes to the query state.
+    """
+    event_type = chunk['event_type']
+    _count_queries(chunk, queries)
+
+    search = chunk.loc[event_type == 'SEARCH_RESULT', ['latency_ms', 'hops']].dropna()
+    parts['latencies'].append(search['latency_ms'].to_numpy())
+    parts['hops'].append(search['hops'].to_numpy(dtype=np.int64))
+
+    if 'size_bytes' in chunk:
+        downloads = chunk.loc[event_type == 'DOWNLOAD_RESULT', ['latency_ms', 'size_bytes']].dropna()
+        duration_s = downloads['latency_ms'].to_numpy() / 1000
+        size_mb = downloads['size_bytes'].to_numpy() / (1024 * 1024)
+        parts['download_times'].append(duration_s)
+        moved = (duration_s > 0) & (size_mb > 0)
+        parts['download_throughputs'].append(size_mb[moved] / duration_s[moved])
+
+    if 'status' in chunk:
+        fetches = chunk.loc[(event_type == 'FETCH_RESULT') & (chunk['status'] == 'PASSED'), 'latency_ms']
+        parts['fetch_times'].append(fetches.dropna().to_numpy())
+
+    if 'query' in chunk:
+        hosted.update(chunk.loc[event_type == 'FILE_HOSTED', 'query'].dropna().unique())
+        replicas.update(chunk.loc[event_type == 'REPLICA_ADDED', 'query'].dropna().unique())
+
+
+def aggregate_node_log(log_file, block_bytes=BLOCK_BYTES):
+    """
+    Extract the samples plot_stats needs from one node log.
+
+    Returns:
+        dict: NumPy arrays for SAMPLE_KEYS plus 'hosted' and 'replicas'
+            (sets of filenames hosted at startup / added later) and 'queries'
+            (issued / succeeded counts).
+    """
+    parts, hosted, replicas = _new_parts()
+    queries = _new_query_state()
+    for chunk, _, _ in read_event_blocks(log_file, block_bytes=block_bytes):
+        _extract(chunk, parts, hosted, replicas, queries)
+
+    result = {key: np.concatenate(arrays) if arrays else np.empty(0) for key, arrays in parts.items()}
+    result['hosted'] = hosted
+    result['replicas'] = replicas
+    result['queries'] = queries
+    return result
+
+
+def record_array(histogram, values):
+    """Record a NumPy array into a LogHistogram with vectorized bucketing."""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return
+    small = values < histogram.min_value
+    resolved = values[~small]
+    if len(resolved):
+        index = (np.log(resolved / histogram.min_value) / histogram.log_base).astype(np.int64)
+        index = np.minimum(index, histogram.num_buckets - 1)
+        for bucket, count in zip(*np.unique(index, return_counts=True)):
+            histogram.counts[bucket] += int(count)
+
+    low, high = float(values.min()), float(values.max())
+    histogram.zero_count += int(small.sum())
+    histogram.count += len(values)
+    histogram.total += float(values.sum())
+    histogram.total_sq += float(np.dot(values, values))
+    histogram.min = low if histogram.min is None else min(histogram.min, low)
+    histogram.max = high if histogram.max is None else max(histogram.max, high)
+
+
+def _head_hash(log_file, length):
+    with open(log_file, 'rb') as f:
+        return hashlib.sha1(f.read(length)).hexdigest()
+
+
+def _empty_entry():
+    return {
+        'offset': 0,
+        'header': None,
+        'head_len': 0,
+        'head_hash': None,
+        'histograms': {key: LogHistogram(*HISTOGRAM_LAYOUTS[key]).to_dict() for key in SAMPLE_KEYS},
+        'hosted': [],
+        'replicas': [],
+        'queries': _new_query_state()
+    }
+
+
+def update_node_entry(log_file, entry=None, block_bytes=BLOCK_BYTES):
+    """
+    Bring one node log's cached aggregates up to date.
+    Only bytes past the cached offset are parsed; a log that shrank or whose
+    first bytes changed (the node restarted and rewrote it) is reparsed.
+
+    Args:
+        log_file (str): Path to node_<id>.csv
+        entry (dict): Cache entry from a previous run, or None
+
+    Returns:
+        tuple: (updated entry, bytes parsed)
+    """
+    size = os.path.getsize(log_file)
+    if (entry is None or size < entry['offset'] or
+            _head_hash(log_file, entry['head_len']) != entry['head_hash']):
+        entry = _empty_entry()
+    start = entry['offset']
+    if size == start:
+        return entry, 0
+
+    histograms = {key: LogHistogram.from_dict(data) for key, data in entry['histograms'].items()}
+    hosted = set(entry['hosted'])
+    replicas = set(entry['replicas'])
+    for chunk, header, offset in read_event_blocks(log_file, entry['offset'], entry['header'], block_bytes):
+        parts, _, _ = _new_parts()
+        _extract(chunk, parts, hosted, replicas, entry['queries'])
+        for key, arrays in parts.items():
+            for values in arrays:
+                record_array(histograms[key], values)
+        entry['header'] = header
+        entry['offset'] = offset
+
+    entry['histograms'] = {key: hist.to_dict() for key, hist in histograms.items()}
+    entry['hosted'] = sorted(hosted)
+    entry['replicas'] = sorted(replicas)
+    entry['head_len'] = min(entry['offset'], HEAD_BYTES)
+    entry['head_hash'] = _head_hash(log_file, entry['head_len'])
+    return entry, entry['offset'] - start
+
+
+def read_summaries(log_dir):
+    """
+    Read the per-node summary CSVs (a few dozen rows each).
+
+    Returns:
+        dict: messages_per_node, bytes_per_node, uploads_per_node lists and
+            command_traffic {(direction, command): {'datagrams': n, 'bytes': n}}.
+    """
+    summary = {
+        'messages_per_node': [],
+        'bytes_per_node': [],
+        'uploads_per_node': [],
+        'command_traffic': {}
+    }
+    for summary_file in sorted(glob.glob(os.path.join(log_dir, 'node_*_summary.csv'))):
+        try:
+            msgs_sent = 0
+            msgs_received = 0
+            uploads = None
+            node_bytes = 0
+            with open(summary_file, 'r') as f:
+                reader = csv.DictReader(f)
+                for row in reader:
+                    if row['metric'] == 'messages_sent':
+                        msgs_sent = int(row['value'])
+                    elif row['metric'] == 'messages_received':
+                        msgs_received = int(row['value'])
+                    elif row['metric'] == 'uploads_served':
+                        uploads = int(row['value'])
+                    elif row['metric'] in ('bytes_sent', 'bytes_received'):
+                        node_bytes += int(row['value'])
+                    else:
+                        # e.g. sent_SER_bytes -> ('sent', 'SER'), 'bytes'
+                        match = COMMAND_METRIC.fullmatch(row['metric'])
+                        if match:
+                            direction, command, unit = match.groups()
+                            entry = summary['command_traffic'].setdefault(
+                                (direction, command), {'datagrams': 0, 'bytes': 0})
+                            entry[unit] += int(row['value'])
+            summary['messages_per_node'].append(msgs_sent + msgs_received)
+            summary['bytes_per_node'].append(node_bytes)
+            if uploads is not None:
+                summary['uploads_per_node'].append(uploads)
+        except Exception as e:
+            print(f"Error reading {summary_file}: {e}")
+    return summary
+
+
+def _run_per_file(fn, log_files, extra_args, workers):
+    """Apply fn(log_file, *extra) to each file, in worker processes when worthwhile."""
+    workers = min(workers or os.cpu_count() or 1, max(len(log_files), 1))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(fn, log_files, *zip(*extra_args)))
+    return [fn(path, *extra) for path, extra in zip(log_files, extra_args)]
+
+
+def _holders(log_files, hosted_lists, replica_lists):
+    initial_holders = {}  # filename -> node logs hosting it at startup
+    replica_holders = {}  # filename -> node logs hosting it at the end
+    for log_file, hosted, replicas in zip(log_files, hosted_lists, replica_lists):
+        for filename in hosted:
+            initial_holders.setdefault(filename, set()).add(log_file)
+            replica_holders.setdefault(filename, set()).add(log_file)
+        for filename in replicas:
+            replica_holders.setdefault(filename, set()).add(log_file)
+    return initial_holders, replica_holders
+
+
+def aggregate_logs(log_dir='logs', workers=None, block_bytes=BLOCK_BYTES):
+    """
+    Aggregate every node's logs.
+
+    Args:
+        log_dir (str): Directory with node_*.csv logs
+        workers (int): Worker processes (default: one per CPU; 1 runs inline)
+        block_bytes (int): Bytes parsed per read_csv call
+
+    Returns:
+        dict: NumPy arrays for SAMPLE_KEYS, initial_holders/replica_holders
+            ({filename: set of log files}), queries_issued/queries_succeeded
+            and the read_summaries() fields.
+    """
+    log_files = find_node_logs(log_dir)
+    partials = _run_per_file(aggregate_node_log, log_files, [(block_bytes,)] * len(log_files), workers)
+
+    result = {
+        key: np.concatenate([p[key] for p in partials]) if partials else np.empty(0)
+        for key in SAMPLE_KEYS
+    }
+    result['initial_holders'], result['replica_holders'] = _holders(
+        log_files, [p['hosted'] for p in partials], [p['replicas'] for p in partials])
+    result['queries_issued'] = sum(p['queries']['issued'] for p in partials)
+    result['queries_succeeded'] = sum(p['queries']['succeeded'] for p in partials)
+    result.update(read_summaries(log_dir))
+    return result
+
+
+def aggregate_logs_incremental(log_dir='logs', cache_file=None, workers=None, block_bytes=BLOCK_BYTES):
+    """
+    Aggregate every node's logs, parsing only rows appended since the last run.
+
+    Samples are kept as LogHistograms (1% relative precision; count, sum, min
+    and max exact) so the cache stays small however long the logs grow.
+
+    Args:
+        log_dir (str): Directory with node_*.csv logs
+        cache_file (str): Cache path (default: <log_dir>/.plot_stats_cache.json)
+        workers (int): Worker processes (default: one per CPU; 1 runs inline)
+        block_bytes (int): Bytes parsed per read_csv call
+
+    Returns:
+        dict: LogHistograms for SAMPLE_KEYS, the other aggregate_logs() fields,
+            and 'parsed_bytes' / 'updated_files' for this run.
+    """
+    cache_file = cache_file or os.path.join(log_dir, '.plot_stats_cache.json')
+    cache = {'version': CACHE_VERSION, 'files': {}}
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file, 'r') as f:
+                loaded = json.load(f)
+            if loaded.get('version') == CACHE_VERSION:
+                cache = loaded
+        except (OSError, ValueError) as e:
+            print(f"[CACHE] Ignoring unreadable cache {cache_file}: {e}")
+
+    log_files = find_node_logs(log_dir)
+    names = [os.path.basename(path) for path in log_files]
+    updates = [(cache['files'].get(name), 0) for name in names]
+    # Only logs that grew or were rewritten go to the workers
+    stale = [i for i, (path, (entry, _)) in enumerate(zip(log_files, updates))
+             if entry is None or os.path.getsize(path) != entry['offset'] or
+             _head_hash(path, entry['head_len']) != entry['head_hash']]
+    refreshed = _run_per_file(
+        update_node_entry, [log_files[i] for i in stale],
+        [(updates[i][0], block_bytes) for i in stale], workers
+    )
+    for i, update in zip(stale, refreshed):
+        updates[i] = update
+
+    # Logs that disappeared drop out of the cache
+    files = {name: entry for name, (entry, _) in zip(names, updates)}
+    if stale or files.keys() != cache['files'].keys():
+        cache['files'] = files
+        tmp_file = cache_file + '.tmp'
+        with open(tmp_file, 'w') as f:
+            # json.dumps uses the C encoder; json.dump streams through the slow one
+            f.write(json.dumps(cache))
+        os.replace(tmp_file, cache_file)
+
+    result = {key: LogHistogram(*HISTOGRAM_LAYOUTS[key]) for key in SAMPLE_KEYS}
+    for entry, _ in updates:
+        for key in SAMPLE_KEYS:
+            result[key].merge(LogHistogram.from_dict(entry['histograms'][key]))
+    result['initial_holders'], result['replica_holders'] = _holders(
+        log_files, [e['hosted'] for e, _ in updates], [e['replicas'] for e, _ in updates])
+    result['queries_issued'] = sum(e['queries']['issued'] for e, _ in updates)
+    result['queries_succeeded'] = sum(e['queries']['succeeded'] for e, _ in updates)
+    result['parsed_bytes'] = sum(parsed for _, parsed in updates)
+    result['updated_files'] = sum(1 for _, parsed in updates if parsed)
+    result.update(read_summaries(log_dir))
+    return result
@@ -0,0 +1,104 @@
+"""
+Merkle tree over fixed-size file chunks.
+Lets downloaders verify each chunk as it arrives instead of only the whole file.
+"""
+
+import hashlib
+
+
+class MerkleTree:
+    """Binary SHA256 Merkle tree whose leaves are the hashes of file chunks."""
+
+    CHUNK_SIZE = 256 * 1024
+
+    def __init__(self, leaves, size, chunk_size=CHUNK_SIZE):
+        """
+        Args:
+            leaves (list): Hex SHA256 leaf hashes, one per chunk.
+            size (int): Total file size in bytes.
+            chunk_size (int): Bytes per chunk (the last chunk may be shorter).
+        """
+        self.leaves = list(leaves)
+        self.size = size
+        self.chunk_size = chunk_size
+        self.root = self.compute_root(self.leaves)
+
+    @staticmethod
+    def hash_leaf(data):
+        """Hash a chunk. Leaves are domain-separated from interior nodes."""
+        return hashlib.sha256(b'\x00' + data).hexdigest()
+
+    @staticmethod
+    def hash_node(left, right):
+        """Hash two child hashes into their parent."""
+        return hashlib.sha256(b'\x01' + bytes.fromhex(left) + bytes.fromhex(right)).hexdigest()
+
+    @classmethod
+    def compute_root(cls, leaves):
+        """Fold a list of leaf hashes up to the root hash."""
+        if not leaves:
+            return cls.hash_leaf(b'')
+
+        level = list(leaves)
+        while len(level) > 1:
+            parents = []
+            for i in range(0, len(level) - 1, 2):
+                parents.append(cls.hash_node(level[i], level[i + 1]))
+            if len(level) % 2 == 1:
+                # Odd node out is promoted unchanged
+                parents.append(level[-1])
+            level = parents
+        return level[0]
+
+    @classmethod
+    def from_chunks(cls, chunks, chunk_size=CHUNK_SIZE):
+        """
+        Build a tree from an iterable of chunks.
+
+        Args:
+            chunks (iterable): bytes objects of exactly chunk_size (except the last).
+            chunk_size (int): Bytes per chunk.
+
+        Returns:
+            MerkleTree: Tree over the given chunks.
+        """
+        leaves = []
+        size = 0
+        for chunk in chunks:
+            leaves.append(cls.hash_leaf(chunk))
+            size += len(chunk)
+        return cls(leaves, size, chunk_size)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a tree from its dict form, rejecting an inconsistent root."""
+        tree = cls(data['leaves'], data['size'], data['chunk_size'])
+        if 'root' in data and data['root'] != tree.root:
+            raise ValueError("Merkle root does not match leaves")
+        return tree
+
+    def to_dict(self):
+        """Serializable form of the tree."""
+        return {
+            'size': self.size,
+            'chunk_size': self.chunk_size,
+            'root': self.root,
+            'leaves': self.leaves
+        }
+
+    @property
+    def num_chunks(self):
+        """Number of chunks in the file."""
+        return len(self.leaves)
+
+    def chunk_range(self, index):
+        """Byte range [start, end) covered by a chunk."""
+        start = index * self.chunk_size
+        return start, min(start + self.chunk_size, self.size)
+
+    def verify_chunk(self, index, data):
+        """Check a chunk against its leaf hash."""
+        if index < 0 or index >= len(self.leaves):
+            return False
+        start, end = self.chunk_range(index)
+        return len(data) == end - start and self.hash_leaf(data) == self.leaves[index]
@@ -0,0 +1,112 @@
+"""
+Prometheus text exposition of node metrics.
+"""
+
+
+class MetricsWriter:
+    """Builds a Prometheus text-format (version 0.0.4) page."""
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self, base_labels=None):
+        self.base_labels = base_labels or {}
+        self.lines = []
+
+    def _labels(self, labels):
+        merged = dict(self.base_labels)
+        merged.update(labels or {})
+        if not merged:
+            return ''
+        parts = []
+        for key, value in merged.items():
+            value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            parts.append(f'{key}="{value}"')
+        return '{' + ','.join(parts) + '}'
+
+    def header(self, name, metric_type, help_text):
+        """Write the HELP and TYPE lines of a metric family."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {metric_type}")
+
+    def sample(self, name, value, labels=None):
+        """Write one sample line."""
+        if value is None:
+            value = 'NaN'
+        self.lines.append(f"{name}{self._labels(labels)} {value}")
+
+    def metric(self, name, metric_type, help_text, value, labels=None):
+        """Write a single-sample metric family."""
+        self.header(name, metric_type, help_text)
+        self.sample(name, value, labels)
+
+    def summary(self, name, help_text, histogram, quantiles=(0.5, 0.9, 0.99)):
+        """Write a LogHistogram as a Prometheus summary."""
+        self.header(name, 'summary', help_text)
+        for q in quantiles:
+            self.sample(name, histogram.percentile(q * 100), {'quantile': str(q)})
+        self.sample(f"{name}_sum", histogram.total)
+        self.sample(f"{name}_count", histogram.count)
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def render_node_metrics(node):
+    """
+    Render all metrics of a node.
+
+    Args:
+        node: Running Node instance
+
+    Returns:
+        str: Page in Prometheus text exposition format
+    """
+    writer = MetricsWriter({'node': f"{node.ip}:{node.port}"})
+    stats = node.statistics.get_stats()
+
+    counters = [
+        ('queries_received', 'Search queries received'),
+        ('queries_forwarded', 'Search queries forwarded'),
+        ('queries_answered', 'Search queries answered from local files'),
+        ('messages_sent', 'UDP messages sent'),
+        ('messages_received', 'UDP messages received'),
+        ('uploads_served', 'File downloads admitted and served'),
+        ('replicas_acquired', 'Downloaded files added to the served set'),
+    ]
+    for key, help_text in counters:
+        writer.metric(f"overlay_{key}_total", 'counter', help_text, stats[key])
+
+    traffic = sorted(node.statistics.get_command_traffic().items())
+    writer.header('overlay_messages_total', 'counter', 'UDP messages by direction and command')
+    for (direction, command), (datagrams, _) in traffic:
+        writer.sample('overlay_messages_total', datagrams, {'direction': direction, 'command': command})
+    writer.header('overlay_bytes_total', 'counter', 'UDP bytes by direction and command')
+    for (direction, command), (_, size) in traffic:
+        writer.sample('overlay_bytes_total', size, {'direction': direction, 'command': command})
+
+    writer.metric('overlay_routing_table_size', 'gauge', 'Neighbors in the routing table',
+                  node.routing_table.get_neighbor_count())
+    writer.metric('overlay_pending_queries', 'gauge', 'Searches still collecting responses',
+                  node.search_engine.get_pending_count())
+    writer.metric('overlay_files_hosted', 'gauge', 'Files this node serves', len(node.files))
+    writer.metric('overlay_active_downloads', 'gauge', 'Download jobs queued or running',
+                  node.download_manager.active_count())
+
+    uploads = node.upload_scheduler.get_stats()
+    writer.metric('overlay_upload_slots_in_use', 'gauge', 'Upload slots transferring',
+                  uploads['upload_slots_in_use'])
+    writer.metric('overlay_upload_slots_max', 'gauge', 'Configured upload slots',
+                  uploads['upload_slots_max'])
+    writer.metric('overlay_upload_queue_length', 'gauge', 'Downloads waiting for an upload slot',
+                  uploads['upload_queue_length'])
+    writer.metric('overlay_uploads_rejected_total', 'counter', 'Downloads turned away with 503',
+                  uploads['uploads_rejected'])
+    writer.metric('overlay_upload_queue_wait_max_ms', 'gauge', 'Longest wait for an upload slot',
+                  uploads['upload_queue_wait_max_ms'])
+
+    histograms = node.statistics.get_histograms()
+    writer.summary('overlay_search_latency_ms', 'Search response latency in milliseconds',
+                   histograms['latency_ms'])
+    writer.summary('overlay_search_hops', 'Hops to search responders', histograms['hops'])
+
+    return writer.render()
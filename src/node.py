@@ -2,19 +2,28 @@
 Main node implementation for distributed content searching system.
 """
 
-import socket
 import threading
 import random
 import sys
 import argparse
+import hashlib
 import time
+import os
 from protocol import MessageFormatter, MessageParser
 from routing_table import RoutingTable
 from search_engine import SearchEngine
 from statistics import Statistics
 from bootstrap_manager import BootstrapManager
 from file_manager import FileManager
-from flask import Flask, make_response
+from merkle import MerkleTree
+from upload_scheduler import UploadScheduler
+from download_manager import DownloadManager
+from source_selector import SourceSelector
+from metrics import MetricsWriter, render_node_metrics
+from query_tracer import QueryTracer
+from profiler import SamplingProfiler
+from transport import UDPTransport
+from flask import Flask, Response, make_response, request, jsonify
 import requests
 import logging
 import io
@@ -23,27 +32,49 @@ import io
 class Node:
     """Main node class orchestrating all functionality."""
     
-    def __init__(self, ip, port, username, bs_ip, bs_port):
+    FETCH_WINDOW = 2.0           # Seconds to collect SEROK responses before fetching
+    DOWNLOAD_STALL_TIMEOUT = 10  # Seconds without data before a source is abandoned
+    
+    def __init__(self, ip, port, username, bs_ip, bs_port,
+                 upload_slots=4, upload_queue=16, upload_rate=0, reshare=True, trace=False,
+                 bs_endpoints=None, transport=None, statistics=None, clock=time.time,
+                 storage=True, bootstrap=True):
         self.ip = ip
         self.port = port
         self.username = username
         self.bs_ip = bs_ip
         self.bs_port = bs_port
         
-        # Components
+        # Components (a simulator passes a shared Statistics and a virtual clock,
+        # and runs without file storage or a bootstrap client)
         self.routing_table = RoutingTable()
-        self.search_engine = SearchEngine(self)
-        self.statistics = Statistics(f"{ip}_{port}")
-        self.bootstrap_manager = BootstrapManager(bs_ip, bs_port, ip, port, username)
-        self.file_manager = FileManager()
+        self.search_engine = SearchEngine(self, clock=clock)
+        self.statistics = statistics or Statistics(f"{ip}_{port}")
+        self.bootstrap_manager = None
+        if bootstrap:
+            self.bootstrap_manager = BootstrapManager(bs_ip, bs_port, ip, port, username, endpoints=bs_endpoints)
+        self.file_manager = None
+        if storage:
+            self.file_manager = FileManager(os.path.join('storage', f"{ip}_{port}"), f"{ip}_{port}")
+        self.upload_scheduler = UploadScheduler(upload_slots, upload_queue, total_rate=upload_rate)
+        self.download_manager = DownloadManager(self)
+        self.source_selector = SourceSelector()
+        self.tracer = QueryTracer(f"{ip}_{port}", self.statistics.log_dir)
+        self.search_engine.tracer = self.tracer
+        if trace:
+            self.tracer.start()
+        self.profiler = SamplingProfiler(f"{ip}_{port}", self.statistics.log_dir)
         
-        # UDP socket
-        self.sock = None
+        # Overlay datagrams (UDP unless a simulator supplies an in-memory transport)
+        self.transport = transport or UDPTransport()
         self.running = False
-        self.listener_thread = None
+        self.lease_stop = threading.Event()
+        self.lease_thread = None
         
         # Files
         self.files = []
+        self.files_lock = threading.Lock()
+        self.reshare = reshare  # Serve files after a verified download
         
         print(f"[NODE] Initialized at {ip}:{port}")
     
@@ -61,25 +92,30 @@ class Node:
             print(f"[FILES] Loaded {len(self.files)} files:")
             for f in self.files:
                 print(f"  - {f}")
+                self.statistics.log_event(event_type='FILE_HOSTED', query=f)
+            
+            # Generate and hash content up front instead of on first download
+            if self.file_manager:
+                self.file_manager.prepare_files(self.files)
                 
         except Exception as e:
             print(f"[ERROR] Failed to load files: {e}")
     
-    def start(self):
-        """Start the node."""
+    def start(self, rest_api=True):
+        """
+        Start the node.
+        
+        Args:
+            rest_api (bool): Also serve the file transfer REST API
+        """
         try:
-            # Create UDP socket
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.sock.bind((self.ip, self.port))
+            self.transport.open((self.ip, self.port), self._receive)
             self.running = True
             
-            # Start listener thread
-            self.listener_thread = threading.Thread(target=self._listen, daemon=True)
-            self.listener_thread.start()
-            
             # Start REST API thread
-            self.rest_thread = threading.Thread(target=self._start_rest_api, daemon=True)
-            self.rest_thread.start()
+            if rest_api:
+                self.rest_thread = threading.Thread(target=self._start_rest_api, daemon=True)
+                self.rest_thread.start()
             
             print(f"[NODE] Started listening on {self.ip}:{self.port}")
             return True
@@ -88,30 +124,13 @@ class Node:
             print(f"[ERROR] Failed to start node: {e}")
             return False
     
-    def _listen(self):
-        """Listen for incoming UDP messages."""
-        self.sock.settimeout(1.0)
-        
-        while self.running:
-            try:
-                data, addr = self.sock.recvfrom(65535)
-                self.statistics.record_message_received()
-                
-                # Process message in separate thread to avoid blocking
-                threading.Thread(
-                    target=self._handle_message,
-                    args=(data, addr),
-                    daemon=True
-                ).start()
-                
-            except socket.timeout:
-                continue
-            except Exception as e:
-                if self.running:
-                    print(f"[ERROR] Listener error: {e}")
+    def _receive(self, data, addr):
+        """Account and handle one datagram from the transport."""
+        self.statistics.record_message_received(MessageFormatter.get_command(data), len(data))
+        self._handle_message(data, addr)
 
-    def _start_rest_api(self):
-        """Start Flask REST API for file transfer."""
+    def _create_rest_app(self):
+        """Build the Flask app serving downloads, metrics and profiling."""
         app = Flask(__name__)
         
         # Silence Flask logs
@@ -120,21 +139,107 @@ class Node:
         
         @app.route('/download/<filename>', methods=['GET'])
         def download_file(filename):
-            # Check if we have this file
-            if filename not in self.files:
+            # Check if we have this file (a node without storage serves none)
+            if not self.file_manager or filename not in self.files:
                 return "File not found", 404
                 
+            slot = None
             try:
-                content = self.file_manager.get_file_content(filename)
                 hash_val = self.file_manager.get_file_hash(filename)
+                size = self.file_manager.get_file_size(filename)
+                start, end, status = 0, size, 200
                 
-                response = make_response(content)
-                response.headers['Content-Type'] = 'application/octet-stream'
+                # Byte ranges let downloaders re-fetch only corrupt chunks
+                range_header = request.headers.get('Range')
+                if range_header:
+                    byte_range = self._parse_range(range_header, size)
+                    if byte_range is None:
+                        return "Invalid range", 416
+                    start, end = byte_range
+                    status = 206
+                
+                # Admission control: turn the request away rather than overload the uplink
+                slot = self.upload_scheduler.acquire()
+                if slot is None:
+                    response = make_response("Upload slots busy, try another source", 503)
+                    response.headers['Retry-After'] = str(self.upload_scheduler.retry_after())
+                    return response
+                self.statistics.record_upload_served()
+                
+                # Stream from the on-disk store instead of building the body in memory
+                response = Response(
+                    self.upload_scheduler.stream(
+                        slot, self.file_manager.iter_file_chunks(filename, start, end)
+                    ),
+                    status=status,
+                    mimetype='application/octet-stream'
+                )
+                # The body's finally never runs for HEAD or a client gone before the first chunk
+                response.call_on_close(lambda: self.upload_scheduler.release(slot))
+                response.headers['Content-Length'] = str(end - start)
+                response.headers['Accept-Ranges'] = 'bytes'
                 response.headers['X-File-Hash'] = hash_val
+                if status == 206:
+                    response.headers['Content-Range'] = f"bytes {start}-{end - 1}/{size}"
                 return response
             except Exception as e:
+                if slot is not None:
+                    self.upload_scheduler.release(slot)
                 return str(e), 500
         
+        @app.route('/metrics', methods=['GET'])
+        def metrics():
+            return Response(render_node_metrics(self), mimetype=MetricsWriter.CONTENT_TYPE)
+        
+        @app.route('/profile', methods=['GET'])
+        def profile_status():
+            return jsonify(self.profiler.get_status())
+        
+        @app.route('/profile/start', methods=['POST'])
+        def profile_start():
+            try:
+                duration = float(request.args['duration']) if 'duration' in request.args else None
+                interval_ms = float(request.args['interval_ms']) if 'interval_ms' in request.args else None
+                started = self.profiler.start(duration, interval_ms / 1000 if interval_ms is not None else None)
+            except ValueError:
+                return "duration and interval_ms must be positive numbers", 400
+            status = self.profiler.get_status()
+            status['started'] = started
+            return jsonify(status), 200 if started else 409
+        
+        @app.route('/profile/stop', methods=['POST'])
+        def profile_stop():
+            stopped = self.profiler.stop()
+            status = self.profiler.get_status()
+            status['stopped'] = stopped
+            return jsonify(status), 200 if stopped else 409
+        
+        @app.route('/profile/dump', methods=['POST'])
+        def profile_dump():
+            return jsonify(self.profiler.dump())
+        
+        @app.route('/load', methods=['GET'])
+        def upload_load():
+            return jsonify(self.upload_scheduler.get_stats())
+        
+        @app.route('/merkle/<filename>', methods=['GET'])
+        def merkle_tree(filename):
+            if not self.file_manager or filename not in self.files:
+                return "File not found", 404
+            
+            try:
+                tree = self.file_manager.get_merkle_tree(filename)
+                data = tree.to_dict()
+                data['hash'] = self.file_manager.get_file_hash(filename)
+                return jsonify(data)
+            except Exception as e:
+                return str(e), 500
+        
+        return app
+    
+    def _start_rest_api(self):
+        """Start Flask REST API for file transfer."""
+        app = self._create_rest_app()
         try:
             # Run Flask server
             # Note: In a real scenario, we might want to handle port conflicts if UDP and TCP ports must be different.
@@ -143,6 +248,33 @@ class Node:
         except Exception as e:
             print(f"[ERROR] Failed to start REST API: {e}")
     
+    def _parse_range(self, header, size):
+        """
+        Parse a single 'bytes=start-end' Range header.
+        
+        Returns:
+            tuple: (start, end) with end exclusive, or None if unsatisfiable.
+        """
+        try:
+            unit, spec = header.split('=', 1)
+            if unit.strip() != 'bytes' or ',' in spec:
+                return None
+            first, last = spec.strip().split('-', 1)
+            if first:
+                start = int(first)
+                end = int(last) + 1 if last else size
+            else:
+                # Suffix range: last N bytes
+                start = max(size - int(last), 0)
+                end = size
+        except ValueError:
+            return None
+        
+        end = min(end, size)
+        if start >= end:
+            return None
+        return start, end
+    
     def _handle_message(self, data, addr):
         """Handle incoming message."""
         try:
@@ -168,6 +300,12 @@ class Node:
         except Exception as e:
             print(f"[ERROR] Message handling error: {e}")
     
+    def _send(self, message, addr):
+        """Send a datagram and account its command and size."""
+        data = message.encode('utf-8')
+        self.transport.send(data, addr)
+        self.statistics.record_message_sent(MessageFormatter.get_command(data), len(data))
+    
     def _handle_join(self, tokens, addr):
         """Handle JOIN message."""
         parsed = MessageParser.parse_join(tokens)
@@ -181,8 +319,7 @@ class Node:
             
             # Send JOINOK
             response = MessageFormatter.create_joinok_message(0)
-            self.sock.sendto(response.encode('utf-8'), (ip, port))
-            self.statistics.record_message_sent()
+            self._send(response, (ip, port))
     
     def _handle_joinok(self, tokens, addr):
         """Handle JOINOK response."""
@@ -206,8 +343,7 @@ class Node:
             
             # Send LEAVEOK
             response = MessageFormatter.create_leaveok_message(0)
-            self.sock.sendto(response.encode('utf-8'), (ip, port))
-            self.statistics.record_message_sent()
+            self._send(response, (ip, port))
     
     def _handle_search(self, tokens, addr):
         """Handle SER (search) message."""
@@ -235,6 +371,9 @@ class Node:
     
     def register_with_bootstrap(self):
         """Register with bootstrap server and join network."""
+        if not self.bootstrap_manager:
+            print("[BOOTSTRAP] No bootstrap client configured")
+            return False
         nodes = self.bootstrap_manager.connect_to_bs()
         
         if nodes is None:
@@ -247,14 +386,32 @@ class Node:
             
             time.sleep(0.5)  # Give time for JOINOK responses
         
+        self._start_lease_renewal()
         return True
     
+    def _start_lease_renewal(self):
+        """Keep the bootstrap registration alive so crashed nodes age out but we don't."""
+        if not self.bootstrap_manager or (self.lease_thread and self.lease_thread.is_alive()):
+            return
+        self.lease_stop.clear()
+        self.lease_thread = threading.Thread(target=self._renew_lease_loop, daemon=True)
+        self.lease_thread.start()
+    
+    def _renew_lease_loop(self):
+        while not self.lease_stop.wait(self.bootstrap_manager.RENEW_INTERVAL):
+            if self.bootstrap_manager.renew() is False:
+                # The server dropped us (missed renewals or restart): register again
+                print("[BOOTSTRAP] Lease lost, re-registering")
+                nodes = self.bootstrap_manager.connect_to_bs()
+                if nodes and not self.routing_table.get_neighbors():
+                    for node in nodes:
+                        self.send_join(node.ip, node.port)
+    
     def send_join(self, target_ip, target_port):
         """Send JOIN message to another node."""
         try:
             message = MessageFormatter.create_join_message(self.ip, self.port)
-            self.sock.sendto(message.encode('utf-8'), (target_ip, target_port))
-            self.statistics.record_message_sent()
+            self._send(message, (target_ip, target_port))
             print(f"[JOIN] Sent to {target_ip}:{target_port}")
         except Exception as e:
             print(f"[ERROR] Failed to send JOIN: {e}")
@@ -263,8 +420,7 @@ class Node:
         """Send LEAVE message to a neighbor."""
         try:
             message = MessageFormatter.create_leave_message(self.ip, self.port)
-            self.sock.sendto(message.encode('utf-8'), (target_ip, target_port))
-            self.statistics.record_message_sent()
+            self._send(message, (target_ip, target_port))
         except Exception as e:
             print(f"[ERROR] Failed to send LEAVE: {e}")
     
@@ -272,8 +428,7 @@ class Node:
         """Forward search request to neighbor."""
         try:
             message = MessageFormatter.create_ser_message(orig_ip, orig_port, filename, hops)
-            self.sock.sendto(message.encode('utf-8'), (target_ip, target_port))
-            self.statistics.record_message_sent()
+            self._send(message, (target_ip, target_port))
         except Exception as e:
             print(f"[ERROR] Failed to forward search: {e}")
     
@@ -283,8 +438,7 @@ class Node:
             message = MessageFormatter.create_serok_message(
                 len(filenames), self.ip, self.port, hops, filenames
             )
-            self.sock.sendto(message.encode('utf-8'), (target_ip, target_port))
-            self.statistics.record_message_sent()
+            self._send(message, (target_ip, target_port))
         except Exception as e:
             print(f"[ERROR] Failed to send search response: {e}")
     
@@ -293,20 +447,78 @@ class Node:
         print(f"\n[SEARCH] Searching for: {filename}")
         self.search_engine.initiate_search(filename)
         
-    def download_file(self, ip, port, filename):
-        """Download file from another node using REST API."""
+    def download_file(self, ip, port, filename, alt_sources=None, progress=None,
+                      stall_timeout=None):
+        """
+        Download file from another node using REST API.
+        
+        Each chunk is checked against the source's Merkle tree as it lands.
+        Corrupt or missing chunks are re-fetched by byte range, from the same
+        source or from alternate sources serving identical content.
+        
+        Args:
+            ip (str): IP of the source node
+            port (int): Port of the source node
+            filename (str): File to download
+            alt_sources (list): Optional (ip, port) tuples used for repairs
+            progress (callable): Optional progress(bytes_received, total_bytes) callback
+            stall_timeout (float): Seconds without data before giving up on the source
+            
+        Returns:
+            dict: Outcome with 'status' ('ok', 'busy', 'failed' or 'error'),
+                  source, 'size', 'duration', 'first_byte' and 'integrity'
+        """
         print(f"\n[DOWNLOAD] Downloading '{filename}' from {ip}:{port}...")
+        result = {
+            'filename': filename, 'ip': ip, 'port': port, 'status': 'error',
+            'size': 0, 'duration': 0.0, 'first_byte': None, 'integrity': None
+        }
+        start_time = time.time()
+        response = None
+        next_source = None
         try:
             url = f"http://{ip}:{port}/download/{filename}"
-            start_time = time.time()
-            response = requests.get(url)
+            tree = self._fetch_merkle_tree(ip, port, filename)
+            response = requests.get(
+                url, stream=True, timeout=stall_timeout or self.DOWNLOAD_STALL_TIMEOUT
+            )
             
             if response.status_code == 200:
-                content = response.content
+                chunk_size = tree.chunk_size if tree else MerkleTree.CHUNK_SIZE
+                total_bytes = int(response.headers.get('Content-Length', 0))
+                received = 0
+                chunks = []
+                bad_chunks = []
+                buffer = bytearray()
+                first_byte_time = None
+                
+                for data in response.iter_content(chunk_size=64 * 1024):
+                    if first_byte_time is None:
+                        first_byte_time = time.time() - start_time
+                    received += len(data)
+                    if progress:
+                        progress(received, total_bytes)
+                    buffer += data
+                    while len(buffer) >= chunk_size:
+                        self._accept_chunk(tree, chunks, bad_chunks, bytes(buffer[:chunk_size]))
+                        del buffer[:chunk_size]
+                if buffer:
+                    self._accept_chunk(tree, chunks, bad_chunks, bytes(buffer))
+                
+                if tree:
+                    # A short body leaves trailing chunks missing
+                    while len(chunks) < tree.num_chunks:
+                        bad_chunks.append(len(chunks))
+                        chunks.append(b'')
+                    if bad_chunks:
+                        sources = [(ip, port)] + self._matching_sources(alt_sources, filename, tree)
+                        self._repair_chunks(filename, tree, chunks, bad_chunks, sources)
+                
+                content = b''.join(chunks)
                 received_hash = response.headers.get('X-File-Hash')
                 
                 # Calculate hash of received content
-                calculated_hash = self.file_manager._calculate_hash(content)
+                calculated_hash = hashlib.sha256(content).hexdigest()
                 
                 duration = time.time() - start_time
                 size_mb = len(content) / (1024 * 1024)
@@ -314,18 +526,208 @@ class Node:
                 print(f"[DOWNLOAD] Success!")
                 print(f"  - Size: {size_mb:.2f} MB")
                 print(f"  - Time: {duration:.2f} s")
+                if first_byte_time is not None:
+                    print(f"  - First Byte: {first_byte_time * 1000:.2f} ms")
+                if tree:
+                    print(f"  - Chunks: {tree.num_chunks} verified, {len(bad_chunks)} unrecoverable")
                 print(f"  - Hash (Received): {received_hash}")
                 print(f"  - Hash (Calculated): {calculated_hash}")
                 
+                result.update({
+                    'status': 'ok', 'size': len(content),
+                    'first_byte': first_byte_time,
+                    'integrity': received_hash == calculated_hash
+                })
                 if received_hash == calculated_hash:
                     print("  - Integrity Check: PASSED")
+                    if self.reshare:
+                        self._share_downloaded_file(filename, content, ip, port)
                 else:
                     print("  - Integrity Check: FAILED")
+            elif response.status_code == 503:
+                retry_after = response.headers.get('Retry-After', '?')
+                print(f"[DOWNLOAD] Source busy (Retry-After: {retry_after}s)")
+                result['status'] = 'busy'
+                if alt_sources:
+                    next_source = alt_sources[0]
             else:
                 print(f"[DOWNLOAD] Failed: {response.status_code} - {response.text}")
+                result['status'] = 'failed'
                 
         except Exception as e:
             print(f"[DOWNLOAD] Error: {e}")
+        finally:
+            # Streamed responses hold their connection until closed
+            if response is not None:
+                response.close()
+        
+        if next_source:
+            # Move on to the next replica instead of waiting
+            next_ip, next_port = next_source
+            return self.download_file(next_ip, next_port, filename, alt_sources[1:],
+                                      progress, stall_timeout)
+        
+        result['duration'] = time.time() - start_time
+        return result
+    
+    def fetch(self, query, window=None):
+        """
+        Search for a file and download it from the best responder.
+        
+        SEROK responses are collected for a short window, holders are ranked by
+        response latency, hops and advertised upload load, and the download
+        starts from the best one. A source that is busy, stalls or fails is
+        replaced by the next one in the ranking.
+        
+        Args:
+            query (str): Search query
+            window (float): Seconds to collect responses (defaults to FETCH_WINDOW)
+            
+        Returns:
+            dict: download_file result of the successful attempt, or None
+        """
+        start_time = time.time()
+        query_id = self.search_engine.initiate_search(query)
+        time.sleep(window if window is not None else self.FETCH_WINDOW)
+        
+        # Our own copy is not a source
+        responses = [r for r in self.search_engine.get_responses(query_id)
+                     if not (r['ip'] == self.ip and r['port'] == self.port)]
+        filename = self.source_selector.choose_file(responses)
+        if filename is None:
+            print(f"[FETCH] No sources found for '{query}'")
+            self.statistics.log_event(
+                event_type='FETCH_RESULT', query=query,
+                latency_ms=(time.time() - start_time) * 1000, status='NOT_FOUND'
+            )
+            return None
+        
+        candidates = self.source_selector.rank(responses, filename, self._probe_load)
+        print(f"[FETCH] '{filename}' has {len(candidates)} source(s):")
+        for c in candidates:
+            load = f"{c['load']:.2f}" if c['load'] is not None else '?'
+            print(f"  - {c['ip']}:{c['port']} (hops: {c['hops']}, "
+                  f"latency: {c['latency_ms']:.2f}ms, load: {load})")
+        
+        result = None
+        remaining = [(c['ip'], c['port']) for c in candidates]
+        hops_by_source = {(c['ip'], c['port']): c['hops'] for c in candidates}
+        while remaining:
+            ip, port = remaining[0]
+            result = self.download_file(ip, port, filename, alt_sources=remaining[1:])
+            if result['status'] == 'ok' and result['integrity']:
+                break
+            # Busy sources may already have been skipped inside download_file
+            failed = (result['ip'], result['port'])
+            remaining = remaining[remaining.index(failed) + 1:] if failed in remaining else remaining[1:]
+            if remaining:
+                print(f"[FETCH] Failing over to {remaining[0][0]}:{remaining[0][1]}")
+        
+        total_ms = (time.time() - start_time) * 1000
+        passed = result is not None and result['status'] == 'ok' and result['integrity']
+        if passed:
+            status = 'PASSED'
+        elif result is not None and result['status'] == 'ok':
+            status = 'INTEGRITY_FAILED'  # Transferred, but no source served the right content
+        else:
+            status = 'FAILED'
+        print(f"[FETCH] {'Completed' if passed else 'Failed'} '{filename}' in {total_ms:.2f} ms (query to verified file)")
+        self.statistics.log_event(
+            event_type='FETCH_RESULT',
+            query=query,
+            hops=hops_by_source.get((result['ip'], result['port']), 0),
+            latency_ms=total_ms,
+            sender_ip=result['ip'],
+            sender_port=result['port'],
+            size_bytes=result['size'],
+            status=status
+        )
+        return result if passed else None
+    
+    def _probe_load(self, ip, port):
+        """Ask a holder for its upload load: busy slots plus queued requests, per slot."""
+        try:
+            response = requests.get(f"http://{ip}:{port}/load", timeout=0.5)
+            if response.status_code == 200:
+                load = response.json()
+                return ((load['upload_slots_in_use'] + load['upload_queue_length']) /
+                        max(load['upload_slots_max'], 1))
+        except Exception:
+            pass
+        return None
+    
+    def _share_downloaded_file(self, filename, content, source_ip, source_port):
+        """Add a verified download to the served set so this node answers SER queries for it."""
+        if not self.file_manager:
+            return  # Nowhere to store it
+        with self.files_lock:
+            if filename in self.files:
+                return
+            try:
+                self.file_manager.import_file(filename, content)
+            except Exception as e:
+                print(f"[SHARE] Failed to store '{filename}': {e}")
+                return
+            self.files.append(filename)
+            self.search_engine.set_files(self.files)
+        
+        self.statistics.record_replica_acquired()
+        self.statistics.log_event(
+            event_type='REPLICA_ADDED',
+            query=filename,
+            sender_ip=source_ip,
+            sender_port=source_port,
+            size_bytes=len(content)
+        )
+        print(f"  - Now serving '{filename}' ({len(self.files)} files hosted)")
+    
+    def _fetch_merkle_tree(self, ip, port, filename):
+        """Fetch a source's chunk Merkle tree, or None if it does not offer one."""
+        try:
+            response = requests.get(f"http://{ip}:{port}/merkle/{filename}", timeout=5)
+            if response.status_code == 200:
+                return MerkleTree.from_dict(response.json())
+        except Exception as e:
+            print(f"[DOWNLOAD] No chunk hashes from {ip}:{port}: {e}")
+        return None
+    
+    def _accept_chunk(self, tree, chunks, bad_chunks, data):
+        """Append a received chunk, flagging it immediately if it fails verification."""
+        index = len(chunks)
+        chunks.append(data)
+        if tree and not tree.verify_chunk(index, data):
+            print(f"[DOWNLOAD] Chunk {index} failed verification")
+            bad_chunks.append(index)
+    
+    def _matching_sources(self, alt_sources, filename, tree):
+        """Keep only alternate sources whose Merkle root matches, so their chunks are interchangeable."""
+        matching = []
+        for src_ip, src_port in alt_sources or []:
+            other = self._fetch_merkle_tree(src_ip, src_port, filename)
+            if other and other.root == tree.root:
+                matching.append((src_ip, src_port))
+        return matching
+    
+    def _repair_chunks(self, filename, tree, chunks, bad_chunks, sources):
+        """Re-fetch corrupt chunks by byte range. Repaired indexes are removed from bad_chunks."""
+        for index in list(bad_chunks):
+            start, end = tree.chunk_range(index)
+            for src_ip, src_port in sources:
+                try:
+                    response = requests.get(
+                        f"http://{src_ip}:{src_port}/download/{filename}",
+                        headers={'Range': f"bytes={start}-{end - 1}"},
+                        timeout=10
+                    )
+                except Exception as e:
+                    print(f"[DOWNLOAD] Chunk {index} re-fetch from {src_ip}:{src_port} failed: {e}")
+                    continue
+                
+                if response.status_code == 206 and tree.verify_chunk(index, response.content):
+                    chunks[index] = response.content
+                    bad_chunks.remove(index)
+                    print(f"[DOWNLOAD] Chunk {index} repaired from {src_ip}:{src_port}")
+                    break
     
     def leave_network(self):
         """Gracefully leave the network."""
@@ -339,7 +741,9 @@ class Node:
         time.sleep(1)  # Wait for LEAVEOK responses
         
         # Unregister from bootstrap
-        self.bootstrap_manager.unreg_from_bs()
+        self.lease_stop.set()
+        if self.bootstrap_manager:
+            self.bootstrap_manager.unreg_from_bs()
         
         # Clear routing table
         self.routing_table.clear()
@@ -347,11 +751,23 @@ class Node:
     def stop(self):
         """Stop the node."""
         self.running = False
-        if self.sock:
-            self.sock.close()
+        self.lease_stop.set()
+        self.download_manager.shutdown()
+        self.transport.close()
+        self.tracer.stop()
+        if self.profiler.stop():
+            self._print_profile_dump(self.profiler.dump())
         self.statistics.save_summary()
+        self.statistics.stop()
         print("[NODE] Stopped")
     
+    def _print_profile_dump(self, result):
+        if result['file']:
+            print(f"[PROFILE] {result['samples']} samples over {result['seconds']:.1f}s "
+                  f"saved to {result['file']}")
+        else:
+            print("[PROFILE] No samples collected")
+    
     def run_cli(self):
         """Run command-line interface."""
         print("\n=== Distributed Content Search Node ===")
@@ -359,17 +775,22 @@ class Node:
         print("  register    - Register with bootstrap server")
         print("  search      - Search for a file")
         print("  run-queries - Execute all queries from queries.txt (Phase 4)")
-        print("  download    - Download a file (Usage: download <ip> <port> <filename>)")
+        print("  download    - Queue a file download (Usage: download <ip> <port> <filename>)")
+        print("  downloads   - Show download progress")
+        print("  fetch       - Search and download from the best source (Usage: fetch <query>)")
         print("  files       - Show my files")
         print("  neighbors   - Show routing table")
         print("  stats       - Show statistics")
+        print("  trace       - Toggle hop-by-hop query tracing (Usage: trace on|off)")
+        print("  profile     - Sample where time goes (Usage: profile start [seconds]|stop|dump)")
         print("  leave       - Leave network gracefully")
         print("  exit        - Exit")
         print("=====================================\n")
         
         while self.running:
             try:
-                cmd = input("> ").strip().lower()
+                line = input("> ").strip()
+                cmd = line.lower()
                 
                 if cmd == 'register':
                     self.register_with_bootstrap()
@@ -398,13 +819,26 @@ class Node:
                     except Exception as e:
                         print(f"[ERROR] Failed to run queries: {e}")
                 
+                elif cmd.startswith('fetch'):
+                    query = line[len('fetch'):].strip()
+                    if query:
+                        # Runs in the background so the prompt stays responsive
+                        threading.Thread(target=self.fetch, args=(query,), daemon=True).start()
+                    else:
+                        print("Usage: fetch <query>")
+                
+                elif cmd == 'downloads':
+                    self.download_manager.print_jobs()
+                
                 elif cmd.startswith('download'):
-                    parts = cmd.split()
+                    # Filenames are case sensitive, so parse the raw line
+                    parts = line.split()
                     if len(parts) >= 4:
                         ip = parts[1]
                         port = int(parts[2])
                         filename = " ".join(parts[3:])
-                        self.download_file(ip, port, filename)
+                        job = self.download_manager.submit(ip, port, filename)
+                        print(f"[DOWNLOAD] Job #{job.job_id} queued ('downloads' shows progress)")
                     else:
                         print("Usage: download <ip> <port> <filename>")
                 
@@ -419,6 +853,43 @@ class Node:
                 
                 elif cmd == 'stats':
                     self.statistics.print_stats()
+                    print("--- Uploads ---")
+                    for k, v in self.upload_scheduler.get_stats().items():
+                        print(f"{k}: {v:.2f}" if isinstance(v, float) else f"{k}: {v}")
+                
+                elif cmd.startswith('trace'):
+                    mode = cmd[len('trace'):].strip()
+                    if mode == 'on':
+                        self.tracer.start()
+                    elif mode == 'off':
+                        self.tracer.stop()
+                        print(f"[TRACE] Tracing stopped, records in {self.tracer.trace_file}")
+                    else:
+                        state = 'on' if self.tracer.enabled else 'off'
+                        print(f"Tracing is {state}. Usage: trace on|off")
+                
+                elif cmd.startswith('profile'):
+                    parts = cmd.split()
+                    action = parts[1] if len(parts) > 1 else ''
+                    if action == 'start':
+                        duration = float(parts[2]) if len(parts) > 2 else None
+                        if self.profiler.start(duration):
+                            window = f" for {duration:g}s" if duration else ""
+                            print(f"[PROFILE] Sampling all threads{window}")
+                        else:
+                            print("[PROFILE] Already running")
+                    elif action == 'stop':
+                        if self.profiler.stop():
+                            print(f"[PROFILE] Stopped after {self.profiler.get_status()['samples']} samples "
+                                  "('profile dump' writes them)")
+                        else:
+                            print("[PROFILE] Not running")
+                    elif action == 'dump':
+                        self._print_profile_dump(self.profiler.dump())
+                    else:
+                        status = self.profiler.get_status()
+                        print(f"Profiler is {'running' if status['running'] else 'stopped'} "
+                              f"({status['samples']} samples). Usage: profile start [seconds]|stop|dump")
                 
                 elif cmd == 'leave':
                     self.leave_network()
@@ -445,13 +916,25 @@ def main():
     parser.add_argument('--username', required=True, help='Unique username')
     parser.add_argument('--bs-ip', default='node1.cse.mrt.ac.lk', help='Bootstrap server IP')
     parser.add_argument('--bs-port', type=int, default=5000, help='Bootstrap server port')
+    parser.add_argument('--bs-endpoints', default='',
+                        help='Comma-separated ip:port of replicated bootstrap servers (overrides --bs-ip/--bs-port)')
     parser.add_argument('--files', default='file_names.txt', help='Path to file names list')
     parser.add_argument('--auto-register', action='store_true', help='Automatically register on startup')
+    parser.add_argument('--upload-slots', type=int, default=4, help='Concurrent uploads served')
+    parser.add_argument('--upload-queue', type=int, default=16, help='Downloads allowed to wait for a slot')
+    parser.add_argument('--upload-rate', type=float, default=0, help='Upload bandwidth in MB/s shared by all transfers (0 = unlimited)')
+    parser.add_argument('--no-reshare', action='store_true', help='Do not serve files after downloading them')
+    parser.add_argument('--trace', action='store_true', help='Record hop-by-hop search traces in logs/trace_<node>.csv')
     
     args = parser.parse_args()
+    bs_endpoints = [(host, int(port)) for host, port in
+                    (endpoint.rsplit(':', 1) for endpoint in args.bs_endpoints.split(',') if endpoint)]
     
     # Create node
-    node = Node(args.ip, args.port, args.username, args.bs_ip, args.bs_port)
+    node = Node(args.ip, args.port, args.username, args.bs_ip, args.bs_port,
+                upload_slots=args.upload_slots, upload_queue=args.upload_queue,
+                upload_rate=args.upload_rate * 1024 * 1024, reshare=not args.no_reshare, trace=args.trace,
+                bs_endpoints=bs_endpoints)
     
     # Load files
     node.load_files(args.files)
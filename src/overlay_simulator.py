@@ -0,0 +1,178 @@
+"""
+In-process overlay simulator.
+Runs thousands of nodes in one process on a SimulatedNetwork: the nodes' real
+JOIN/JOINOK, SER and SEROK handling, SearchEngine flooding and RoutingTable
+run over in-memory transports, and a virtual clock stands in for wall time.
+Benchmarks flooding cost and search latency at 1k-10k nodes.
+"""
+
+import argparse
+import contextlib
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from bootstrap_assignment import ASSIGNMENT_POLICIES
+from bootstrap_server import BootstrapServer
+from node import Node
+from protocol import MessageFormatter
+from search_engine import SearchEngine
+from statistics import Statistics
+from transport import SimulatedNetwork
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+
+class SimulatedNode(Node):
+    """
+    A Node on an in-memory transport and the network's virtual clock.
+
+    No files on disk, REST API or bootstrap client, and the nodes share one
+    Statistics (a per-node CSV writer thread would not scale to thousands).
+    """
+
+    def __init__(self, ip, port, network, statistics, files):
+        super().__init__(ip, port, f"sim_{port}", None, None,
+                         transport=network.transport(), statistics=statistics,
+                         clock=network.clock, storage=False, bootstrap=False)
+        self.files = files
+        self.search_engine.set_files(files)
+
+
+def build_overlay(network, statistics, nodes, all_files, assignment='low-degree', seed=0):
+    """
+    Register nodes with an in-process BootstrapServer and JOIN the peers each
+    REGOK names, one node at a time, as a cluster starting up would.
+
+    Returns:
+        list: SimulatedNodes
+    """
+    rng = random.Random(seed)
+    server = BootstrapServer(port=0, lease_seconds=None, assignment=ASSIGNMENT_POLICIES[assignment](),
+                             rng=rng)
+    overlay = []
+    for i in range(nodes):
+        ip, port = f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", 5001
+        files = rng.sample(all_files, min(rng.randint(3, 5), len(all_files)))
+        node = SimulatedNode(ip, port, network, statistics, files)
+        node.start(rest_api=False)
+        reply = MessageFormatter.parse_message(server.process_message(
+            MessageFormatter.create_reg_message(ip, port, node.username)))
+        for k in range(2, len(reply) - 1, 2):
+            node.send_join(reply[k], int(reply[k + 1]))
+        network.run()
+        overlay.append(node)
+    return overlay
+
+
+def run_queries(network, overlay, queries, count, seed=0):
+    """
+    Issue queries one at a time from random nodes, running each flood to
+    completion before the next.
+
+    Returns:
+        list: Per query: ser, serok, reached (nodes that received it),
+            max_node (datagrams at the busiest node), answered, latency_ms and
+            hops of the first response (None if unanswered)
+    """
+    rng = random.Random(seed)
+    results = []
+    for _ in range(count):
+        origin = rng.choice(overlay)
+        query = rng.choice(queries)
+        before_command = dict(network.by_command)
+        before_node = dict(network.by_node)
+        network.now += 1.0  # Keep queries apart on the clock
+        query_id = origin.search_engine.initiate_search(query)
+        network.run()
+
+        responses = [r for r in origin.search_engine.get_responses(query_id) if r['hops'] > 0]
+        first = min(responses, key=lambda r: r['latency_ms']) if responses else None
+        per_node = [n - before_node.get(address, 0) for address, n in network.by_node.items()
+                    if n != before_node.get(address, 0)]
+        results.append({
+            'ser': network.by_command['SER'] - before_command.get('SER', 0),
+            'serok': network.by_command['SEROK'] - before_command.get('SEROK', 0),
+            'reached': len(per_node),
+            'max_node': max(per_node, default=0),
+            'answered': first is not None,
+            'latency_ms': first['latency_ms'] if first else None,
+            'hops': first['hops'] if first else None
+        })
+    return results
+
+
+def simulate(nodes, queries, count, assignment='low-degree', latency=(0.005, 0.050), seed=0):
+    """
+    Build an overlay of `nodes` and run `count` queries over it.
+
+    Returns:
+        dict: build_seconds, query_seconds, events, degree_mean and
+            per-query results (see run_queries)
+    """
+    with open(os.path.join(ROOT, 'file_names.txt')) as f:
+        all_files = [line.strip() for line in f if line.strip()]
+    log_dir = tempfile.mkdtemp(prefix='overlay_sim_')
+    network = SimulatedNetwork(latency=latency, seed=seed)
+    statistics = Statistics('overlay_sim', log_dir)
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            start = time.perf_counter()
+            overlay = build_overlay(network, statistics, nodes, all_files, assignment, seed)
+            build_seconds = time.perf_counter() - start
+            events_before = sum(network.by_command.values())
+            start = time.perf_counter()
+            results = run_queries(network, overlay, queries, count, seed)
+            query_seconds = time.perf_counter() - start
+    finally:
+        statistics.stop()
+        shutil.rmtree(log_dir, ignore_errors=True)
+    return {
+        'build_seconds': build_seconds,
+        'query_seconds': query_seconds,
+        'events': sum(network.by_command.values()) - events_before,
+        'degree_mean': float(np.mean([node.routing_table.get_neighbor_count() for node in overlay])),
+        'results': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='In-process overlay flooding benchmark')
+    parser.add_argument('--sizes', default='1000,10000', help='Overlay sizes to simulate')
+    parser.add_argument('--queries', type=int, default=10, help='Queries per overlay')
+    parser.add_argument('--assignment', choices=sorted(ASSIGNMENT_POLICIES), default='low-degree',
+                        help='Bootstrap neighbor assignment policy')
+    parser.add_argument('--latency', default='5,50', help='Min,max one-way link latency in ms')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    with open(os.path.join(ROOT, 'queries.txt')) as f:
+        queries = [line.strip() for line in f if line.strip()]
+    low, high = (float(ms) / 1000 for ms in args.latency.split(','))
+
+    print(f"\n=== Overlay Flooding ({args.queries} queries, {args.assignment} assignment, "
+          f"{args.latency} ms links, max {SearchEngine.MAX_HOPS} hops) ===")
+    print(f"{'Nodes':>7}{'Degree':>8}{'SER/query':>11}{'Reached':>9}{'Busiest':>9}{'Answered':>10}"
+          f"{'p50 ms':>8}{'p99 ms':>8}{'Hops':>6}{'Events/s':>10}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        run = simulate(size, queries, args.queries, args.assignment, (low, high), args.seed)
+        results = run['results']
+        answered = [r for r in results if r['answered']]
+        latencies = [r['latency_ms'] for r in answered] or [float('nan')]
+        print(f"{size:>7}{run['degree_mean']:>8.2f}{np.mean([r['ser'] for r in results]):>11.0f}"
+              f"{np.mean([r['reached'] for r in results]) / size:>9.1%}"
+              f"{np.mean([r['max_node'] for r in results]):>9.0f}{len(answered) / len(results):>10.0%}"
+              f"{np.percentile(latencies, 50):>8.0f}{np.percentile(latencies, 99):>8.0f}"
+              f"{np.mean([r['hops'] for r in answered]) if answered else float('nan'):>6.1f}"
+              f"{run['events'] / run['query_seconds']:>10.0f}")
+        print(f"{'':>7}  (overlay built in {run['build_seconds']:.1f}s, "
+              f"{run['query_seconds']:.1f}s for {run['events']} query datagrams)")
+    print("=" * 86 + "\n")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,30 @@
 import matplotlib.pyplot as plt
-import csv
+import argparse
 import os
-import glob
 import numpy as np
+from histogram import LogHistogram
+from log_aggregator import aggregate_logs, aggregate_logs_incremental
+
+CDF_POINTS = 10000  # Points drawn per CDF; larger inputs are sampled at even ranks
 
 def calculate_statistics(data):
     """Calculate min, max, average, and standard deviation."""
-    if not data:
+    if data is None or len(data) == 0:
         return None
     
+    if isinstance(data, LogHistogram):
+        # Cached runs keep histograms: min, max and mean are exact, the median is within 1%
+        std = np.sqrt(max(data.total_sq / data.count - data.mean ** 2, 0.0))
+        return {
+            'min': data.min,
+            'max': data.max,
+            'mean': data.mean,
+            'avg': data.mean,  # alias
+            'std': std,
+            'std_dev': std,  # alias
+            'median': data.percentile(50)
+        }
+    
     data_array = np.array(data)
     return {
         'min': np.min(data_array),
@@ -20,88 +36,123 @@ def calculate_statistics(data):
         'median': np.median(data_array)
     }
 
-def plot_cdf(data, label, filename):
-    """Plot CDF of data."""
-    if not data:
+def _cdf_points(data):
+    """Sorted values and cumulative fractions, at most CDF_POINTS of them."""
+    if isinstance(data, LogHistogram):
+        points = np.array(data.cdf())
+        sorted_data, yvals = points[:, 0], points[:, 1]
+    else:
+        sorted_data = np.sort(data)
+        yvals = np.arange(len(sorted_data)) / float(max(len(sorted_data) - 1, 1))
+    if len(sorted_data) > CDF_POINTS:
+        # Millions of points look the same as this many and plot far faster
+        ranks = np.linspace(0, len(sorted_data) - 1, CDF_POINTS).astype(np.int64)
+        sorted_data, yvals = sorted_data[ranks], yvals[ranks]
+    return sorted_data, yvals
+
+def plot_cdf(data, label, filename, series_labels=None):
+    """
+    Plot CDF of data.
+    With series_labels, data is a list of datasets drawn overlaid, one per label.
+    """
+    if series_labels is None:
+        datasets, series_labels = [data], [None]
+    else:
+        datasets = data
+    if all(d is None or len(d) == 0 for d in datasets):
         print(f"No data for {label}")
         return
-        
-    sorted_data = np.sort(data)
-    yvals = np.arange(len(sorted_data)) / float(len(sorted_data) - 1)
     
     plt.figure()
-    plt.plot(sorted_data, yvals)
+    for dataset, series in zip(datasets, series_labels):
+        if dataset is None or len(dataset) == 0:
+            continue
+        sorted_data, yvals = _cdf_points(dataset)
+        plt.plot(sorted_data, yvals, label=series)
     plt.title(f'CDF of {label}')
     plt.xlabel(label)
     plt.ylabel('CDF')
     plt.grid(True)
+    if series_labels[0] is not None:
+        plt.legend()
+    plt.savefig(filename)
+    print(f"Saved {filename}")
+    plt.close()
+
+def plot_traffic_by_command(traffic, filename):
+    """Bar chart of bytes per protocol command, sent vs received, summed over nodes."""
+    if not traffic:
+        print("No data for Traffic by Command")
+        return
+    
+    commands = sorted({command for _, command in traffic})
+    x = np.arange(len(commands))
+    width = 0.4
+    
+    plt.figure()
+    for offset, direction in ((-width / 2, 'sent'), (width / 2, 'received')):
+        kib = [traffic.get((direction, c), {}).get('bytes', 0) / 1024 for c in commands]
+        plt.bar(x + offset, kib, width, label=direction)
+    plt.xticks(x, commands)
+    plt.title('UDP Traffic by Command (all nodes)')
+    plt.xlabel('Command')
+    plt.ylabel('KiB')
+    plt.legend()
+    plt.grid(True, axis='y')
     plt.savefig(filename)
     print(f"Saved {filename}")
     plt.close()
 
 def main():
-    log_dir = 'logs'
+    parser = argparse.ArgumentParser(description='CDF plots and statistics from node logs')
+    parser.add_argument('--log-dir', default='logs', help='Directory with node_*.csv logs')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processes reading node logs in parallel (default: one per CPU)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Reparse every log and keep exact samples instead of cached histograms')
+    args = parser.parse_args()
+    
+    log_dir = args.log_dir
     if not os.path.exists(log_dir):
         print(f"Log directory '{log_dir}' not found.")
         return
 
-    latencies = []
-    hops_list = []
-    messages_per_node = []
-    
-    log_files = glob.glob(os.path.join(log_dir, 'node_*.csv'))
-    
-    for log_file in log_files:
-        node_msgs = 0
-        with open(log_file, 'r') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                # Count messages (sent + received)
-                # We can approximate by looking at events or if we logged message counts periodically
-                # The current logging logs events.
-                # Statistics class tracks total messages.
-                # But the CSV log mainly tracks SEARCH_RESULT.
-                # To get total messages per node, we might need to read the final stats printed or log them.
-                # Currently, the CSV doesn't log total message counts.
-                # However, we can extract latency and hops from SEARCH_RESULT events.
-                
-                if row['event_type'] == 'SEARCH_RESULT':
-                    try:
-                        latencies.append(float(row['latency_ms']))
-                        hops_list.append(int(row['hops']))
-                    except ValueError:
-                        continue
-        
-    # Read summary files for messages per node
-    summary_files = glob.glob(os.path.join(log_dir, 'node_*_summary.csv'))
-    for summary_file in summary_files:
-        try:
-            msgs_sent = 0
-            msgs_received = 0
-            with open(summary_file, 'r') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    if row['metric'] == 'messages_sent':
-                        msgs_sent = int(row['value'])
-                    elif row['metric'] == 'messages_received':
-                        msgs_received = int(row['value'])
-            messages_per_node.append(msgs_sent + msgs_received)
-        except Exception as e:
-            print(f"Error reading {summary_file}: {e}")
+    if args.no_cache:
+        data = aggregate_logs(log_dir, args.workers)
+    else:
+        data = aggregate_logs_incremental(log_dir, workers=args.workers)
+        print(f"[CACHE] Parsed {data['parsed_bytes'] / (1024 * 1024):.1f} MB of new rows "
+              f"from {data['updated_files']} log(s)")
+    latencies = data['latencies']
+    hops_list = data['hops']
+    download_throughputs = data['download_throughputs']
+    download_times = data['download_times']
+    fetch_times = data['fetch_times']
+    initial_holders = data['initial_holders']
+    replica_holders = data['replica_holders']
+    messages_per_node = data['messages_per_node']
+    bytes_per_node = data['bytes_per_node']
+    uploads_per_node = data['uploads_per_node']
+    command_traffic = data['command_traffic']
     
     # Plot CDFs
     plot_cdf(latencies, 'Latency (ms)', 'cdf_latency.png')
     plot_cdf(hops_list, 'Hops', 'cdf_hops.png')
     plot_cdf(messages_per_node, 'Messages per Node', 'cdf_messages.png')
+    plot_cdf(np.array(bytes_per_node) / 1024, 'UDP KiB per Node', 'cdf_bytes.png')
+    plot_traffic_by_command(command_traffic, 'traffic_by_command.png')
+    plot_cdf(download_throughputs, 'Download Throughput (MB/s)', 'cdf_download_throughput.png')
+    plot_cdf(uploads_per_node, 'Uploads Served per Node', 'cdf_uploads.png')
+    plot_cdf(fetch_times, 'Fetch Time, Query to Verified File (ms)', 'cdf_fetch.png')
     
     # Print statistics
     print("\n=== Overall Statistics ===")
-    if latencies:
+    if len(latencies):
         lat_stats = calculate_statistics(latencies)
         print(f"Latency (ms): Min={lat_stats['min']:.2f}, Max={lat_stats['max']:.2f}, "
               f"Avg={lat_stats['avg']:.2f}, StdDev={lat_stats['std']:.2f}")
     
-    if hops_list:
+    if len(hops_list):
         hop_stats = calculate_statistics(hops_list)
         print(f"Hops: Min={hop_stats['min']:.0f}, Max={hop_stats['max']:.0f}, "
               f"Avg={hop_stats['avg']:.2f}, StdDev={hop_stats['std']:.2f}")
@@ -110,6 +161,53 @@ def main():
         msg_stats = calculate_statistics(messages_per_node)
         print(f"Messages per Node: Min={msg_stats['min']:.0f}, Max={msg_stats['max']:.0f}, "
               f"Avg={msg_stats['avg']:.2f}, StdDev={msg_stats['std']:.2f}")
+    
+    if bytes_per_node:
+        byte_stats = calculate_statistics(bytes_per_node)
+        print(f"UDP Bytes per Node: Min={byte_stats['min']:.0f}, Max={byte_stats['max']:.0f}, "
+              f"Avg={byte_stats['avg']:.2f}, StdDev={byte_stats['std']:.2f}")
+    
+    if command_traffic:
+        print("Traffic by Command (all nodes):")
+        for (direction, command), entry in sorted(command_traffic.items()):
+            avg_size = entry['bytes'] / entry['datagrams'] if entry['datagrams'] else 0
+            print(f"  {direction:<9}{command:<9}{entry['datagrams']:>8} datagrams "
+                  f"{entry['bytes']:>10} bytes (avg {avg_size:.1f} B)")
+    
+    if data['queries_issued']:
+        print(f"Query Success Rate: {data['queries_succeeded']}/{data['queries_issued']} "
+              f"({100.0 * data['queries_succeeded'] / data['queries_issued']:.1f}%)")
+    
+    if len(download_throughputs):
+        dl_stats = calculate_statistics(download_throughputs)
+        time_stats = calculate_statistics(download_times)
+        print(f"Download Throughput (MB/s): Min={dl_stats['min']:.2f}, Max={dl_stats['max']:.2f}, "
+              f"Avg={dl_stats['avg']:.2f}, StdDev={dl_stats['std']:.2f}")
+        print(f"Download Time (s): Min={time_stats['min']:.2f}, Max={time_stats['max']:.2f}, "
+              f"Avg={time_stats['avg']:.2f}")
+    
+    if len(fetch_times):
+        fetch_stats = calculate_statistics(fetch_times)
+        print(f"Fetch Time (ms): Min={fetch_stats['min']:.2f}, Max={fetch_stats['max']:.2f}, "
+              f"Avg={fetch_stats['avg']:.2f}, StdDev={fetch_stats['std']:.2f}")
+    
+    if replica_holders:
+        initial_counts = [len(initial_holders.get(name, ())) for name in replica_holders]
+        final_counts = [len(holders) for holders in replica_holders.values()]
+        init_stats = calculate_statistics(initial_counts)
+        final_stats = calculate_statistics(final_counts)
+        print(f"Replicas per File (start): Min={init_stats['min']:.0f}, Max={init_stats['max']:.0f}, "
+              f"Avg={init_stats['avg']:.2f}")
+        print(f"Replicas per File (end):   Min={final_stats['min']:.0f}, Max={final_stats['max']:.0f}, "
+              f"Avg={final_stats['avg']:.2f}")
+    
+    if uploads_per_node:
+        up_stats = calculate_statistics(uploads_per_node)
+        # Share of all uploads carried by the busiest node
+        busiest_share = up_stats['max'] / sum(uploads_per_node) if sum(uploads_per_node) else 0
+        print(f"Uploads per Node: Min={up_stats['min']:.0f}, Max={up_stats['max']:.0f}, "
+              f"Avg={up_stats['avg']:.2f}, StdDev={up_stats['std']:.2f}, "
+              f"Busiest Node Share={busiest_share * 100:.1f}%")
     print("========================\n")
 
 if __name__ == '__main__':
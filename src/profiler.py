@@ -0,0 +1,175 @@
+"""
+Sampling profiler for a running node.
+Periodically captures the stack of every thread (listener, message handlers,
+Flask workers, downloads) and writes folded stacks that flamegraph tools
+(flamegraph.pl, speedscope, inferno) read directly.
+"""
+
+import collections
+import math
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler built on sys._current_frames().
+
+    Nothing is installed into the interpreter: while stopped there is no
+    sampler thread and no trace hook, so the node runs at full speed.
+    """
+
+    DEFAULT_INTERVAL = 0.005  # Seconds between samples (200 Hz)
+    MAX_DEPTH = 128           # Frames kept per stack
+
+    def __init__(self, node_id, log_dir='logs'):
+        """
+        Args:
+            node_id (str): Node identifier used in dump file names.
+            log_dir (str): Directory dumps are written to.
+        """
+        self.node_id = node_id
+        self.log_dir = log_dir
+        self.samples = collections.Counter()  # folded stack -> samples
+        self.sample_count = 0
+        self.interval = self.DEFAULT_INTERVAL
+        self.started_at = None
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, duration=None, interval=None):
+        """
+        Start sampling. Samples from earlier windows are kept until dump().
+
+        Args:
+            duration (float): Stop automatically after this many seconds.
+            interval (float): Seconds between samples.
+
+        Returns:
+            bool: False if the profiler was already running.
+
+        Raises:
+            ValueError: If duration or interval is not a positive finite number.
+        """
+        # A zero or negative wait returns at once and the sampler would spin
+        for name, value in (('duration', duration), ('interval', interval)):
+            if value is not None and not (math.isfinite(value) and value > 0):
+                raise ValueError(f"{name} must be a positive number of seconds, got {value}")
+        if self.running:
+            return False
+        self.interval = interval if interval is not None else self.DEFAULT_INTERVAL
+        self.stop_event.clear()
+        self.started_at = time.monotonic()
+        self.thread = threading.Thread(
+            target=self._sample_loop, args=(duration,), name='profiler', daemon=True
+        )
+        self.thread.start()
+        return True
+
+    def stop(self):
+        """
+        Stop sampling.
+
+        Returns:
+            bool: False if the profiler was not running.
+        """
+        if not self.running:
+            return False
+        self.stop_event.set()
+        self.thread.join(timeout=5.0)
+        return True
+
+    def _sample_loop(self, duration):
+        deadline = time.monotonic() + duration if duration else None
+        own_id = threading.get_ident()
+        try:
+            while not self.stop_event.wait(self.interval):
+                self._sample(own_id)
+                if deadline and time.monotonic() >= deadline:
+                    break
+        finally:
+            with self.lock:
+                self.elapsed += time.monotonic() - self.started_at
+
+    def _sample(self, own_id):
+        names = {t.ident: t.name for t in threading.enumerate()}
+        frames = sys._current_frames()
+        stacks = []
+        for thread_id, frame in frames.items():
+            if thread_id == own_id:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.MAX_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(self._thread_label(names.get(thread_id, str(thread_id))))
+            stack.reverse()
+            stacks.append(';'.join(stack))
+        del frames
+
+        with self.lock:
+            self.samples.update(stacks)
+            self.sample_count += 1
+
+    @staticmethod
+    def _thread_label(name):
+        """Group short-lived threads by target: 'Thread-12 (_handle_message)' -> '_handle_message'."""
+        match = re.match(r'^Thread-\d+ \((.+)\)$', name)
+        if match:
+            return match.group(1)
+        return re.sub(r'-\d+$', '', name)
+
+    def dump(self, reset=True):
+        """
+        Write collected samples as folded stacks ('frame;frame;frame count').
+
+        Args:
+            reset (bool): Clear the samples after writing them.
+
+        Returns:
+            dict: file path, samples taken and seconds profiled; file is None
+                when nothing was sampled.
+        """
+        with self.lock:
+            samples = self.samples
+            sample_count = self.sample_count
+            elapsed = self.elapsed + (time.monotonic() - self.started_at if self.running else 0.0)
+            if reset:
+                self.samples = collections.Counter()
+                self.sample_count = 0
+                self.elapsed = 0.0
+                if self.running:
+                    self.started_at = time.monotonic()
+
+        result = {'file': None, 'samples': sample_count, 'seconds': round(elapsed, 3)}
+        if not samples:
+            return result
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        path = os.path.join(self.log_dir, f'profile_{self.node_id}_{timestamp}.folded')
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f"{stack} {count}\n")
+        result['file'] = path
+        return result
+
+    def get_status(self):
+        """Running state and samples collected so far."""
+        with self.lock:
+            return {
+                'running': self.running,
+                'samples': self.sample_count,
+                'interval_ms': self.interval * 1000
+            }
@@ -6,6 +6,9 @@ Handles message formatting, parsing, and protocol specifications.
 class MessageFormatter:
     """Handles message formatting with length prefix as per protocol specification."""
     
+    # Commands exchanged between nodes; anything else is accounted as UNKNOWN
+    OVERLAY_COMMANDS = frozenset({'JOIN', 'JOINOK', 'LEAVE', 'LEAVEOK', 'SER', 'SEROK', 'ERROR'})
+    
     @staticmethod
     def format_message(message):
         """
@@ -42,6 +45,27 @@ class MessageFormatter:
             return message.split()
         return []
     
+    @staticmethod
+    def get_command(data):
+        """
+        Get the command word of a raw message without fully parsing it.
+        
+        Args:
+            data (bytes or str): Raw message data
+            
+        Returns:
+            str: Overlay command such as 'SER', or 'UNKNOWN' for anything else
+                (per-command counters and metric labels must stay bounded)
+        """
+        if isinstance(data, bytes):
+            data = data[5:30].decode('utf-8', errors='replace')
+        else:
+            data = data[5:30]
+        parts = data.split(None, 1)
+        if parts and parts[0] in MessageFormatter.OVERLAY_COMMANDS:
+            return parts[0]
+        return 'UNKNOWN'
+    
     @staticmethod
     def create_reg_message(ip, port, username):
         """Create REG message for bootstrap server."""
@@ -54,6 +78,12 @@ class MessageFormatter:
         message = f"UNREG {ip} {port} {username}"
         return MessageFormatter.format_message(message)
     
+    @staticmethod
+    def create_renew_message(ip, port, username):
+        """Create RENEW message extending the bootstrap server lease."""
+        message = f"RENEW {ip} {port} {username}"
+        return MessageFormatter.format_message(message)
+    
     @staticmethod
     def create_join_message(ip, port):
         """Create JOIN message for other nodes."""
@@ -87,7 +117,8 @@ class MessageFormatter:
     @staticmethod
     def create_serok_message(num_files, ip, port, hops, filenames):
         """Create SEROK (search response) message."""
-        files_str = " ".join(filenames)
+        # Quote names containing spaces, as SER does, so they survive tokenizing
+        files_str = " ".join(f'"{name}"' if ' ' in name else name for name in filenames)
         message = f"SEROK {num_files} {ip} {port} {hops} {files_str}"
         return MessageFormatter.format_message(message)
     
@@ -168,6 +199,36 @@ class MessageParser:
             }
         return None
     
+    @staticmethod
+    def join_quoted(tokens):
+        """
+        Regroup tokens of quoted multi-word names.
+        
+        Args:
+            tokens (list): Tokens such as ['"Harry', 'Potter"', 'Glee']
+            
+        Returns:
+            list: Names such as ['Harry Potter', 'Glee']
+        """
+        names = []
+        current = None
+        for token in tokens:
+            if current is None:
+                if token.startswith('"') and not (len(token) > 1 and token.endswith('"')):
+                    current = [token[1:]]
+                else:
+                    names.append(token.strip('"'))
+            else:
+                if token.endswith('"'):
+                    current.append(token[:-1])
+                    names.append(" ".join(current))
+                    current = None
+                else:
+                    current.append(token)
+        if current is not None:
+            names.append(" ".join(current))
+        return names
+    
     @staticmethod
     def parse_serok(tokens):
         """Parse SEROK (search response) message."""
@@ -176,7 +237,7 @@ class MessageParser:
             ip = tokens[2]
             port = int(tokens[3])
             hops = int(tokens[4])
-            filenames = tokens[5:] if num_files > 0 else []
+            filenames = MessageParser.join_quoted(tokens[5:]) if num_files > 0 else []
             
             return {
                 'num_files': num_files,
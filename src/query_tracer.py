@@ -0,0 +1,106 @@
+"""
+Opt-in hop-by-hop tracing of search queries.
+Each node keeps a compact in-memory buffer of relay records and appends it to
+logs/trace_<node_id>.csv, where trace_analyzer.py can merge all nodes' traces.
+"""
+
+import collections
+import csv
+import os
+import threading
+import time
+
+
+class QueryTracer:
+    """Per-node trace buffer of SER/SEROK relay events."""
+
+    FIELDS = ['kind', 'query_key', 'src', 'dst', 'hop', 'mono_ns', 'wall_ns']
+    FLUSH_INTERVAL = 5.0
+
+    def __init__(self, node_id, log_dir='logs', capacity=100000):
+        """
+        Args:
+            node_id (str): Node identifier used in the trace file name.
+            log_dir (str): Directory shared with the node's CSV logs.
+            capacity (int): Records kept in memory before the oldest are dropped.
+        """
+        self.node_id = node_id
+        self.trace_file = os.path.join(log_dir, f'trace_{node_id}.csv')
+        self.buffer = collections.deque(maxlen=capacity)
+        self.enabled = False
+        self.file_lock = threading.Lock()
+        self.flusher = None
+        self.flusher_stop = threading.Event()
+
+        os.makedirs(log_dir, exist_ok=True)
+
+    @staticmethod
+    def query_key(originator_ip, originator_port, filename):
+        """
+        Key shared by every record of a query across nodes.
+        SER carries no query id, so repeated identical queries are split apart
+        offline using the originator's ORIGIN records.
+        """
+        return f"{originator_ip}:{originator_port}|{filename}"
+
+    def start(self):
+        """Enable tracing and start periodic flushing."""
+        if self.enabled:
+            return
+        self.enabled = True
+        # Each flusher gets its own event, so a quick off/on cannot revive the old one
+        self.flusher_stop = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_loop, args=(self.flusher_stop,), daemon=True)
+        self.flusher.start()
+        print(f"[TRACE] Tracing to {self.trace_file}")
+
+    def stop(self):
+        """Disable tracing, stop the flusher and write out what is buffered."""
+        self.enabled = False
+        self.flusher_stop.set()
+        if self.flusher:
+            self.flusher.join()
+        self.flusher = None
+        self.flush()
+
+    def record(self, kind, query_key, src, dst, hop):
+        """
+        Record one event. Kinds: ORIGIN, SEND, RECV, HIT, RESULT.
+
+        Args:
+            kind (str): Event kind.
+            query_key (str): Key from query_key().
+            src (tuple): (ip, port) the message came from.
+            dst (tuple): (ip, port) the message went to.
+            hop (int): Hop count carried by the message.
+        """
+        if not self.enabled:
+            return
+        # deque.append is atomic, so handler threads need no lock here
+        self.buffer.append((
+            kind, query_key, f"{src[0]}:{src[1]}", f"{dst[0]}:{dst[1]}",
+            hop, time.monotonic_ns(), time.time_ns()
+        ))
+
+    def flush(self):
+        """Append buffered records to the trace file."""
+        with self.file_lock:
+            rows = []
+            while self.buffer:
+                try:
+                    rows.append(self.buffer.popleft())
+                except IndexError:
+                    break
+            if not rows:
+                return
+
+            new_file = not os.path.exists(self.trace_file)
+            with open(self.trace_file, 'a', newline='') as f:
+                writer = csv.writer(f)
+                if new_file:
+                    writer.writerow(self.FIELDS)
+                writer.writerows(rows)
+
+    def _flush_loop(self, stop):
+        while not stop.wait(self.FLUSH_INTERVAL):
+            self.flush()
@@ -12,14 +12,22 @@ class SearchEngine:
     """Handles file searching with flooding algorithm and query management."""
     
     MAX_HOPS = 10  # Maximum hops to prevent excessive forwarding
+    PENDING_TIMEOUT = 30  # Seconds a query counts as pending (awaiting responses)
     
-    def __init__(self, node):
+    def __init__(self, node, clock=time.time):
+        """
+        Args:
+            node: Node whose routing table, statistics and send methods are used
+            clock (callable): Wall-clock time source (simulations pass a virtual clock)
+        """
         self.node = node
+        self.clock = clock
         self.files = []
         self.query_cache = set()  # Track seen queries to avoid loops
         self.cache_lock = threading.Lock()
         self.pending_queries = {}  # Track queries waiting for responses
         self.pending_lock = threading.Lock()
+        self.tracer = None  # QueryTracer when tracing is enabled
     
     def set_files(self, files):
         """Set the list of files this node has."""
@@ -35,28 +43,22 @@ class SearchEngine:
         Returns:
             list: Matching filenames
         """
-        query_words = query.lower().split()
-        matches = []
-        
-        for filename in self.files:
-            filename_lower = filename.lower()
-            # Check if all query words appear as complete words in filename
-            all_match = True
-            for word in query_words:
-                # Use word boundary regex for exact word matching
-                pattern = r'\b' + re.escape(word) + r'\b'
-                if not re.search(pattern, filename_lower):
-                    all_match = False
-                    break
-            
-            if all_match:
-                matches.append(filename)
-        
-        return matches
+        return [filename for filename in self.files if self.matches_query(query, filename)]
+    
+    @staticmethod
+    def matches_query(query, filename):
+        """Check if every query word appears as a complete word in the filename."""
+        filename_lower = filename.lower()
+        for word in query.lower().split():
+            # Use word boundary regex for exact word matching
+            pattern = r'\b' + re.escape(word) + r'\b'
+            if not re.search(pattern, filename_lower):
+                return False
+        return True
     
     def generate_query_id(self, originator_ip, originator_port):
         """Generate unique query ID."""
-        timestamp = int(time.time() * 1000)
+        timestamp = int(self.clock() * 1000)
         return f"{originator_ip}:{originator_port}:{timestamp}"
     
     def is_query_seen(self, query_id):
@@ -69,6 +71,12 @@ class SearchEngine:
         with self.cache_lock:
             self.query_cache.add(query_id)
     
+    def _trace(self, kind, originator_ip, originator_port, filename, src, dst, hop):
+        """Record a relay event if tracing is enabled."""
+        if self.tracer and self.tracer.enabled:
+            key = self.tracer.query_key(originator_ip, originator_port, filename)
+            self.tracer.record(kind, key, src, dst, hop)
+    
     def handle_search_request(self, originator_ip, originator_port, filename, hops, sender_addr):
         """
         Handle incoming search request.
@@ -80,6 +88,9 @@ class SearchEngine:
             hops (int): Number of hops so far
             sender_addr (tuple): (ip, port) of node that sent this message
         """
+        self_addr = (self.node.ip, self.node.port)
+        self._trace('RECV', originator_ip, originator_port, filename, sender_addr, self_addr, hops)
+        
         # Check TTL - drop if exceeded max hops
         if hops >= self.MAX_HOPS:
             return
@@ -103,6 +114,8 @@ class SearchEngine:
         if matches:
             # Found files - send response back to originator
             self.node.statistics.record_query_answered()
+            self._trace('HIT', originator_ip, originator_port, filename,
+                        self_addr, (originator_ip, originator_port), hops)
             self.node.send_search_response(
                 originator_ip, originator_port, matches, hops
             )
@@ -122,6 +135,8 @@ class SearchEngine:
                 continue
             
             # Forward the search with incremented hop count
+            self._trace('SEND', originator_ip, originator_port, filename,
+                        self_addr, (neighbor['ip'], neighbor['port']), hops + 1)
             self.node.forward_search(
                 neighbor['ip'], neighbor['port'],
                 originator_ip, originator_port,
@@ -147,14 +162,24 @@ class SearchEngine:
         
         # Store pending query info
         with self.pending_lock:
+            self._prune_pending(self.clock())
             self.pending_queries[query_id] = {
                 'filename': filename,
-                'start_time': time.time(),
+                'start_time': self.clock(),
                 'responses': []
             }
         
+        self_addr = (self.node.ip, self.node.port)
+        self._trace('ORIGIN', self.node.ip, self.node.port, filename, self_addr, self_addr, 0)
+        
         # Search locally first
         local_matches = self.search_local(filename)
+        # Success rates are derived from these and the SEARCH_RESULTs that follow
+        self.node.statistics.log_event(
+            event_type='QUERY_ISSUED',
+            query=filename,
+            status='LOCAL_HIT' if local_matches else ''
+        )
         if local_matches:
             print(f"[SEARCH] Found locally: {local_matches}")
             with self.pending_lock:
@@ -162,13 +187,16 @@ class SearchEngine:
                     'ip': self.node.ip,
                     'port': self.node.port,
                     'files': local_matches,
-                    'hops': 0
+                    'hops': 0,
+                    'latency_ms': 0.0
                 })
         
         # Forward to all neighbors
         neighbors = self.node.routing_table.get_neighbors()
         if neighbors:
             for neighbor in neighbors:
+                self._trace('SEND', self.node.ip, self.node.port, filename,
+                            self_addr, (neighbor['ip'], neighbor['port']), 1)
                 self.node.forward_search(
                     neighbor['ip'], neighbor['port'],
                     self.node.ip, self.node.port,
@@ -188,17 +216,32 @@ class SearchEngine:
             matched_query = None
             
             with self.pending_lock:
-                # Find matching query
-                # We assume the response corresponds to one of the pending queries
-                # Since we don't have query ID in the protocol, and parallel queries are not required,
-                # we can match with the active pending query.
-                current_time = time.time()
-                # Get the most recent query if multiple exist
-                if self.pending_queries:
-                    # Get the last added query (assuming dict preserves insertion order in Python 3.7+)
-                    qid = list(self.pending_queries.keys())[-1]
-                    matched_query = self.pending_queries[qid]
+                # SEROK carries no query id, so credit the newest pending query
+                # that every returned filename answers (concurrent searches for
+                # different files, e.g. fetch alongside run-queries, stay apart)
+                current_time = self.clock()
+                for query in reversed(list(self.pending_queries.values())):
+                    if current_time - query['start_time'] > self.PENDING_TIMEOUT:
+                        break
+                    if all(self.matches_query(query['filename'], f) for f in filenames):
+                        matched_query = query
+                        break
+                if matched_query:
                     latency = (current_time - matched_query['start_time']) * 1000  # ms
+                    matched_query['responses'].append({
+                        'ip': ip,
+                        'port': port,
+                        'files': filenames,
+                        'hops': hops,
+                        'latency_ms': latency
+                    })
+            
+            if matched_query:
+                self._trace('RESULT', self.node.ip, self.node.port, matched_query['filename'],
+                            (ip, port), (self.node.ip, self.node.port), hops)
+                # Late or unmatched responses have no latency to record
+                self.node.statistics.record_latency(latency)
+                self.node.statistics.record_hop(hops)
             
             print(f"\n[RESULT] Found {num_files} file(s) at {ip}:{port} (hops: {hops}, latency: {latency:.2f}ms)")
             for filename in filenames:
@@ -213,3 +256,31 @@ class SearchEngine:
                 sender_ip=ip,
                 sender_port=port
             )
+    
+    def get_responses(self, query_id):
+        """
+        Get the responses collected so far for a query.
+        
+        Args:
+            query_id (str): ID returned by initiate_search
+            
+        Returns:
+            list: Response dicts with ip, port, files, hops and latency_ms
+        """
+        with self.pending_lock:
+            query = self.pending_queries.get(query_id)
+            return list(query['responses']) if query else []
+    
+    def _prune_pending(self, now):
+        """Forget queries past PENDING_TIMEOUT. Caller must hold pending_lock."""
+        # Queries are inserted in start order, so expired ones are at the front
+        for query_id in list(self.pending_queries):
+            if now - self.pending_queries[query_id]['start_time'] <= self.PENDING_TIMEOUT:
+                break
+            del self.pending_queries[query_id]
+    
+    def get_pending_count(self):
+        """Number of queries started within the last PENDING_TIMEOUT seconds."""
+        cutoff = self.clock() - self.PENDING_TIMEOUT
+        with self.pending_lock:
+            return sum(1 for q in self.pending_queries.values() if q['start_time'] >= cutoff)
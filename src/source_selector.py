@@ -0,0 +1,74 @@
+"""
+Ranking of search responders for automatic search-then-fetch.
+"""
+
+
+class SourceSelector:
+    """Picks a file from search responses and orders its holders, best first."""
+
+    HOP_PENALTY_MS = 50.0     # Each extra hop counts like this much response latency
+    LOAD_PENALTY_MS = 500.0   # Full upload slots count like this much response latency
+    MAX_PROBES = 5            # Holders whose load is probed before ranking
+
+    def choose_file(self, query_responses):
+        """
+        Pick the file to fetch: the one advertised by the most holders.
+
+        Args:
+            query_responses (list): Response dicts with 'files' lists.
+
+        Returns:
+            str: Chosen filename, or None if there were no results.
+        """
+        holders = {}
+        for response in query_responses:
+            for filename in response['files']:
+                holders[filename] = holders.get(filename, 0) + 1
+        if not holders:
+            return None
+        # Ties go to the file seen first
+        return max(holders, key=holders.get)
+
+    def rank(self, query_responses, filename, load_probe=None):
+        """
+        Order holders of a file by response latency, hops and advertised load.
+
+        Args:
+            query_responses (list): Response dicts (ip, port, files, hops, latency_ms).
+            filename (str): File to fetch.
+            load_probe (callable): Optional load_probe(ip, port) returning the
+                holder's upload load in [0, inf), or None if it did not answer.
+
+        Returns:
+            list: Candidate dicts (ip, port, hops, latency_ms, load, score), best first.
+        """
+        seen = set()
+        candidates = []
+        for response in query_responses:
+            key = (response['ip'], response['port'])
+            if filename not in response['files'] or key in seen:
+                continue
+            seen.add(key)
+            candidates.append({
+                'ip': response['ip'],
+                'port': response['port'],
+                'hops': response['hops'],
+                'latency_ms': response['latency_ms'],
+                'load': None
+            })
+
+        # Probe only the most promising holders to keep the pipeline fast
+        candidates.sort(key=lambda c: c['latency_ms'] + self.HOP_PENALTY_MS * c['hops'])
+        for candidate in candidates[:self.MAX_PROBES]:
+            if load_probe:
+                candidate['load'] = load_probe(candidate['ip'], candidate['port'])
+
+        for candidate in candidates:
+            # Unknown load is treated as fully busy
+            load = candidate['load'] if candidate['load'] is not None else 1.0
+            candidate['score'] = (candidate['latency_ms'] +
+                                  self.HOP_PENALTY_MS * candidate['hops'] +
+                                  self.LOAD_PENALTY_MS * load)
+
+        candidates.sort(key=lambda c: c['score'])
+        return candidates
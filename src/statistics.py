@@ -6,28 +6,35 @@ import threading
 import time
 import csv
 import os
+import queue
 from datetime import datetime
+from histogram import LogHistogram
+from protocol import MessageFormatter
+from sharded_counters import ShardedCounters
+
+
+_STOP = object()  # Queue sentinel telling the log writer to exit
 
 
 class Statistics:
     """Track and log statistics for performance analysis."""
     
+    FLUSH_SIZE = 256       # Rows buffered before the writer flushes
+    FLUSH_INTERVAL = 1.0   # Seconds before buffered rows are flushed anyway
+    
     def __init__(self, node_id, log_dir='logs'):
         self.node_id = node_id
         self.log_dir = log_dir
         
-        # Counters
-        self.queries_received = 0
-        self.queries_forwarded = 0
-        self.queries_answered = 0
-        self.messages_sent = 0
-        self.messages_received = 0
+        # Counters, striped over per-thread-id locks instead of self.lock. Per-command
+        # traffic uses (direction, command, 'datagrams' | 'bytes') keys.
+        self.counters = ShardedCounters()
         
-        # Performance metrics
-        self.hops_list = []
-        self.latencies = []
+        # Performance metrics (fixed memory, however many queries are recorded)
+        self.hop_histogram = LogHistogram(min_value=1, max_value=1000, precision=0.01)
+        self.latency_histogram = LogHistogram(min_value=0.01, max_value=3600000.0, precision=0.01)
         
-        self.lock = threading.Lock()
+        self.lock = threading.Lock()  # Guards the histograms
         
         # Create logs directory
         os.makedirs(log_dir, exist_ok=True)
@@ -35,6 +42,13 @@ class Statistics:
         
         # Initialize CSV log
         self._init_log()
+        
+        # Events are written by a background thread in batches
+        self.event_queue = queue.Queue()
+        self.stopped = False
+        self.state_lock = threading.Lock()  # Orders queueing against stop()
+        self.writer_thread = threading.Thread(target=self._write_events, daemon=True)
+        self.writer_thread.start()
     
     def _init_log(self):
         """Initialize CSV log file."""
@@ -42,72 +56,234 @@ class Statistics:
             writer = csv.writer(f)
             writer.writerow([
                 'timestamp', 'event_type', 'query', 'hops', 
-                'latency_ms', 'sender_ip', 'sender_port'
+                'latency_ms', 'sender_ip', 'sender_port',
+                'size_bytes', 'status'
             ])
     
     def log_event(self, event_type, query='', hops=0, latency_ms=0, 
-                   sender_ip='', sender_port=''):
-        """Log an event to CSV file."""
+                   sender_ip='', sender_port='', size_bytes='', status=''):
+        """Queue an event for the CSV log."""
+        row = [
+            datetime.now().isoformat(),
+            event_type,
+            query,
+            hops,
+            latency_ms,
+            sender_ip,
+            sender_port,
+            size_bytes,
+            status
+        ]
+        with self.state_lock:
+            if not self.stopped:
+                self.event_queue.put(row)
+                return
+        
+        # Stopped: append directly once the writer has drained what was queued before _STOP
+        self.writer_thread.join(timeout=5.0)
+        if self.writer_thread.is_alive():
+            self.counters.add('events_dropped')
+            return
+        with self.state_lock:
+            with open(self.log_file, 'a', newline='') as f:
+                csv.writer(f).writerow(row)
+    
+    def _write_events(self):
+        """Background writer: batch queued rows, flush on size or interval."""
         with open(self.log_file, 'a', newline='') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                datetime.now().isoformat(),
-                event_type,
-                query,
-                hops,
-                latency_ms,
-                sender_ip,
-                sender_port
-            ])
+            batch = []
+            last_flush = time.monotonic()
+            
+            while True:
+                timeout = max(self.FLUSH_INTERVAL - (time.monotonic() - last_flush), 0.01)
+                try:
+                    item = self.event_queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+                
+                if isinstance(item, list):
+                    batch.append(item)
+                    # Take whatever else is already waiting without blocking
+                    while len(batch) < self.FLUSH_SIZE:
+                        try:
+                            item = self.event_queue.get_nowait()
+                        except queue.Empty:
+                            item = None
+                            break
+                        if not isinstance(item, list):
+                            break
+                        batch.append(item)
+                
+                due = time.monotonic() - last_flush >= self.FLUSH_INTERVAL
+                if item is not None or len(batch) >= self.FLUSH_SIZE or due:
+                    if batch:
+                        writer.writerows(batch)
+                        batch.clear()
+                    f.flush()
+                    last_flush = time.monotonic()
+                
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is _STOP:
+                    return
+    
+    def flush(self, timeout=5.0):
+        """Block until every event logged so far is on disk."""
+        with self.state_lock:
+            if self.stopped:
+                return
+            done = threading.Event()
+            self.event_queue.put(done)
+        done.wait(timeout)
+    
+    def stop(self):
+        """Flush remaining events and stop the writer thread."""
+        with self.state_lock:
+            if self.stopped:
+                return
+            # Set before _STOP is queued, so no event can land behind it
+            self.stopped = True
+            self.event_queue.put(_STOP)
+        self.writer_thread.join(timeout=5.0)
     
     def record_query_received(self):
         """Record that a query was received."""
-        with self.lock:
-            self.queries_received += 1
-            self.messages_received += 1
+        self.counters.add('queries_received')
     
     def record_query_forwarded(self):
-        """Record that a query was forwarded."""
-        with self.lock:
-            self.queries_forwarded += 1
-            self.messages_sent += 1
+        """Record that a query was forwarded (SER datagrams are counted per command)."""
+        self.counters.add('queries_forwarded')
     
     def record_query_answered(self):
         """Record that a query was answered."""
-        with self.lock:
-            self.queries_answered += 1
-            self.messages_sent += 1
+        self.counters.add('queries_answered')
     
-    def record_message_sent(self):
-        """Record a message sent."""
-        with self.lock:
-            self.messages_sent += 1
+    def record_message_sent(self, command=None, size=0):
+        """
+        Record a message sent.
+        
+        Args:
+            command (str): Overlay command, e.g. 'SER', for per-command accounting
+                (others are counted as 'UNKNOWN')
+            size (int): Datagram size in bytes
+        """
+        if command and command not in MessageFormatter.OVERLAY_COMMANDS:
+            command = 'UNKNOWN'  # Keeps summary keys and metric labels bounded
+        # Runs for every datagram: update this thread's stripe in one go
+        lock, counts = self.counters.stripe()
+        with lock:
+            get = counts.get
+            counts['messages_sent'] = get('messages_sent', 0) + 1
+            counts['bytes_sent'] = get('bytes_sent', 0) + size
+            if command:
+                key = ('sent', command, 'datagrams')
+                counts[key] = get(key, 0) + 1
+                key = ('sent', command, 'bytes')
+                counts[key] = get(key, 0) + size
     
-    def record_message_received(self):
-        """Record a message received."""
+    def record_message_received(self, command=None, size=0):
+        """
+        Record a message received.
+        
+        Args:
+            command (str): Overlay command, e.g. 'SER', for per-command accounting
+                (others are counted as 'UNKNOWN')
+            size (int): Datagram size in bytes
+        """
+        if command and command not in MessageFormatter.OVERLAY_COMMANDS:
+            command = 'UNKNOWN'
+        lock, counts = self.counters.stripe()
+        with lock:
+            get = counts.get
+            counts['messages_received'] = get('messages_received', 0) + 1
+            counts['bytes_received'] = get('bytes_received', 0) + size
+            if command:
+                key = ('received', command, 'datagrams')
+                counts[key] = get(key, 0) + 1
+                key = ('received', command, 'bytes')
+                counts[key] = get(key, 0) + size
+    
+    def get_command_counts(self):
+        """Get messages per (direction, command)."""
+        return {key: datagrams for key, (datagrams, _) in self.get_command_traffic().items()}
+    
+    def get_command_traffic(self):
+        """Get (datagrams, bytes) per (direction, command)."""
+        return self._command_traffic(self.counters.snapshot())
+    
+    @staticmethod
+    def _command_traffic(totals):
+        traffic = {}
+        for key, value in totals.items():
+            if isinstance(key, tuple):
+                direction, command, unit = key
+                datagrams, size = traffic.get((direction, command), (0, 0))
+                if unit == 'datagrams':
+                    datagrams = value
+                else:
+                    size = value
+                traffic[(direction, command)] = (datagrams, size)
+        return traffic
+    
+    def get_histograms(self):
+        """Get snapshots of the latency and hop histograms."""
         with self.lock:
-            self.messages_received += 1
+            return {
+                'latency_ms': LogHistogram.from_dict(self.latency_histogram.to_dict()),
+                'hops': LogHistogram.from_dict(self.hop_histogram.to_dict())
+            }
+    
+    def record_upload_served(self):
+        """Record that a download request was admitted and served."""
+        self.counters.add('uploads_served')
+    
+    def record_replica_acquired(self):
+        """Record that a downloaded file was added to the served set."""
+        self.counters.add('replicas_acquired')
     
     def record_hop(self, hop_count):
         """Record hop count for a query."""
         with self.lock:
-            self.hops_list.append(hop_count)
+            self.hop_histogram.record(hop_count)
     
     def record_latency(self, latency_ms):
         """Record latency for a query."""
         with self.lock:
-            self.latencies.append(latency_ms)
+            self.latency_histogram.record(latency_ms)
     
     def get_stats(self):
         """Get current statistics."""
+        totals = self.counters.snapshot()
+        stats = {
+            key: totals.get(key, 0) for key in (
+                'queries_received', 'queries_forwarded', 'queries_answered',
+                'messages_sent', 'messages_received', 'bytes_sent', 'bytes_received',
+                'uploads_served', 'replicas_acquired', 'events_dropped'
+            )
+        }
+        # One row per direction and command, e.g. sent_SER_datagrams / sent_SER_bytes
+        for (direction, command), (datagrams, size) in sorted(self._command_traffic(totals).items()):
+            stats[f'{direction}_{command}_datagrams'] = datagrams
+            stats[f'{direction}_{command}_bytes'] = size
+        
         with self.lock:
-            return {
-                'queries_received': self.queries_received,
-                'queries_forwarded': self.queries_forwarded,
-                'queries_answered': self.queries_answered,
-                'messages_sent': self.messages_sent,
-                'messages_received': self.messages_received
-            }
+            latency = self.latency_histogram.summary()
+            hops = self.hop_histogram.summary()
+            latency_std = self.latency_histogram.std_dev
+        
+        stats['latency_count'] = latency['count']
+        for key in ('mean', 'min', 'p50', 'p90', 'p99', 'max'):
+            stats[f'latency_{key}_ms'] = round(latency[key], 3) if latency[key] is not None else ''
+        stats['latency_std_ms'] = round(latency_std, 3) if latency_std is not None else ''
+        stats['hops_count'] = hops['count']
+        for key in ('mean', 'min', 'p50', 'p90', 'p99', 'max'):
+            if hops[key] is None:
+                stats[f'hops_{key}'] = ''
+            else:
+                # Hop counts are integers; bucket bounds are within 1% of them
+                stats[f'hops_{key}'] = round(hops[key], 2) if key == 'mean' else round(hops[key])
+        return stats
     
     def save_summary(self):
         """Save summary stats to a separate CSV file."""
@@ -135,38 +311,29 @@ class Statistics:
         print(f"Queries Answered:  {stats['queries_answered']}")
         print(f"Messages Sent:     {stats['messages_sent']}")
         print(f"Messages Received: {stats['messages_received']}")
+        print(f"Bytes Sent:        {stats['bytes_sent']}")
+        print(f"Bytes Received:    {stats['bytes_received']}")
+        print(f"Uploads Served:    {stats['uploads_served']}")
+        print(f"Replicas Acquired: {stats['replicas_acquired']}")
         
-        # Calculate latency and hops stats from log file
-        latencies = []
-        hops_list = []
+        # Latency and hops come from the in-memory histograms
+        traffic = self.get_command_traffic()
+        if traffic:
+            print("\n--- Traffic by Command ---")
+            for (direction, command), (datagrams, size) in sorted(traffic.items()):
+                print(f"{direction:<9}{command:<9}{datagrams:>8} datagrams {size:>10} bytes")
         
-        try:
-            if os.path.exists(self.log_file):
-                with open(self.log_file, 'r') as f:
-                    reader = csv.DictReader(f)
-                    for row in reader:
-                        if row['event_type'] == 'SEARCH_RESULT':
-                            try:
-                                latencies.append(float(row['latency_ms']))
-                                hops_list.append(int(row['hops']))
-                            except ValueError:
-                                continue
-            
-            if latencies:
-                print("\n--- Performance Metrics ---")
-                avg_lat = sum(latencies)/len(latencies)
-                print(f"Latency (ms): Min={min(latencies):.2f}, Max={max(latencies):.2f}, Avg={avg_lat:.2f}")
-                
-                if len(latencies) > 1:
-                    variance = sum((x - avg_lat) ** 2 for x in latencies) / (len(latencies) - 1)
-                    std_dev = variance ** 0.5
-                    print(f"Latency StdDev: {std_dev:.2f}")
-            
-            if hops_list:
-                avg_hops = sum(hops_list)/len(hops_list)
-                print(f"Hops:         Min={min(hops_list)}, Max={max(hops_list)}, Avg={avg_hops:.2f}")
-                
-        except Exception as e:
-            print(f"Error calculating stats: {e}")
+        if stats['latency_count']:
+            print("\n--- Performance Metrics ---")
+            print(f"Latency (ms): Min={stats['latency_min_ms']:.2f}, Max={stats['latency_max_ms']:.2f}, "
+                  f"Avg={stats['latency_mean_ms']:.2f}")
+            print(f"Latency (ms): P50={stats['latency_p50_ms']:.2f}, P90={stats['latency_p90_ms']:.2f}, "
+                  f"P99={stats['latency_p99_ms']:.2f}")
+            if stats['latency_std_ms'] != '':
+                print(f"Latency StdDev: {stats['latency_std_ms']:.2f}")
+        
+        if stats['hops_count']:
+            print(f"Hops:         Min={stats['hops_min']}, Max={stats['hops_max']}, Avg={stats['hops_mean']:.2f}, "
+                  f"P50={stats['hops_p50']}, P90={stats['hops_p90']}, P99={stats['hops_p99']}")
             
         print("=====================\n")
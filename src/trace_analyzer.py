@@ -0,0 +1,253 @@
+"""
+Offline analysis of hop-by-hop search traces.
+Merges logs/trace_*.csv from every node (recorded with node.py --trace) into the
+propagation tree of each query and reports duplicate deliveries, redundant edges
+and the critical path to the first result.
+"""
+
+import argparse
+import bisect
+import collections
+import csv
+import glob
+import json
+import os
+from datetime import datetime
+
+
+def load_traces(log_dir='logs', clock='mono'):
+    """
+    Read every node's trace file.
+
+    Args:
+        log_dir (str): Directory holding trace_<node>.csv files.
+        clock (str): 'mono' (same host, monotonic) or 'wall' (across hosts).
+
+    Returns:
+        list: Record dicts sorted by timestamp.
+    """
+    records = []
+    ts_field = 'mono_ns' if clock == 'mono' else 'wall_ns'
+    for path in glob.glob(os.path.join(log_dir, 'trace_*.csv')):
+        with open(path, 'r', newline='') as f:
+            for row in csv.DictReader(f):
+                records.append({
+                    'kind': row['kind'],
+                    'key': row['query_key'],
+                    'src': row['src'],
+                    'dst': row['dst'],
+                    'hop': int(row['hop']),
+                    'ts': int(row[ts_field]),
+                    'wall_ns': int(row['wall_ns'])
+                })
+    records.sort(key=lambda r: r['ts'])
+    return records
+
+
+def split_instances(records):
+    """
+    Group records into query instances.
+
+    SER has no query id, so records share a key per (originator, query). Each
+    ORIGIN record starts a new instance and later records belong to the most
+    recent one; records seen before any ORIGIN form an instance without origin.
+
+    Returns:
+        list: Instance dicts with key, origin record (or None) and records.
+    """
+    by_key = collections.defaultdict(list)
+    for record in records:
+        by_key[record['key']].append(record)
+
+    instances = []
+    for key, key_records in by_key.items():
+        origins = [r for r in key_records if r['kind'] == 'ORIGIN']
+        starts = [r['ts'] for r in origins]
+        groups = [[] for _ in range(len(origins) + 1)]
+        for record in key_records:
+            if record['kind'] != 'ORIGIN':
+                groups[bisect.bisect_right(starts, record['ts'])].append(record)
+
+        if groups[0]:
+            instances.append({'key': key, 'origin': None, 'records': groups[0]})
+        for origin, group in zip(origins, groups[1:]):
+            instances.append({'key': key, 'origin': origin, 'records': group})
+
+    instances.sort(key=lambda i: (i['origin'] or i['records'][0])['ts'])
+    return instances
+
+
+def _path_to(delivery, recvs_by_node, origin_addr):
+    """
+    Walk a delivery back to the originator.
+    At each step the sender's own delivery is the latest one with one hop less
+    that arrived before it forwarded, which stays correct when nodes re-forward
+    duplicates.
+    """
+    path = [delivery]
+    current = delivery
+    while current['src'] != origin_addr and current['hop'] > 1:
+        previous = None
+        for recv in recvs_by_node.get(current['src'], []):
+            if recv['hop'] == current['hop'] - 1 and recv['ts'] <= current['ts']:
+                previous = recv
+        if previous is None:
+            break
+        path.append(previous)
+        current = previous
+    path.reverse()
+    return path
+
+
+def analyze_instance(instance):
+    """
+    Build the propagation tree of one query instance.
+
+    Returns:
+        dict: Tree, duplicate, redundant-edge and critical-path figures.
+    """
+    key = instance['key']
+    origin = instance['origin']
+    origin_addr, query = key.split('|', 1)
+    start_ts = origin['ts'] if origin else instance['records'][0]['ts']
+
+    recvs = [r for r in instance['records'] if r['kind'] == 'RECV']
+    sends = [r for r in instance['records'] if r['kind'] == 'SEND']
+    results = [r for r in instance['records'] if r['kind'] == 'RESULT']
+
+    first_recv = {}
+    recvs_by_node = collections.defaultdict(list)
+    recv_edges = collections.Counter()
+    duplicates = 0
+    for recv in recvs:
+        recvs_by_node[recv['dst']].append(recv)
+        recv_edges[(recv['src'], recv['dst'])] += 1
+        if recv['dst'] in first_recv or recv['dst'] == origin_addr:
+            duplicates += 1
+        else:
+            first_recv[recv['dst']] = recv
+
+    tree_edges = {(r['src'], r['dst']) for r in first_recv.values()}
+    redundant_edges = sorted(set(recv_edges) - tree_edges)
+    send_edges = collections.Counter((s['src'], s['dst']) for s in sends)
+    undelivered = sum(max(0, count - recv_edges[edge]) for edge, count in send_edges.items())
+
+    analysis = {
+        'query': query,
+        'origin': origin_addr,
+        'started': datetime.fromtimestamp(
+            (origin or instance['records'][0])['wall_ns'] / 1e9).isoformat(),
+        'nodes_reached': len(first_recv),
+        'deliveries': len(recvs),
+        'duplicates': duplicates,
+        'undelivered': undelivered,
+        'max_depth': max((r['hop'] for r in first_recv.values()), default=0),
+        'tree': {node: r['src'] for node, r in first_recv.items()},
+        'redundant_edges': redundant_edges,
+        'results': len(results),
+        'first_result': None,
+        'critical_path': []
+    }
+
+    if results:
+        first = results[0]
+        analysis['first_result'] = {
+            'responder': first['src'],
+            'hops': first['hop'],
+            'latency_ms': (first['ts'] - start_ts) / 1e6
+        }
+        # The delivery that produced the hit carries the hop count of the SEROK
+        candidates = [r for r in recvs_by_node.get(first['src'], [])
+                      if r['hop'] == first['hop'] and r['ts'] <= first['ts']]
+        if candidates:
+            path = _path_to(candidates[0], recvs_by_node, origin_addr)
+            previous_ts = start_ts
+            steps = []
+            for recv in path:
+                steps.append({'from': recv['src'], 'to': recv['dst'],
+                              'ms': (recv['ts'] - previous_ts) / 1e6})
+                previous_ts = recv['ts']
+            steps.append({'from': first['src'], 'to': origin_addr,
+                          'ms': (first['ts'] - previous_ts) / 1e6})
+            analysis['critical_path'] = steps
+
+    return analysis
+
+
+def print_tree(analysis):
+    """Print the propagation tree rooted at the originator."""
+    children = collections.defaultdict(list)
+    for node, parent in analysis['tree'].items():
+        children[parent].append(node)
+
+    def walk(node, depth):
+        for child in sorted(children.get(node, [])):
+            print(f"    {'  ' * depth}└─ {child}")
+            walk(child, depth + 1)
+
+    print(f"    {analysis['origin']}")
+    walk(analysis['origin'], 0)
+
+
+def print_report(analyses, show_tree=False):
+    print("\n=== Query Propagation ===")
+    for analysis in analyses:
+        print(f"\nQuery '{analysis['query']}' from {analysis['origin']} at {analysis['started']}")
+        print(f"  Nodes reached: {analysis['nodes_reached']}, deliveries: {analysis['deliveries']}, "
+              f"duplicates: {analysis['duplicates']}, undelivered sends: {analysis['undelivered']}")
+        print(f"  Max depth: {analysis['max_depth']}, "
+              f"redundant edges: {len(analysis['redundant_edges'])}")
+        for src, dst in analysis['redundant_edges']:
+            print(f"    {src} -> {dst}")
+
+        first = analysis['first_result']
+        if first:
+            print(f"  First result: {first['responder']} (hops: {first['hops']}) "
+                  f"after {first['latency_ms']:.2f}ms")
+            if analysis['critical_path']:
+                steps = " ".join(f"-> {s['to']} (+{s['ms']:.2f}ms)" for s in analysis['critical_path'])
+                print(f"  Critical path: {analysis['origin']} {steps}")
+        else:
+            print("  No results")
+
+        if show_tree:
+            print("  Tree:")
+            print_tree(analysis)
+
+    total_deliveries = sum(a['deliveries'] for a in analyses)
+    total_duplicates = sum(a['duplicates'] for a in analyses)
+    print(f"\nQueries: {len(analyses)}, deliveries: {total_deliveries}, "
+          f"duplicates: {total_duplicates}"
+          + (f" ({100.0 * total_duplicates / total_deliveries:.1f}%)" if total_deliveries else ""))
+    print("=========================\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconstruct search propagation trees from node traces')
+    parser.add_argument('--log-dir', default='logs', help='Directory with trace_<node>.csv files')
+    parser.add_argument('--clock', choices=['mono', 'wall'], default='mono',
+                        help="Timestamps to order by: 'mono' for nodes on one host, 'wall' across hosts")
+    parser.add_argument('--query', help='Only show queries containing this text')
+    parser.add_argument('--tree', action='store_true', help='Print each propagation tree')
+    parser.add_argument('--json', help='Also write the analysis to this JSON file')
+    args = parser.parse_args()
+
+    records = load_traces(args.log_dir, args.clock)
+    if not records:
+        print(f"No trace records in {args.log_dir} (start nodes with --trace)")
+        return
+
+    analyses = [analyze_instance(i) for i in split_instances(records)]
+    if args.query:
+        analyses = [a for a in analyses if args.query.lower() in a['query'].lower()]
+
+    print_report(analyses, args.tree)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(analyses, f, indent=2)
+        print(f"Saved {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Datagram transports for overlay messages.
+A Node sends and receives JOIN/LEAVE/SER/SEROK datagrams through a transport:
+UDPTransport for real deployments, InMemoryTransport to run thousands of nodes
+in one process on a SimulatedNetwork's virtual clock.
+"""
+
+import heapq
+import random
+import socket
+import threading
+from collections import Counter
+
+from protocol import MessageFormatter
+
+
+class UDPTransport:
+    """Datagrams over a UDP socket; each one is handled on its own thread."""
+
+    def __init__(self):
+        self.sock = None
+        self.running = False
+        self.listener_thread = None
+        self.deliver = None
+
+    def open(self, address, deliver):
+        """
+        Bind and start receiving.
+
+        Args:
+            address (tuple): (ip, port) to bind
+            deliver (callable): Called as deliver(data, sender_address) per datagram
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(address)
+        self.deliver = deliver
+        self.running = True
+        self.listener_thread = threading.Thread(target=self._listen, daemon=True)
+        self.listener_thread.start()
+
+    def _listen(self):
+        """Listen for incoming UDP messages."""
+        self.sock.settimeout(1.0)
+
+        while self.running:
+            try:
+                data, addr = self.sock.recvfrom(65535)
+                # Process message in separate thread to avoid blocking
+                threading.Thread(target=self.deliver, args=(data, addr), daemon=True).start()
+            except socket.timeout:
+                continue
+            except Exception as e:
+                if self.running:
+                    print(f"[ERROR] Listener error: {e}")
+
+    def send(self, data, address):
+        self.sock.sendto(data, address)
+
+    def close(self):
+        self.running = False
+        if self.sock:
+            self.sock.close()
+
+
+class SimulatedNetwork:
+    """
+    Delivers datagrams between InMemoryTransports in timestamp order.
+
+    Every send is queued with a delivery time of now + the link's latency, and
+    run() pops events from a heap, advancing the virtual clock to each one, so
+    a flood across thousands of nodes runs single-threaded and deterministic.
+    Each pair of addresses keeps one latency, drawn when first used.
+    """
+
+    def __init__(self, latency=(0.005, 0.050), seed=0):
+        """
+        Args:
+            latency (tuple): (min, max) one-way link latency in seconds
+            seed (int): Random seed for link latencies
+        """
+        self.now = 0.0
+        self.latency_range = latency
+        self.rng = random.Random(seed)
+        self.endpoints = {}      # (ip, port) -> deliver callable
+        self.link_latency = {}   # (address, address) sorted -> seconds
+        self.queue = []          # Heap of (time, seq, destination, data, source)
+        self.seq = 0
+        self.by_command = Counter()  # Datagrams delivered per protocol command
+        self.by_node = Counter()     # Datagrams delivered per destination
+        self.dropped = 0             # Datagrams sent to an address nobody has opened
+
+    def clock(self):
+        """Virtual time in seconds (pass to SearchEngine and friends as their clock)."""
+        return self.now
+
+    def transport(self):
+        return InMemoryTransport(self)
+
+    def latency(self, source, destination):
+        link = (source, destination) if source < destination else (destination, source)
+        seconds = self.link_latency.get(link)
+        if seconds is None:
+            seconds = self.link_latency[link] = self.rng.uniform(*self.latency_range)
+        return seconds
+
+    def send(self, data, source, destination):
+        if destination not in self.endpoints:
+            self.dropped += 1
+            return
+        self.seq += 1
+        heapq.heappush(self.queue, (self.now + self.latency(source, destination),
+                                    self.seq, destination, data, source))
+
+    def run(self, until=None):
+        """
+        Deliver queued datagrams, including those sent while delivering.
+
+        Args:
+            until (float): Stop before events later than this virtual time;
+                None runs until the network is idle
+
+        Returns:
+            int: Datagrams delivered
+        """
+        delivered = 0
+        while self.queue and (until is None or self.queue[0][0] <= until):
+            self.now, _, destination, data, source = heapq.heappop(self.queue)
+            deliver = self.endpoints.get(destination)
+            if deliver is None:
+                self.dropped += 1  # Closed while the datagram was in flight
+                continue
+            self.by_command[MessageFormatter.get_command(data)] += 1
+            self.by_node[destination] += 1
+            delivered += 1
+            deliver(data, source)
+        if until is not None:
+            self.now = max(self.now, until)
+        return delivered
+
+
+class InMemoryTransport:
+    """One endpoint on a SimulatedNetwork; delivery runs on the caller's thread."""
+
+    def __init__(self, network):
+        self.network = network
+        self.address = None
+
+    def open(self, address, deliver):
+        self.address = address
+        self.network.endpoints[address] = deliver
+
+    def send(self, data, address):
+        self.network.send(data, self.address, address)
+
+    def close(self):
+        self.network.endpoints.pop(self.address, None)
@@ -0,0 +1,183 @@
+"""
+Upload admission control and fair bandwidth sharing for the REST file server.
+"""
+
+import collections
+import math
+import threading
+import time
+
+
+class TokenBucket:
+    """Token bucket rate limiter measured in bytes per second."""
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate (float): Refill rate in bytes/second (0 means unlimited).
+            capacity (float): Maximum burst in bytes (defaults to one second of rate).
+        """
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def set_rate(self, rate):
+        """Change the refill rate, keeping burst capacity at one second of rate."""
+        with self.lock:
+            self._refill()
+            self.rate = rate
+            self.capacity = rate
+            self.tokens = min(self.tokens, self.capacity)
+
+    def _refill(self):
+        """Add tokens for the time elapsed. Caller must hold the lock."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def consume(self, amount):
+        """Take tokens, sleeping until the bucket has paid off any deficit."""
+        with self.lock:
+            if self.rate <= 0:
+                return
+            self._refill()
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+class UploadSlot:
+    """An admitted upload with its own share of the node's bandwidth."""
+
+    def __init__(self, rate):
+        self.bucket = TokenBucket(rate)
+        self.started_at = time.monotonic()
+
+
+class UploadScheduler:
+    """Limits concurrent uploads with a FIFO wait queue and splits bandwidth evenly."""
+
+    def __init__(self, max_slots=4, max_queue=16, queue_timeout=5.0, total_rate=0):
+        """
+        Args:
+            max_slots (int): Uploads allowed to transfer at the same time.
+            max_queue (int): Requests allowed to wait for a slot.
+            queue_timeout (float): Seconds a request waits before being turned away.
+            total_rate (float): Upload bandwidth of the node in bytes/second (0 = unlimited).
+        """
+        self.max_slots = max_slots
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.total_rate = total_rate
+
+        self.active = set()
+        self.waiting = collections.deque()
+        self.cond = threading.Condition()
+
+        # Metrics
+        self.uploads_started = 0
+        self.uploads_completed = 0
+        self.uploads_rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+        self.upload_time_total = 0.0
+
+    def acquire(self):
+        """
+        Wait for an upload slot.
+
+        Returns:
+            UploadSlot: The admitted slot, or None if the queue is full or the wait timed out.
+        """
+        start = time.monotonic()
+        with self.cond:
+            if self.waiting or len(self.active) >= self.max_slots:
+                if len(self.waiting) >= self.max_queue:
+                    self.uploads_rejected += 1
+                    return None
+
+                ticket = object()
+                self.waiting.append(ticket)
+                deadline = start + self.queue_timeout
+                while self.waiting[0] is not ticket or len(self.active) >= self.max_slots:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.waiting.remove(ticket)
+                        self.uploads_rejected += 1
+                        self.cond.notify_all()
+                        return None
+                    self.cond.wait(remaining)
+                self.waiting.popleft()
+
+            slot = UploadSlot(0)
+            self.active.add(slot)
+            self._rebalance()
+
+            waited = time.monotonic() - start
+            self.uploads_started += 1
+            self.queue_wait_total += waited
+            self.queue_wait_max = max(self.queue_wait_max, waited)
+
+            # The next waiter may also fit if several slots are free
+            self.cond.notify_all()
+            return slot
+
+    def release(self, slot):
+        """Return a slot and hand its bandwidth to the remaining uploads. Safe to call twice."""
+        with self.cond:
+            if slot not in self.active:
+                return
+            self.active.discard(slot)
+            self.uploads_completed += 1
+            self.upload_time_total += time.monotonic() - slot.started_at
+            self._rebalance()
+            self.cond.notify_all()
+
+    def _rebalance(self):
+        """Give every active upload an equal share. Caller must hold the condition."""
+        if not self.active:
+            return
+        share = self.total_rate / len(self.active) if self.total_rate > 0 else 0
+        for slot in self.active:
+            slot.bucket.set_rate(share)
+
+    def stream(self, slot, chunks):
+        """
+        Throttle an upload body to the slot's bandwidth share.
+        The slot is released when the body is exhausted or closed part way; a
+        body that is never started (HEAD, early disconnect) must be released
+        by the caller, e.g. from the response's call_on_close.
+        """
+        try:
+            for chunk in chunks:
+                slot.bucket.consume(len(chunk))
+                yield chunk
+        finally:
+            self.release(slot)
+
+    def retry_after(self):
+        """Seconds a rejected downloader should wait before retrying this node."""
+        with self.cond:
+            if self.uploads_completed:
+                avg_upload = self.upload_time_total / self.uploads_completed
+                return max(1, math.ceil(avg_upload))
+            return max(1, math.ceil(self.queue_timeout))
+
+    def get_stats(self):
+        """Get slot occupancy and queue wait metrics."""
+        with self.cond:
+            started = self.uploads_started
+            return {
+                'upload_slots_in_use': len(self.active),
+                'upload_slots_max': self.max_slots,
+                'upload_queue_length': len(self.waiting),
+                'uploads_started': started,
+                'uploads_completed': self.uploads_completed,
+                'uploads_rejected': self.uploads_rejected,
+                'upload_queue_wait_avg_ms': (self.queue_wait_total / started * 1000) if started else 0.0,
+                'upload_queue_wait_max_ms': self.queue_wait_max * 1000
+            }
@@ -21,6 +21,8 @@ import os
 import signal
 import random
 import json
+import shutil
+import tempfile
 from typing import List, Dict, Tuple
 
 # Add src to path
@@ -36,8 +38,15 @@ class ComprehensiveTestSuite:
         self.bs_port = 55000
         self.node_ports = list(range(55001, 55011))  # 10 nodes
         self.test_results = []
+        self.temp_dirs = []
         self.base_dir = os.path.dirname(os.path.dirname(__file__))
         
+    def make_temp_dir(self, prefix: str) -> str:
+        """Create a temporary directory that cleanup() removes."""
+        path = tempfile.mkdtemp(prefix=prefix)
+        self.temp_dirs.append(path)
+        return path
+    
     def log_phase(self, phase_num: int, phase_name: str):
         """Log phase header."""
         print("\n" + "="*80)
@@ -70,6 +79,34 @@ class ComprehensiveTestSuite:
         self.test_bootstrap_server_startup()
         self.test_node_registration()
         
+        # Requirement 1.1b: Registration bursts
+        self.log_requirement("1.1b", "asyncio bootstrap server absorbs a burst of registrations")
+        self.test_async_bootstrap_burst()
+        
+        # Requirement 1.1c: Indexed registry
+        self.log_requirement("1.1c", "Registry lookups, removal and sampling do not scan all nodes")
+        self.test_bootstrap_registry()
+        
+        # Requirement 1.1d: Registration leases
+        self.log_requirement("1.1d", "Unrenewed registrations expire and are never handed out")
+        self.test_bootstrap_leases()
+        
+        # Requirement 1.1e: Durable registry
+        self.log_requirement("1.1e", "Bootstrap registry survives a restart (log + snapshot)")
+        self.test_bootstrap_persistence()
+        
+        # Requirement 1.1f: Replicated bootstrap servers
+        self.log_requirement("1.1f", "Bootstrap replicas share registrations and clients fail over")
+        self.test_bootstrap_replication()
+        
+        # Requirement 1.1g: Degree-balanced neighbor assignment
+        self.log_requirement("1.1g", "Bootstrap tracks node degree and hands out low-degree peers")
+        self.test_bootstrap_assignment()
+        
+        # Requirement 1.1h: Framed bootstrap client with retries
+        self.log_requirement("1.1h", "Bootstrap client reads whole replies and retries with backoff")
+        self.test_bootstrap_client_retries()
+        
         # Requirement 1.2: Node receives neighbor list
         self.log_requirement("1.2", "Nodes receive neighbor list from BS")
         self.test_neighbor_list_response()
@@ -117,6 +154,456 @@ server.start()
         except Exception as e:
             self.log_test("Bootstrap Server Startup", False, str(e))
     
+    def test_async_bootstrap_burst(self):
+        """Test the asyncio server registers a concurrent burst and times out silent clients."""
+        try:
+            import asyncio
+            import threading
+            from bootstrap_server_async import AsyncBootstrapServer
+            from bootstrap_load_generator import register_burst, request
+            from protocol import MessageFormatter
+            
+            with socket.socket() as probe:
+                probe.bind(('127.0.0.1', 0))
+                port = probe.getsockname()[1]
+            server = AsyncBootstrapServer(port=port, host='127.0.0.1', backlog=512, read_timeout=0.5)
+            thread = threading.Thread(target=server.start, daemon=True)
+            thread.start()
+            server.ready.wait(5)
+            
+            try:
+                # A client that connects and never sends must not hold the server
+                silent = socket.create_connection(('127.0.0.1', port))
+                burst = asyncio.run(register_burst('127.0.0.1', port, 300, 300, 5.0, unregister=False))
+                
+                reg = MessageFormatter.create_reg_message('127.0.0.1', 20000, 'load_20000')
+                duplicate = asyncio.run(request('127.0.0.1', port, reg, 5.0))
+                garbage = asyncio.run(request('127.0.0.1', port, 'abcd REG', 5.0))
+                time.sleep(0.7)
+                silent.close()
+            finally:
+                server.stop()
+                thread.join(5)
+            
+            if (burst['registered'] == 300 and not burst['failures'] and
+                    len(server.nodes) == 300 and duplicate == ['REGOK', '9998'] and
+                    garbage == ['ERROR'] and server.timeouts == 1 and not thread.is_alive()):
+                self.log_test("Async Bootstrap Burst", True, 
+                             f"300 concurrent REGs at {burst['regs_per_sec']:.0f} regs/sec, "
+                             f"silent client timed out")
+            else:
+                self.log_test("Async Bootstrap Burst", False, 
+                             f"Registered: {burst['registered']}, failures: {burst['failures']}, "
+                             f"duplicate: {duplicate}, garbage: {garbage}, timeouts: {server.timeouts}")
+        except Exception as e:
+            self.log_test("Async Bootstrap Burst", False, str(e))
+    
+    def test_bootstrap_registry(self):
+        """Test REG/UNREG status codes and that swap-remove keeps the address index consistent."""
+        try:
+            import io
+            import contextlib
+            from bootstrap_server import BootstrapServer
+            from protocol import MessageFormatter
+            
+            server = BootstrapServer(port=0)
+            replies = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(50):
+                    reply = server.process_message(
+                        MessageFormatter.create_reg_message('127.0.0.1', 6000 + i, f'n{i}'))
+                    replies.append(MessageFormatter.parse_message(reply))
+                for i in range(0, 50, 3):
+                    server.process_message(MessageFormatter.create_unreg_message('127.0.0.1', 6000 + i, f'n{i}'))
+                same_user = MessageFormatter.parse_message(server.process_message(
+                    MessageFormatter.create_reg_message('127.0.0.1', 6001, 'n1')))
+                other_user = MessageFormatter.parse_message(server.process_message(
+                    MessageFormatter.create_reg_message('127.0.0.1', 6001, 'intruder')))
+                wrong_unreg = MessageFormatter.parse_message(server.process_message(
+                    MessageFormatter.create_unreg_message('127.0.0.1', 6001, 'intruder')))
+            
+            registry = server.nodes
+            expected = {6000 + i for i in range(50) if i % 3}
+            consistent = (len(registry) == len(registry.index) == len(expected) and
+                          {e['port'] for e in registry} == expected and
+                          all(registry.entries[pos]['port'] == port for (_, port), pos in registry.index.items()))
+            counts_ok = [int(r[1]) for r in replies[:4]] == [0, 1, 2, 2]
+            self_free = all(f'{6000 + i}' not in r[2:] for i, r in enumerate(replies))
+            sample = registry.sample(5)
+            
+            if (consistent and counts_ok and self_free and len({e['port'] for e in sample}) == 5 and
+                    same_user == ['REGOK', '9998'] and other_user == ['REGOK', '9997'] and
+                    wrong_unreg == ['UNROK', '9999']):
+                self.log_test("Bootstrap Indexed Registry", True, 
+                             f"{len(registry)} nodes indexed after 17 removals, 9998/9997/9999 codes correct")
+            else:
+                self.log_test("Bootstrap Indexed Registry", False, 
+                             f"Consistent: {consistent}, counts: {counts_ok}, self excluded: {self_free}, "
+                             f"codes: {same_user}, {other_user}, {wrong_unreg}")
+        except Exception as e:
+            self.log_test("Bootstrap Indexed Registry", False, str(e))
+    
+    def test_bootstrap_leases(self):
+        """Test RENEW keeps a node registered while crashed nodes expire, and churn join success."""
+        try:
+            import io
+            import contextlib
+            from bootstrap_server import BootstrapServer
+            from bootstrap_churn_sim import simulate
+            from protocol import MessageFormatter
+            
+            now = [0.0]
+            server = BootstrapServer(port=0, lease_seconds=60, clock=lambda: now[0])
+            
+            def send(message):
+                return MessageFormatter.parse_message(server.process_message(message))
+            
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(3):
+                    send(MessageFormatter.create_reg_message('127.0.0.1', 7000 + i, f'n{i}'))
+                now[0] = 40.0
+                renewed = send(MessageFormatter.create_renew_message('127.0.0.1', 7000, 'n0'))
+                now[0] = 70.0
+                # n1 and n2 never renewed: only n0 may be handed out, even before a purge
+                joined = send(MessageFormatter.create_reg_message('127.0.0.1', 7003, 'n3'))
+                purged = server.purge_expired()
+                lost = send(MessageFormatter.create_renew_message('127.0.0.1', 7001, 'n1'))
+                now[0] = 101.0
+                expired_too = server.purge_expired()
+            
+            no_leases = simulate(None, nodes=100, duration=400, lifetime=120, warmup=60)
+            leases = simulate(60, nodes=100, duration=400, lifetime=120, warmup=60)
+            
+            remaining = sorted(node['port'] for node in server.nodes)
+            if (renewed == ['RENEWOK', '0'] and joined == ['REGOK', '1', '127.0.0.1', '7000'] and
+                    lost == ['RENEWOK', '9999'] and len(purged) == 0 and
+                    [n['username'] for n in expired_too] == ['n0'] and remaining == [7003] and
+                    leases['join_success'] > no_leases['join_success']):
+                self.log_test("Bootstrap Registration Leases", True, 
+                             f"Churn join success {no_leases['join_success']:.1%} without leases, "
+                             f"{leases['join_success']:.1%} with 60s leases")
+            else:
+                self.log_test("Bootstrap Registration Leases", False, 
+                             f"Renew: {renewed}, join: {joined}, lost: {lost}, remaining: {remaining}, "
+                             f"churn: {no_leases['join_success']:.2f} vs {leases['join_success']:.2f}")
+        except Exception as e:
+            self.log_test("Bootstrap Registration Leases", False, str(e))
+    
+    def test_bootstrap_persistence(self):
+        """Test a restarted server restores REG/UNREG/expiry state, across a snapshot and a torn log record."""
+        try:
+            import io
+            import contextlib
+            import tempfile
+            import shutil
+            from bootstrap_server import BootstrapServer
+            from protocol import MessageFormatter
+            
+            state_dir = tempfile.mkdtemp(prefix='bs_state_')
+            now = [0.0]
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    server = BootstrapServer(port=0, lease_seconds=60, clock=lambda: now[0], state_dir=state_dir)
+                    server.store.snapshot_every = 25  # Force a compaction part way through
+                    for i in range(30):
+                        server.process_message(MessageFormatter.create_reg_message('127.0.0.1', 8000 + i, f'n{i}'))
+                    for i in range(10):
+                        server.process_message(MessageFormatter.create_unreg_message('127.0.0.1', 8000 + i, f'n{i}'))
+                    now[0] = 50.0
+                    for i in range(15, 30):
+                        server.process_message(MessageFormatter.create_renew_message('127.0.0.1', 8000 + i, f'n{i}'))
+                    now[0] = 70.0
+                    expired = server.purge_expired()  # n10-n14 never renewed
+                    server.store.close()
+                    # A crash in the middle of appending a record
+                    with open(server.store.wal_file, 'a') as f:
+                        f.write('REG 127.0.0.1 80')
+                    
+                    restarted = BootstrapServer(port=0, lease_seconds=60, clock=lambda: now[0], state_dir=state_dir)
+                    renew = MessageFormatter.parse_message(restarted.process_message(
+                        MessageFormatter.create_renew_message('127.0.0.1', 8020, 'n20')))
+                    restarted.process_message(MessageFormatter.create_reg_message('127.0.0.1', 9000, 'late'))
+                    restarted.store.close()
+                    again = BootstrapServer(port=0, state_dir=state_dir)
+                    again.store.close()
+            finally:
+                shutil.rmtree(state_dir, ignore_errors=True)
+            
+            restored = sorted(node['port'] for node in restarted.nodes if node['port'] != 9000)
+            final = sorted(node['port'] for node in again.nodes)
+            if (len(expired) == 5 and restored == list(range(8015, 8030)) and
+                    renew == ['RENEWOK', '0'] and final == list(range(8015, 8030)) + [9000]):
+                self.log_test("Bootstrap Durable Registry", True, 
+                             f"{len(restored)} nodes restored after snapshot, UNREGs, expiries and a torn record")
+            else:
+                self.log_test("Bootstrap Durable Registry", False, 
+                             f"Expired: {len(expired)}, restored: {restored}, renew: {renew}, final: {final}")
+        except Exception as e:
+            self.log_test("Bootstrap Durable Registry", False, str(e))
+    
+    def test_bootstrap_replication(self):
+        """Test REG/UNREG replicate between two peered servers and a client fails over past a dead one."""
+        try:
+            import io
+            import asyncio
+            import contextlib
+            import threading
+            from bootstrap_server_async import AsyncBootstrapServer, request
+            from bootstrap_manager import BootstrapManager
+            from protocol import MessageFormatter
+            
+            ports = []
+            for _ in range(3):
+                with socket.socket() as probe:
+                    probe.bind(('127.0.0.1', 0))
+                    ports.append(probe.getsockname()[1])
+            port_a, port_b, dead_port = ports
+            servers = [AsyncBootstrapServer(port=port_a, host='127.0.0.1', peers=[('127.0.0.1', port_b)]),
+                       AsyncBootstrapServer(port=port_b, host='127.0.0.1', peers=[('127.0.0.1', port_a)])]
+            threads = [threading.Thread(target=server.start, daemon=True) for server in servers]
+            
+            def wait_for(condition, timeout=5.0):
+                deadline = time.time() + timeout
+                while not condition() and time.time() < deadline:
+                    time.sleep(0.05)
+                return condition()
+            
+            with contextlib.redirect_stdout(io.StringIO()):
+                for thread, server in zip(threads, servers):
+                    thread.start()
+                    server.ready.wait(5)
+                try:
+                    for i in range(20):
+                        asyncio.run(request('127.0.0.1', port_a,
+                                            MessageFormatter.create_reg_message('127.0.0.1', 7000 + i, f'n{i}'), 5.0))
+                    replicated = wait_for(lambda: len(servers[1].nodes) == 20)
+                    asyncio.run(request('127.0.0.1', port_b,
+                                        MessageFormatter.create_unreg_message('127.0.0.1', 7000, 'n0'), 5.0))
+                    unreplicated = wait_for(lambda: ('127.0.0.1', 7000) not in servers[0].nodes)
+                    
+                    # First endpoint refuses connections; the client moves on to A
+                    manager = BootstrapManager('127.0.0.1', dead_port, '127.0.0.1', 7100, 'client',
+                                               endpoints=[('127.0.0.1', dead_port), ('127.0.0.1', port_a)])
+                    manager.preferred = 0
+                    neighbors = manager.connect_to_bs()
+                    failed_over = manager.bs_port == port_a and len(neighbors) == 2
+                    
+                    # First endpoint accepts the connection but never replies
+                    with socket.socket() as stalled:
+                        stalled.bind(('127.0.0.1', 0))
+                        stalled.listen(4)
+                        manager = BootstrapManager('127.0.0.1', 0, '127.0.0.1', 7101, 'client2',
+                                                   endpoints=[stalled.getsockname(), ('127.0.0.1', port_a)])
+                        manager.preferred = 0
+                        start = time.time()
+                        stalled_neighbors = manager.connect_to_bs()
+                        stall_seconds = time.time() - start
+                    failed_over = failed_over and stalled_neighbors is not None and stall_seconds < 2
+                    client_replicated = wait_for(lambda: ('127.0.0.1', 7100) in servers[1].nodes and
+                                                 ('127.0.0.1', 7101) in servers[1].nodes)
+                    
+                    # Count says 2 records but only one follows
+                    malformed = asyncio.run(request('127.0.0.1', port_b, MessageFormatter.format_message(
+                        'SYNC 2 REG 127.0.0.1 7200 x'), 5.0))
+                finally:
+                    for server in servers:
+                        server.stop()
+                    for thread in threads:
+                        thread.join(5)
+                
+                frames_ok, batches_ok = self._replicate_to_fake_peer()
+            
+            if (replicated and unreplicated and failed_over and client_replicated and
+                    malformed == ['ERROR'] and len(servers[0].nodes) == len(servers[1].nodes) == 21 and
+                    frames_ok and batches_ok):
+                self.log_test("Bootstrap Replication", True, 
+                             f"{servers[0].replicator.replicated} records replicated, client failed over past "
+                             f"a dead and a stalled replica\n" +
+                             "Long records split across frames, rejected batches dropped")
+            else:
+                self.log_test("Bootstrap Replication", False, 
+                             f"REG: {replicated}, UNREG: {unreplicated}, failover: {failed_over}, "
+                             f"client: {client_replicated}, malformed: {malformed}, "
+                             f"sizes: {len(servers[0].nodes)}/{len(servers[1].nodes)}, "
+                             f"frame limit kept: {frames_ok}, rejected batches dropped: {batches_ok}")
+        except Exception as e:
+            self.log_test("Bootstrap Replication", False, str(e))
+    
+    def _replicate_to_fake_peer(self):
+        """
+        Run a Replicator against a peer that records frame lengths and answers
+        SYNCOK, then against one that answers ERROR.
+
+        Returns:
+            tuple: (long records fit the frame limit, ERROR batches were dropped
+                instead of retried)
+        """
+        import asyncio
+        from bootstrap_server_async import Replicator, read_frame, MAX_FRAME
+        
+        async def run(reply):
+            frames = []
+            
+            async def handle(reader, writer):
+                try:
+                    frames.append(len(await read_frame(reader)))
+                except ValueError:
+                    frames.append(None)
+                writer.write(f"{len(reply) + 5:04d} {reply}".encode('utf-8'))
+                await writer.drain()
+                writer.close()
+            
+            async def wait_for(condition):
+                for _ in range(100):
+                    if condition():
+                        return True
+                    await asyncio.sleep(0.05)
+                return False
+            
+            peer = await asyncio.start_server(handle, '127.0.0.1', 0)
+            replicator = Replicator([peer.sockets[0].getsockname()[:2]], timeout=2.0)
+            replicator.start()
+            try:
+                if reply == 'SYNCOK':
+                    # Queued together: 4 x 3000 chars must not go out as one oversized frame
+                    for i in range(4):
+                        replicator.publish('REG', '127.0.0.1', 7300 + i, 'u' * 3000)
+                    replicator.publish('REG', '127.0.0.1', 7304, 'u' * MAX_FRAME)
+                    replicator.publish('REG', '127.0.0.1', 7305, 'short')
+                    done = await wait_for(lambda: replicator.replicated == 5)
+                    return (done and replicator.dropped == 1 and len(frames) >= 2 and
+                            all(length is not None and length <= MAX_FRAME for length in frames))
+                for i in range(3):
+                    replicator.publish('REG', '127.0.0.1', 7400 + i, f'n{i}')
+                first = await wait_for(lambda: replicator.rejected == 3)
+                replicator.publish('REG', '127.0.0.1', 7403, 'n3')
+                second = await wait_for(lambda: replicator.rejected == 4)
+                return first and second and len(frames) == 2
+            finally:
+                replicator.stop()
+                peer.close()
+        
+        return asyncio.run(run('SYNCOK')), asyncio.run(run('ERROR'))
+    
+    def test_bootstrap_assignment(self):
+        """Test the server's degree bookkeeping and that low-degree assignment flattens the overlay."""
+        try:
+            import io
+            import contextlib
+            from bootstrap_server import BootstrapServer
+            from bootstrap_assignment import RandomAssignment
+            from bootstrap_assignment_sim import simulate
+            from protocol import MessageFormatter
+            
+            server = BootstrapServer(port=0, lease_seconds=None)
+            edges = set()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(40):
+                    reply = MessageFormatter.parse_message(server.process_message(
+                        MessageFormatter.create_reg_message('127.0.0.1', 6100 + i, f'n{i}')))
+                    for k in range(2, len(reply) - 1, 2):
+                        edges.add(frozenset([6100 + i, int(reply[k + 1])]))
+                for i in range(0, 40, 4):
+                    server.process_message(MessageFormatter.create_unreg_message('127.0.0.1', 6100 + i, f'n{i}'))
+            live = {6100 + i for i in range(40) if i % 4}
+            expected = {port: sum(1 for edge in edges if port in edge and edge <= live) for port in live}
+            tracked = {node['port']: len(node['links']) for node in server.nodes}
+            
+            global_state = random.getstate()
+            random_run = simulate('random', nodes=400, churn=0, sources=50)
+            balanced_run = simulate('low-degree', nodes=400, churn=0, sources=50)
+            global_untouched = random.getstate() == global_state
+            
+            if (tracked == expected and isinstance(BootstrapServer(port=0, assignment=RandomAssignment()).assignment,
+                                                   RandomAssignment) and
+                    balanced_run['degree_max'] < random_run['degree_max'] and
+                    balanced_run['degree_std'] < random_run['degree_std'] and balanced_run['components'] == 1 and
+                    global_untouched):
+                self.log_test("Bootstrap Degree-Balanced Assignment", True, 
+                             f"Max degree {random_run['degree_max']} -> {balanced_run['degree_max']}, "
+                             f"avg hops {random_run['avg_hops']:.2f} -> {balanced_run['avg_hops']:.2f}")
+            else:
+                self.log_test("Bootstrap Degree-Balanced Assignment", False, 
+                             f"Degrees match: {tracked == expected}, global RNG untouched: {global_untouched}, "
+                             f"random: {random_run}, balanced: {balanced_run}")
+        except Exception as e:
+            self.log_test("Bootstrap Degree-Balanced Assignment", False, str(e))
+    
+    def test_bootstrap_client_retries(self):
+        """Test the bootstrap client reads split replies, survives lost replies and gives up on a dead server."""
+        try:
+            import io
+            import contextlib
+            import threading
+            from bootstrap_manager import BootstrapManager, recv_frame
+            from bootstrap_server import BootstrapServer
+            from protocol import MessageFormatter
+            
+            # A frame larger than any single read, written in small pieces
+            big = MessageFormatter.format_message('SEROK 1 127.0.0.1 5001 0 ' + 'x' * 3000)
+            reader, writer = socket.socketpair()
+            with reader, writer:
+                def dribble():
+                    for i in range(0, len(big), 500):
+                        writer.sendall(big[i:i + 500].encode('utf-8'))
+                        time.sleep(0.005)
+                threading.Thread(target=dribble, daemon=True).start()
+                whole = recv_frame(reader) == big
+            
+            server = BootstrapServer(port=0, lease_seconds=None)
+            listener = socket.socket()
+            listener.bind(('127.0.0.1', 0))
+            listener.listen(16)
+            port = listener.getsockname()[1]
+            lost_replies = [2]  # Requests processed whose reply never arrives
+            commands = []
+            
+            def serve():
+                while True:
+                    try:
+                        conn, _ = listener.accept()
+                    except OSError:
+                        return
+                    with conn:
+                        request = recv_frame(conn)
+                        commands.append(request.split()[1])
+                        reply = server.process_message(request)
+                        if lost_replies[0]:
+                            lost_replies[0] -= 1
+                            continue
+                        for i in range(0, len(reply), 7):
+                            conn.sendall(reply[i:i + 7].encode('utf-8'))
+                            time.sleep(0.001)
+            
+            threading.Thread(target=serve, daemon=True).start()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for i in range(5):
+                    server.process_message(MessageFormatter.create_reg_message('127.0.0.1', 7300 + i, f'n{i}'))
+                manager = BootstrapManager('127.0.0.1', port, '127.0.0.1', 7400, 'client')
+                manager.BACKOFF_BASE = 0.01
+                neighbors = manager.connect_to_bs()
+                listener.close()
+                
+                # Nothing listening: every round fails and the node learns registration failed
+                dead = BootstrapManager('127.0.0.1', port, '127.0.0.1', 7401, 'client2')
+                dead.RETRIES, dead.BACKOFF_BASE = 2, 0.05
+                start = time.time()
+                gave_up = dead.connect_to_bs()
+                elapsed = time.time() - start
+            
+            entry = server.nodes.get('127.0.0.1', 7400)
+            if (whole and neighbors is not None and len(neighbors) == 2 and
+                    commands == ['REG', 'REG', 'REG', 'UNREG', 'REG'] and
+                    entry is not None and len(entry['links']) == 2 and gave_up is None and elapsed < 2):
+                self.log_test("Bootstrap Client Framing & Retries", True, 
+                             f"3 KB frame read whole; 2 lost replies recovered via {', '.join(commands)}")
+            else:
+                self.log_test("Bootstrap Client Framing & Retries", False, 
+                             f"Whole: {whole}, neighbors: {neighbors}, commands: {commands}, "
+                             f"dead server: {gave_up} after {elapsed:.2f}s")
+        except Exception as e:
+            self.log_test("Bootstrap Client Framing & Retries", False, str(e))
+    
     def test_node_registration(self):
         """Test REG message and REGOK response."""
         try:
@@ -265,6 +752,20 @@ server.start()
         # Requirement 2.8: Loop prevention
         self.log_requirement("2.8", "Query loop detection")
         self.test_loop_prevention()
+        
+        # Requirement 2.9: Fetch picks the best responder
+        self.log_requirement("2.9", "Search responses are ranked for automatic fetch")
+        self.test_search_source_ranking()
+        self.test_concurrent_search_responses()
+        
+        # Requirement 2.10: Hop-by-hop tracing
+        self.log_requirement("2.10", "Traced queries rebuild their propagation tree")
+        self.test_search_query_tracing()
+        
+        # Requirement 2.11: In-process overlay simulation
+        self.log_requirement("2.11", "Real node code floods over an in-memory transport")
+        self.test_overlay_simulator()
+        self.test_node_without_storage()
     
     def test_udp_communication(self):
         """Test UDP socket functionality."""
@@ -476,6 +977,236 @@ server.start()
         except Exception as e:
             self.log_test("Loop Prevention (TTL)", False, str(e))
     
+    def test_search_source_ranking(self):
+        """Test multi-word SEROK names round-trip and holders are ranked by latency, hops and load."""
+        try:
+            from protocol import MessageFormatter, MessageParser
+            from source_selector import SourceSelector
+            
+            serok_msg = MessageFormatter.create_serok_message(
+                2, '127.0.0.1', 5002, 1, ['Harry Potter', 'Glee']
+            )
+            parsed = MessageParser.parse_serok(MessageFormatter.parse_message(serok_msg))
+            names_ok = parsed['filenames'] == ['Harry Potter', 'Glee']
+            
+            responses = [
+                {'ip': '127.0.0.1', 'port': 5002, 'files': ['Harry Potter'], 'hops': 1, 'latency_ms': 40.0},
+                {'ip': '127.0.0.1', 'port': 5003, 'files': ['Harry Potter'], 'hops': 4, 'latency_ms': 30.0},
+                {'ip': '127.0.0.1', 'port': 5004, 'files': ['Harry Potter'], 'hops': 1, 'latency_ms': 10.0},
+            ]
+            loads = {5002: 0.0, 5003: 0.0, 5004: 2.0}  # 5004 is overloaded
+            selector = SourceSelector()
+            ranked = selector.rank(responses, selector.choose_file(responses),
+                                   lambda ip, port: loads[port])
+            order = [c['port'] for c in ranked]
+            
+            if names_ok and order == [5002, 5003, 5004]:
+                self.log_test("Search Source Ranking (SEROK)", True, 
+                             f"Multi-word names parsed: {parsed['filenames']}\n" +
+                             f"Ranking: {order}")
+            else:
+                self.log_test("Search Source Ranking (SEROK)", False, 
+                             f"Names: {parsed['filenames']}, Ranking: {order}")
+        except Exception as e:
+            self.log_test("Search Source Ranking (SEROK)", False, str(e))
+    
+    def test_concurrent_search_responses(self):
+        """Test SEROKs are credited to the query they answer and old queries are pruned."""
+        try:
+            from search_engine import SearchEngine
+            
+            now = [1000.0]
+            latencies, events = [], []
+            mock_node = type('MockNode', (), {
+                'ip': '127.0.0.1',
+                'port': 5001,
+                'routing_table': type('RT', (), {'get_neighbors': lambda self: []})(),
+                'statistics': type('Stats', (), {
+                    'log_event': lambda self, **kwargs: events.append(kwargs['query']),
+                    'record_latency': lambda self, latency: latencies.append(latency),
+                    'record_hop': lambda self, hops: None
+                })()
+            })()
+            engine = SearchEngine(mock_node, clock=lambda: now[0])
+            
+            # A fetch for Harry Potter is still collecting when run-queries starts Glee
+            fetch_id = engine.initiate_search('harry potter')
+            now[0] += 0.5
+            glee_id = engine.initiate_search('glee')
+            now[0] += 0.1
+            engine.handle_search_response(1, '127.0.0.1', 5002, 2, ['Harry Potter'])
+            engine.handle_search_response(1, '127.0.0.1', 5003, 1, ['Glee'])
+            fetch_ports = [r['port'] for r in engine.get_responses(fetch_id)]
+            glee_ports = [r['port'] for r in engine.get_responses(glee_id)]
+            
+            # A SEROK no pending query asked for is logged but not sampled
+            engine.handle_search_response(1, '127.0.0.1', 5004, 3, ['Twilight'])
+            
+            now[0] += SearchEngine.PENDING_TIMEOUT + 1
+            engine.initiate_search('twilight')
+            
+            if (fetch_ports == [5002] and glee_ports == [5003] and len(engine.pending_queries) == 1
+                    and len(latencies) == 2 and 0 not in latencies and 'unknown' in events):
+                self.log_test("Concurrent Search Responses", True,
+                             "Each SEROK credited to the query its files answer\n" +
+                             "Unmatched SEROK logged without a latency sample\n" +
+                             "Expired queries pruned from the pending table")
+            else:
+                self.log_test("Concurrent Search Responses", False,
+                             f"Fetch: {fetch_ports}, Glee: {glee_ports}, Pending: {len(engine.pending_queries)}, "
+                             f"Latencies: {latencies}, Events: {events}")
+        except Exception as e:
+            self.log_test("Concurrent Search Responses", False, str(e))
+    
+    def test_search_query_tracing(self):
+        """Test traces from a small in-process flood merge into one tree with duplicates."""
+        try:
+            import tempfile
+            import shutil
+            from search_engine import SearchEngine
+            from query_tracer import QueryTracer
+            import trace_analyzer
+            
+            trace_dir = tempfile.mkdtemp()
+            nodes = {}
+            # Triangle 5001-5002-5003 plus 5004 behind 5003, which holds the file
+            topology = {5001: [5002, 5003], 5002: [5001, 5003], 5003: [5001, 5002, 5004], 5004: [5003]}
+            
+            def make_node(port):
+                node = type('MockNode', (), {})()
+                node.ip, node.port = '127.0.0.1', port
+                node.statistics = type('Stats', (), {'__getattr__': lambda self, name: lambda *a, **k: None})()
+                node.routing_table = type('RT', (), {
+                    'get_neighbors': lambda self: [{'ip': '127.0.0.1', 'port': p} for p in topology[port]]
+                })()
+                node.forward_search = lambda ip, p, oip, oport, fn, hops: \
+                    nodes[p].search_engine.handle_search_request(oip, oport, fn, hops, ('127.0.0.1', port))
+                node.send_search_response = lambda oip, oport, matches, hops: \
+                    nodes[oport].search_engine.handle_search_response(len(matches), '127.0.0.1', port, hops, matches)
+                node.search_engine = SearchEngine(node)
+                node.search_engine.set_files(['Harry Potter'] if port == 5004 else [])
+                node.search_engine.tracer = QueryTracer(f"127.0.0.1_{port}", trace_dir)
+                node.search_engine.tracer.start()
+                return node
+            
+            try:
+                for port in topology:
+                    nodes[port] = make_node(port)
+                nodes[5001].search_engine.initiate_search('harry')
+                for node in nodes.values():
+                    node.search_engine.tracer.stop()
+                
+                # 'trace off' then 'trace on' must not leave the previous flusher running
+                tracer = nodes[5001].search_engine.tracer
+                flushers = []
+                for _ in range(3):
+                    tracer.start()
+                    flushers.append(tracer.flusher)
+                    tracer.stop()
+                tracer.start()
+                live_flushers = sum(f.is_alive() for f in flushers + [tracer.flusher])
+                tracer.stop()
+                
+                instances = trace_analyzer.split_instances(trace_analyzer.load_traces(trace_dir))
+                analysis = trace_analyzer.analyze_instance(instances[0])
+            finally:
+                shutil.rmtree(trace_dir, ignore_errors=True)
+            
+            first = analysis['first_result']
+            if (len(instances) == 1 and analysis['nodes_reached'] == 3 and live_flushers == 1 and
+                    analysis['duplicates'] > 0 and first and first['responder'] == '127.0.0.1:5004' and
+                    analysis['critical_path'][-1]['to'] == '127.0.0.1:5001'):
+                self.log_test("Search Query Tracing", True, 
+                             f"Reached {analysis['nodes_reached']} nodes, "
+                             f"{analysis['duplicates']} duplicate deliveries, "
+                             f"{len(analysis['redundant_edges'])} redundant edges")
+            else:
+                self.log_test("Search Query Tracing", False, 
+                             f"Instances: {len(instances)}, flushers: {live_flushers}, analysis: {analysis}")
+        except Exception as e:
+            self.log_test("Search Query Tracing", False, str(e))
+    
+    def test_overlay_simulator(self):
+        """Test real Node/SearchEngine flooding over in-memory transports on a virtual clock."""
+        try:
+            import threading
+            from transport import UDPTransport
+            from overlay_simulator import simulate
+            
+            # The UDP transport nodes use by default delivers to the handler with the sender address
+            received = []
+            arrived = threading.Event()
+            a, b = UDPTransport(), UDPTransport()
+            a.open(('127.0.0.1', 0), lambda data, addr: None)
+            b.open(('127.0.0.1', 0), lambda data, addr: (received.append((data, addr)), arrived.set()))
+            sender, receiver = a.sock.getsockname(), b.sock.getsockname()
+            try:
+                a.send(b'0016 JOINOK 0', receiver)
+                arrived.wait(2)
+            finally:
+                a.close()
+                b.close()
+            udp_ok = received == [(b'0016 JOINOK 0', sender)]
+            
+            # Equal link latencies make every flood timing exact: a hit at h hops
+            # answers after h links out and one link back
+            queries = ['Glee', 'Jack and Jill', 'King Arthur']
+            global_state = random.getstate()
+            run = simulate(300, queries, 3, latency=(0.01, 0.01), seed=3)
+            again = simulate(300, queries, 3, latency=(0.01, 0.01), seed=3)
+            # Seeded runs use their own generators, not the importer's global one
+            global_untouched = random.getstate() == global_state
+            results = run['results']
+            exact = all(abs(r['latency_ms'] - (r['hops'] + 1) * 10) < 1e-6 for r in results if r['answered'])
+            
+            if (udp_ok and all(r['reached'] == 300 and r['answered'] for r in results) and exact and
+                    results == again['results'] and run['degree_mean'] > 3.9 and global_untouched):
+                self.log_test("In-Process Overlay Simulator", True, 
+                             f"300 nodes, {sum(r['ser'] for r in results) // len(results)} SER/query, "
+                             f"{run['events'] / run['query_seconds']:.0f} datagrams/sec")
+            else:
+                self.log_test("In-Process Overlay Simulator", False, 
+                             f"UDP: {udp_ok}, exact latency: {exact}, deterministic: {results == again['results']}, "
+                             f"degree: {run['degree_mean']:.2f}, global RNG untouched: {global_untouched}, "
+                             f"results: {results}")
+        except Exception as e:
+            self.log_test("In-Process Overlay Simulator", False, str(e))
+    
+    def test_node_without_storage(self):
+        """Test a Node built without file storage or a bootstrap client degrades instead of raising."""
+        node = None
+        try:
+            from node import Node
+            from statistics import Statistics
+            
+            node = Node('127.0.0.1', 55097, 'bare_test', None, None,
+                        statistics=Statistics('bare_test', self.make_temp_dir('logs_')),
+                        storage=False, bootstrap=False)
+            node.load_files(os.path.join(self.base_dir, 'file_names.txt'))
+            registered = node.register_with_bootstrap()
+            node._share_downloaded_file('Extra File', b'content', '127.0.0.1', 5001)
+            node.leave_network()
+            client = node._create_rest_app().test_client()
+            download = client.get(f'/download/{node.files[0]}')
+            merkle = client.get(f'/merkle/{node.files[0]}')
+            download.close()
+            merkle.close()
+            
+            if (registered is False and node.lease_thread is None and 'Extra File' not in node.files and
+                    download.status_code == 404 and merkle.status_code == 404):
+                self.log_test("Node Without Storage or Bootstrap", True,
+                             f"Loaded {len(node.files)} file names, register/leave/share are no-ops\n" +
+                             "Downloads and Merkle trees answer 404")
+            else:
+                self.log_test("Node Without Storage or Bootstrap", False,
+                             f"Registered: {registered}, files: {node.files}, "
+                             f"download: {download.status_code}, merkle: {merkle.status_code}")
+        except Exception as e:
+            self.log_test("Node Without Storage or Bootstrap", False, str(e))
+        finally:
+            if node is not None:
+                node.statistics.stop()
+    
     # ============================================================================
     # PHASE 3: REST API FILE TRANSFER
     # ============================================================================
@@ -499,13 +1230,39 @@ server.start()
         # Requirement 3.4: Reliable transfer (TCP)
         self.log_requirement("3.4", "TCP-based file transfer")
         self.test_tcp_transfer()
+        
+        # Requirement 3.5: Disk-backed content store
+        self.log_requirement("3.5", "Generated files persist in a node-local store")
+        self.test_content_store_persistence()
+        
+        # Requirement 3.6: Deterministic content prepared ahead of downloads
+        self.log_requirement("3.6", "Content is seeded per node and prepared at startup")
+        self.test_deterministic_generation()
+        
+        # Requirement 3.7: Per-chunk integrity
+        self.log_requirement("3.7", "Chunk Merkle tree detects corruption per chunk")
+        self.test_merkle_chunk_verification()
+        
+        # Requirement 3.8: Upload admission control
+        self.log_requirement("3.8", "Serving node limits concurrent uploads")
+        self.test_upload_admission_control()
+        self.test_upload_slot_release()
+        self.test_busy_source_failover()
+        
+        # Requirement 3.9: Concurrent download jobs
+        self.log_requirement("3.9", "Downloads run as concurrent background jobs")
+        self.test_download_manager()
+        
+        # Requirement 3.10: Downloaders become sources
+        self.log_requirement("3.10", "Verified downloads are re-shared as identical replicas")
+        self.test_reshared_replica()
     
     def test_file_generation(self):
         """Test file generation with size between 2-10 MB."""
         try:
             from file_manager import FileManager
             
-            fm = FileManager()
+            fm = FileManager(self.make_temp_dir('store_'))
             
             # Test multiple generations to ensure randomness
             sizes = []
@@ -534,7 +1291,7 @@ server.start()
             from file_manager import FileManager
             import hashlib
             
-            fm = FileManager()
+            fm = FileManager(self.make_temp_dir('store_'))
             
             # Generate file and get hash
             content = fm.get_file_content('test_hash.mp3')
@@ -588,6 +1345,316 @@ server.start()
         except Exception as e:
             self.log_test("TCP-based Transfer", False, str(e))
     
+    def test_content_store_persistence(self):
+        """Test generated files are stored on disk and survive a restart."""
+        try:
+            from file_manager import FileManager
+            
+            storage_dir = self.make_temp_dir('store_')
+            fm = FileManager(storage_dir)
+            hash_before = fm.get_file_hash('test_store.mp3')
+            chunk = b''.join(fm.iter_file_chunks('test_store.mp3', 0, 1024))
+            
+            # A new manager on the same directory must reuse the stored content
+            fm_restarted = FileManager(storage_dir)
+            reused = fm_restarted.store.contains('test_store.mp3')
+            hash_after = fm_restarted.get_file_hash('test_store.mp3')
+            
+            if reused and hash_before == hash_after and len(chunk) == 1024:
+                self.log_test("File Generation (Persistent Store)", True, 
+                             f"Store: {storage_dir}\n" +
+                             f"Hash reused after restart: {hash_after[:32]}...")
+            else:
+                self.log_test("File Generation (Persistent Store)", False, 
+                             f"Reused: {reused}, Hash match: {hash_before == hash_after}")
+        except Exception as e:
+            self.log_test("File Generation (Persistent Store)", False, str(e))
+    
+    def test_deterministic_generation(self):
+        """Test content depends only on node and filename, and is prepared in background."""
+        try:
+            from file_manager import FileManager
+            
+            fm_a = FileManager(self.make_temp_dir('store_'), 'node_a')
+            fm_b = FileManager(self.make_temp_dir('store_'), 'node_a')
+            fm_c = FileManager(self.make_temp_dir('store_'), 'node_c')
+            
+            fm_a.prepare_files(['test_seed.mp3'])
+            fm_a.wait_until_prepared(timeout=30)
+            prepared = fm_a.store.contains('test_seed.mp3')
+            
+            same_node = fm_a.get_file_hash('test_seed.mp3') == fm_b.get_file_hash('test_seed.mp3')
+            other_node = fm_a.get_file_hash('test_seed.mp3') != fm_c.get_file_hash('test_seed.mp3')
+            
+            if prepared and same_node and other_node:
+                self.log_test("File Generation (Deterministic)", True, 
+                             "Same seed reproduces content, other nodes differ\n" +
+                             "Background preparation stored the file")
+            else:
+                self.log_test("File Generation (Deterministic)", False, 
+                             f"Prepared: {prepared}, Same node: {same_node}, Other node: {other_node}")
+        except Exception as e:
+            self.log_test("File Generation (Deterministic)", False, str(e))
+    
+    def test_merkle_chunk_verification(self):
+        """Test chunk hashes locate a corrupted chunk and round-trip through JSON."""
+        try:
+            from file_manager import FileManager
+            from merkle import MerkleTree
+            
+            fm = FileManager(self.make_temp_dir('store_'), 'node_merkle')
+            content = fm.get_file_content('test_merkle.mp3')
+            tree = MerkleTree.from_dict(json.loads(json.dumps(fm.get_merkle_tree('test_merkle.mp3').to_dict())))
+            
+            corrupted = bytearray(content)
+            corrupted[tree.chunk_size + 10] ^= 0xFF
+            bad = [i for i in range(tree.num_chunks)
+                   if not tree.verify_chunk(i, bytes(corrupted[slice(*tree.chunk_range(i))]))]
+            
+            if bad == [1] and tree.size == len(content):
+                self.log_test("SHA-256 Chunk Merkle Tree", True, 
+                             f"{tree.num_chunks} chunks, root {tree.root[:16]}...\n" +
+                             "Corrupted byte isolated to chunk 1")
+            else:
+                self.log_test("SHA-256 Chunk Merkle Tree", False, 
+                             f"Bad chunks detected: {bad}")
+        except Exception as e:
+            self.log_test("SHA-256 Chunk Merkle Tree", False, str(e))
+    
+    def test_upload_admission_control(self):
+        """Test upload slots, the bounded wait queue and bandwidth sharing."""
+        try:
+            from upload_scheduler import UploadScheduler
+            
+            scheduler = UploadScheduler(max_slots=2, max_queue=0, queue_timeout=0.1,
+                                        total_rate=4 * 1024 * 1024)
+            first = scheduler.acquire()
+            second = scheduler.acquire()
+            rejected = scheduler.acquire()
+            shared_rate = first.bucket.rate
+            
+            scheduler.release(first)
+            after_release = scheduler.acquire()
+            stats = scheduler.get_stats()
+            
+            if (rejected is None and after_release is not None and
+                    shared_rate == 2 * 1024 * 1024 and
+                    stats['uploads_rejected'] == 1 and stats['upload_slots_in_use'] == 2):
+                self.log_test("REST Upload Admission Control", True, 
+                             "Third upload rejected while 2 slots busy\n" +
+                             f"Bandwidth per transfer: {shared_rate / 1024 / 1024:.1f} MB/s")
+            else:
+                self.log_test("REST Upload Admission Control", False, f"Stats: {stats}")
+            scheduler.release(second)
+            scheduler.release(after_release)
+        except Exception as e:
+            self.log_test("REST Upload Admission Control", False, str(e))
+    
+    def test_upload_slot_release(self):
+        """Test HEAD requests and abandoned downloads give their upload slot back."""
+        node = None
+        default_store = None
+        try:
+            from node import Node
+            from file_manager import FileManager
+            from upload_scheduler import UploadScheduler
+            
+            node = Node('127.0.0.1', 55099, 'slot_test', '127.0.0.1', self.bs_port)
+            default_store = node.file_manager.store.root_dir
+            node.file_manager = FileManager(self.make_temp_dir('store_'), 'slot_test')
+            node.upload_scheduler = UploadScheduler(max_slots=2, max_queue=0, queue_timeout=0.1)
+            node.files = ['slot_test.mp3']
+            client = node._create_rest_app().test_client()
+            
+            heads = []
+            for _ in range(3):
+                # A WSGI server closes every response once it has been sent
+                head = client.head('/download/slot_test.mp3')
+                head.close()
+                heads.append(head.status_code)
+            abandoned = client.get('/download/slot_test.mp3')
+            abandoned.close()
+            full = client.get('/download/slot_test.mp3')
+            received = len(full.data)
+            full.close()
+            stats = node.upload_scheduler.get_stats()
+            
+            if (heads == [200, 200, 200] and full.status_code == 200 and
+                    received == node.file_manager.get_file_size('slot_test.mp3') and
+                    stats['upload_slots_in_use'] == 0 and stats['uploads_rejected'] == 0):
+                self.log_test("REST Upload Slot Release", True,
+                             "3 HEADs and an abandoned GET on 2 slots, then a full download\n" +
+                             f"Slots in use afterwards: {stats['upload_slots_in_use']}")
+            else:
+                self.log_test("REST Upload Slot Release", False,
+                             f"HEAD: {heads}, GET: {full.status_code}, Stats: {stats}")
+        except Exception as e:
+            self.log_test("REST Upload Slot Release", False, str(e))
+        finally:
+            if node is not None:
+                node.statistics.stop()
+                for path in (node.statistics.log_file, node.tracer.trace_file):
+                    if os.path.exists(path):
+                        os.remove(path)
+                if default_store:
+                    shutil.rmtree(default_store, ignore_errors=True)
+    
+    def test_busy_source_failover(self):
+        """Test a download closes each source's streamed response, including before failing over."""
+        node = None
+        try:
+            import node as node_module
+            from node import Node
+            from statistics import Statistics
+            
+            open_responses = []
+            peak_open = [0]
+            
+            class FakeResponse:
+                def __init__(self, status_code, fail_stream=False):
+                    self.status_code = status_code
+                    self.fail_stream = fail_stream
+                    self.headers = {'Retry-After': '1', 'Content-Length': '4'}
+                    self.text = 'Not found'
+                    open_responses.append(self)
+                    peak_open[0] = max(peak_open[0], len(open_responses))
+                
+                def iter_content(self, chunk_size):
+                    if self.fail_stream:
+                        raise ConnectionError('connection reset mid-body')
+                    yield b'data'
+                
+                def close(self):
+                    if self in open_responses:
+                        open_responses.remove(self)
+            
+            # Ports 1-3 are busy, 4 has no such file, 5 drops the connection mid-body
+            statuses = {1: 503, 2: 503, 3: 503, 4: 404, 5: 200}
+            
+            def fake_get(url, stream=False, timeout=None, **kwargs):
+                port = int(url.split(':')[2].split('/')[0])
+                if '/merkle/' in url:
+                    response = FakeResponse(404)
+                    response.close()
+                    return response
+                return FakeResponse(statuses[port], fail_stream=port == 5)
+            
+            node = Node('127.0.0.1', 55096, 'failover_test', None, None,
+                        statistics=Statistics('failover_test', self.make_temp_dir('logs_')),
+                        storage=False, bootstrap=False)
+            real_get = node_module.requests.get
+            node_module.requests.get = fake_get
+            try:
+                busy = node.download_file('127.0.0.1', 1, 'x.mp3', [('127.0.0.1', 2), ('127.0.0.1', 3)])
+                missing = node.download_file('127.0.0.1', 2, 'x.mp3', [('127.0.0.1', 4)])
+                reset = node.download_file('127.0.0.1', 5, 'x.mp3')
+            finally:
+                node_module.requests.get = real_get
+            
+            statuses_ok = (busy['status'], busy['port'], missing['status'], reset['status']) == \
+                ('busy', 3, 'failed', 'error')
+            if statuses_ok and not open_responses and peak_open[0] == 1:
+                self.log_test("REST Busy Source Failover", True,
+                             "503 chain, 404 and a reset stream each close their response\n" +
+                             "At most one source connection open while failing over")
+            else:
+                self.log_test("REST Busy Source Failover", False,
+                             f"Results: {busy['status']}@{busy['port']}, {missing['status']}, {reset['status']}, "
+                             f"left open: {len(open_responses)}, peak open: {peak_open[0]}")
+        except Exception as e:
+            self.log_test("REST Busy Source Failover", False, str(e))
+        finally:
+            if node is not None:
+                node.statistics.stop()
+    
+    def test_download_manager(self):
+        """Test download jobs run concurrently and log DOWNLOAD_RESULT events."""
+        try:
+            from download_manager import DownloadManager
+            
+            logged = []
+            
+            def fake_download(self, ip, port, filename, alt_sources=None, progress=None):
+                progress(1024, 1024)
+                time.sleep(0.2)
+                return {'filename': filename, 'ip': ip, 'port': port, 'status': 'ok',
+                        'size': 1024, 'duration': 0.2, 'first_byte': 0.01, 'integrity': True}
+            
+            mock_node = type('MockNode', (), {
+                'download_file': fake_download,
+                'statistics': type('Stats', (), {
+                    'log_event': lambda self, **kwargs: logged.append(kwargs)
+                })()
+            })()
+            
+            manager = DownloadManager(mock_node, max_workers=4)
+            start = time.time()
+            jobs = [manager.submit('127.0.0.1', 5001, f'file_{i}.mp3') for i in range(4)]
+            manager.wait_all(timeout=5)
+            elapsed = time.time() - start
+            manager.shutdown()
+            
+            all_done = all(job.status == 'done' and job.progress == 1.0 for job in jobs)
+            events_ok = (len(logged) == 4 and
+                         all(e['event_type'] == 'DOWNLOAD_RESULT' and e['status'] == 'PASSED' for e in logged))
+            
+            # Corrupt content, a failed transfer and a crash each end the job distinctly
+            def failing_download(self, ip, port, filename, alt_sources=None, progress=None):
+                if filename == 'crash.mp3':
+                    raise RuntimeError('connection pool exploded')
+                return {'filename': filename, 'ip': ip, 'port': port,
+                        'status': 'ok' if filename == 'corrupt.mp3' else 'failed',
+                        'size': 1024, 'duration': 0.1, 'first_byte': 0.01,
+                        'integrity': False if filename == 'corrupt.mp3' else None}
+            
+            mock_node.download_file = failing_download.__get__(mock_node)
+            del logged[:]
+            manager = DownloadManager(mock_node, max_workers=2)
+            failed_jobs = [manager.submit('127.0.0.1', 5001, name)
+                           for name in ('corrupt.mp3', 'lost.mp3', 'crash.mp3')]
+            manager.wait_all(timeout=5)
+            manager.shutdown()
+            outcomes = [job.status for job in failed_jobs]
+            logged_statuses = sorted(e['status'] for e in logged)
+            failures_ok = (outcomes == ['integrity_failed', 'failed', 'failed'] and
+                           logged_statuses == ['ERROR', 'FAILED', 'INTEGRITY_FAILED'])
+            
+            if all_done and events_ok and failures_ok and elapsed < 0.6:
+                self.log_test("REST Download Manager", True, 
+                             f"4 jobs finished in {elapsed:.2f}s (run concurrently)\n" +
+                             "DOWNLOAD_RESULT logged for each job\n" +
+                             f"Failed jobs: {', '.join(logged_statuses)}")
+            else:
+                self.log_test("REST Download Manager", False, 
+                             f"Done: {all_done}, Events: {events_ok}, Elapsed: {elapsed:.2f}s\n" +
+                             f"Failed jobs: {outcomes}, logged {logged_statuses}")
+        except Exception as e:
+            self.log_test("REST Download Manager", False, str(e))
+    
+    def test_reshared_replica(self):
+        """Test an imported download is served with the source's hash and Merkle root."""
+        try:
+            from file_manager import FileManager
+            
+            source = FileManager(self.make_temp_dir('store_'), 'node_source')
+            replica = FileManager(self.make_temp_dir('store_'), 'node_replica')
+            
+            content = source.get_file_content('test_share.mp3')
+            replica.import_file('test_share.mp3', content)
+            
+            same_hash = replica.get_file_hash('test_share.mp3') == source.get_file_hash('test_share.mp3')
+            same_root = (replica.get_merkle_tree('test_share.mp3').root ==
+                         source.get_merkle_tree('test_share.mp3').root)
+            
+            if same_hash and same_root:
+                self.log_test("SHA-256 Re-shared Replica", True, 
+                             "Replica serves identical content (hash and Merkle root match)")
+            else:
+                self.log_test("SHA-256 Re-shared Replica", False, 
+                             f"Hash match: {same_hash}, Root match: {same_root}")
+        except Exception as e:
+            self.log_test("SHA-256 Re-shared Replica", False, str(e))
+    
     # ============================================================================
     # PHASE 4: PERFORMANCE ANALYSIS
     # ============================================================================
@@ -600,14 +1667,38 @@ server.start()
         self.log_requirement("4.1", "Track performance statistics")
         self.test_statistics_tracking()
         
+        # Requirement 4.1b: Lock-free counters on the message path
+        self.log_requirement("4.1b", "Per-thread counters stay exact under concurrency")
+        self.test_sharded_statistics_counters()
+        
         # Requirement 4.2: Metrics collection
         self.log_requirement("4.2", "Collect hops, latency, messages")
         self.test_metrics_collection()
         
+        # Requirement 4.2b: Streaming histograms
+        self.log_requirement("4.2b", "Latency and hop percentiles in fixed memory")
+        self.test_metrics_histograms()
+        
+        # Requirement 4.2c: Metrics endpoint
+        self.log_requirement("4.2c", "Counters exported in Prometheus text format")
+        self.test_metrics_exposition()
+        
+        # Requirement 4.2d: Byte-level traffic accounting
+        self.log_requirement("4.2d", "Datagrams and bytes counted per command and direction")
+        self.test_traffic_accounting()
+        
+        # Requirement 4.2e: Runtime profiling
+        self.log_requirement("4.2e", "Sampling profiler writes flamegraph-ready stacks")
+        self.test_sampling_profiler()
+        
         # Requirement 4.3: CSV logging
         self.log_requirement("4.3", "Log data to CSV files")
         self.test_csv_logging()
         
+        # Requirement 4.3b: Buffered CSV writer
+        self.log_requirement("4.3b", "Events are batched by a background writer")
+        self.test_buffered_event_logging()
+        
         # Requirement 4.4: Statistical analysis
         self.log_requirement("4.4", "Calculate min, max, avg, std dev")
         self.test_statistical_calculations()
@@ -616,6 +1707,18 @@ server.start()
         self.log_requirement("4.5", "Generate CDF plots")
         self.test_plot_generation()
         
+        # Requirement 4.5b: Vectorized log aggregation
+        self.log_requirement("4.5b", "Node logs aggregated in typed chunks, summaries excluded")
+        self.test_vectorized_log_aggregation()
+        
+        # Requirement 4.5c: Incremental analysis
+        self.log_requirement("4.5c", "Repeated analysis parses only appended rows")
+        self.test_incremental_analysis_cache()
+        
+        # Requirement 4.5d: Run-to-run comparison
+        self.log_requirement("4.5d", "Baseline vs candidate comparison flags significant regressions")
+        self.test_run_comparison()
+        
         # Requirement 4.6: Automated query runner
         self.log_requirement("4.6", "Automated query execution")
         self.test_automated_query_runner()
@@ -648,6 +1751,40 @@ server.start()
         except Exception as e:
             self.log_test("Statistics Tracking", False, str(e))
     
+    def test_sharded_statistics_counters(self):
+        """Test counters updated from many short-lived handler threads sum exactly."""
+        try:
+            import threading
+            from statistics import Statistics
+            
+            stats = Statistics('test_sharded', log_dir=self.make_temp_dir('logs_'))
+            
+            def handler():
+                for _ in range(100):
+                    stats.record_message_received('SER', 50)
+                    stats.record_message_sent('SEROK', 60)
+            
+            # One thread per batch, like the per-datagram handler threads in Node
+            for _ in range(4):
+                threads = [threading.Thread(target=handler) for _ in range(50)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+            result = stats.get_stats()
+            stats.stop()
+            
+            expected = 4 * 50 * 100
+            if (result['messages_received'] == expected and result['messages_sent'] == expected and
+                    result['received_SER_bytes'] == 50 * expected and
+                    result['sent_SEROK_datagrams'] == expected):
+                self.log_test("Statistics Sharded Counters", True, 
+                             f"{expected} updates per counter from 200 threads, totals exact")
+            else:
+                self.log_test("Statistics Sharded Counters", False, f"Counter mismatch: {result}")
+        except Exception as e:
+            self.log_test("Statistics Sharded Counters", False, str(e))
+    
     def test_metrics_collection(self):
         """Test that key metrics are tracked."""
         try:
@@ -678,6 +1815,184 @@ server.start()
         except Exception as e:
             self.log_test("Metrics Collection Methods", False, str(e))
     
+    def test_metrics_histograms(self):
+        """Test histogram percentiles stay within 1% and memory does not grow."""
+        try:
+            from statistics import Statistics
+            
+            stats = Statistics('test_histograms', log_dir=self.make_temp_dir('logs_'))
+            buckets_before = len(stats.latency_histogram.counts)
+            latencies = [random.uniform(1, 500) for _ in range(20000)]
+            for i, latency in enumerate(latencies):
+                stats.record_latency(latency)
+                stats.record_hop(i % 7)
+            result = stats.get_stats()
+            stats.stop()
+            
+            exact_p99 = sorted(latencies)[int(0.99 * len(latencies)) - 1]
+            p99_error = abs(result['latency_p99_ms'] - exact_p99) / exact_p99
+            fixed_memory = len(stats.latency_histogram.counts) == buckets_before
+            
+            if (p99_error <= 0.011 and fixed_memory and
+                    result['hops_p50'] == 3 and result['hops_max'] == 6 and
+                    result['latency_max_ms'] == round(max(latencies), 3)):
+                self.log_test("Metrics Histogram Percentiles", True, 
+                             f"p99 latency error: {p99_error * 100:.2f}%\n" +
+                             f"Buckets: {buckets_before} (fixed)")
+            else:
+                self.log_test("Metrics Histogram Percentiles", False, 
+                             f"p99 error: {p99_error:.4f}, Fixed memory: {fixed_memory}, Stats: {result}")
+        except Exception as e:
+            self.log_test("Metrics Histogram Percentiles", False, str(e))
+    
+    def test_metrics_exposition(self):
+        """Test /metrics rendering of counters, per-command messages and histograms."""
+        try:
+            from statistics import Statistics
+            from routing_table import RoutingTable
+            from upload_scheduler import UploadScheduler
+            from metrics import render_node_metrics
+            from protocol import MessageFormatter
+            
+            stats = Statistics('test_metrics_page', log_dir=self.make_temp_dir('logs_'))
+            stats.record_message_sent('SER')
+            stats.record_message_received('SEROK')
+            # Arbitrary command words from the wire must not become new label values
+            for junk in (b'0019 X1{a="b"} 42', b'0015 sent_SER', MessageFormatter.create_error_message()):
+                stats.record_message_received(MessageFormatter.get_command(junk))
+            stats.record_latency(25.0)
+            
+            mock_node = type('MockNode', (), {
+                'ip': '127.0.0.1',
+                'port': 5001,
+                'files': ['Glee'],
+                'statistics': stats,
+                'routing_table': RoutingTable(),
+                'upload_scheduler': UploadScheduler(),
+                'search_engine': type('SE', (), {'get_pending_count': lambda self: 2})(),
+                'download_manager': type('DM', (), {'active_count': lambda self: 1})()
+            })()
+            page = render_node_metrics(mock_node)
+            stats.stop()
+            
+            expected = [
+                '# TYPE overlay_messages_sent_total counter',
+                'overlay_messages_total{node="127.0.0.1:5001",direction="sent",command="SER"} 1',
+                'overlay_pending_queries{node="127.0.0.1:5001"} 2',
+                'overlay_search_latency_ms_count{node="127.0.0.1:5001"} 1',
+                'overlay_messages_total{node="127.0.0.1:5001",direction="received",command="UNKNOWN"} 2',
+                'overlay_messages_total{node="127.0.0.1:5001",direction="received",command="ERROR"} 1',
+            ]
+            missing = [line for line in expected if line not in page]
+            
+            if not missing and 'X1' not in page and 'command="sent_SER"' not in page:
+                self.log_test("Metrics Endpoint Exposition", True, 
+                             f"{len(page.splitlines())} lines in Prometheus text format")
+            else:
+                self.log_test("Metrics Endpoint Exposition", False, f"Missing lines: {missing}")
+        except Exception as e:
+            self.log_test("Metrics Endpoint Exposition", False, str(e))
+    
+    def test_traffic_accounting(self):
+        """Test per-command datagram/byte counters reach the summary CSV without double counting."""
+        try:
+            import csv
+            from statistics import Statistics
+            from protocol import MessageFormatter
+            from log_aggregator import read_summaries
+            
+            log_dir = self.make_temp_dir('logs_')
+            stats = Statistics('test_traffic', log_dir=log_dir)
+            ser = MessageFormatter.create_ser_message('127.0.0.1', 5001, 'Harry Potter', 1).encode('utf-8')
+            for _ in range(3):
+                # A query forwarded to three neighbors is three SER datagrams
+                stats.record_message_sent(MessageFormatter.get_command(ser), len(ser))
+            stats.record_query_forwarded()
+            stats.record_message_received('SEROK', 40)
+            stats.record_query_received()
+            # A command word with '_' must not produce keys the summary parser misreads
+            stats.record_message_received('X_bytes', 10)
+            stats.save_summary()
+            stats.stop()
+            
+            with open(os.path.join(log_dir, 'node_test_traffic_summary.csv'), 'r') as f:
+                summary = {row['metric']: row['value'] for row in csv.DictReader(f)}
+            traffic = read_summaries(log_dir)['command_traffic']
+            
+            if (summary.get('sent_SER_datagrams') == '3' and
+                    summary.get('sent_SER_bytes') == str(3 * len(ser)) and
+                    summary.get('received_SEROK_bytes') == '40' and
+                    summary.get('received_UNKNOWN_bytes') == '10' and
+                    summary.get('messages_sent') == '3' and summary.get('messages_received') == '2' and
+                    summary.get('bytes_sent') == str(3 * len(ser)) and
+                    set(traffic) == {('sent', 'SER'), ('received', 'SEROK'), ('received', 'UNKNOWN')}):
+                self.log_test("Statistics Traffic Accounting", True, 
+                             f"SER: 3 datagrams, {3 * len(ser)} bytes; SEROK: 1 datagram, 40 bytes")
+            else:
+                self.log_test("Statistics Traffic Accounting", False, f"Summary: {summary}")
+        except Exception as e:
+            self.log_test("Statistics Traffic Accounting", False, str(e))
+    
+    def test_sampling_profiler(self):
+        """Test the profiler samples other threads for a window and dumps folded stacks."""
+        try:
+            import threading
+            from node import Node
+            from profiler import SamplingProfiler
+            from statistics import Statistics
+            
+            profiler = SamplingProfiler('test_profile', self.make_temp_dir('logs_'))
+            idle_threads = threading.active_count()
+            
+            def busy_handler():
+                end = time.time() + 0.3
+                while time.time() < end:
+                    sum(range(1000))
+            
+            profiler.start(duration=0.2, interval=0.005)
+            worker = threading.Thread(target=busy_handler)
+            worker.start()
+            worker.join()
+            stopped_by_window = not profiler.running
+            result = profiler.dump()
+            
+            with open(result['file'], 'r') as f:
+                lines = f.read().splitlines()
+            folded_ok = all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+            handler_seen = any(line.startswith('busy_handler;') for line in lines)
+            
+            # A negative or NaN wait would make the sampler spin
+            bad_args = [(None, -0.005), (None, float('nan')), (0, None), (float('inf'), None)]
+            rejected = []
+            for duration, interval in bad_args:
+                try:
+                    profiler.start(duration, interval)
+                    profiler.stop()
+                    rejected.append(False)
+                except ValueError:
+                    rejected.append(not profiler.running)
+            
+            node = Node('127.0.0.1', 55098, 'profile_test', None, None,
+                        statistics=Statistics('profile_test', self.make_temp_dir('logs_')),
+                        storage=False, bootstrap=False)
+            client = node._create_rest_app().test_client()
+            codes = [client.post(f'/profile/start?{query}').status_code
+                     for query in ('interval_ms=-5', 'interval_ms=nan', 'duration=0', 'duration=inf')]
+            node.statistics.stop()
+            
+            if (stopped_by_window and folded_ok and handler_seen and
+                    threading.active_count() == idle_threads and all(rejected) and
+                    codes == [400] * 4 and not node.profiler.running):
+                self.log_test("Metrics Sampling Profiler", True, 
+                             f"{result['samples']} samples, {len(lines)} folded stacks\n" +
+                             "Non-positive and non-finite windows rejected (REST: 400)")
+            else:
+                self.log_test("Metrics Sampling Profiler", False, 
+                             f"Window stop: {stopped_by_window}, folded: {folded_ok}, "
+                             f"handler seen: {handler_seen}, rejected: {rejected}, REST: {codes}")
+        except Exception as e:
+            self.log_test("Metrics Sampling Profiler", False, str(e))
+    
     def test_csv_logging(self):
         """Test CSV log file creation."""
         try:
@@ -705,6 +2020,47 @@ server.start()
             self.log_test("CSV Logging", False, str(e))
             self.log_test("CSV Logging", False, str(e))
     
+    def test_buffered_event_logging(self):
+        """Test queued events keep the CSV columns and none are lost around stop()."""
+        try:
+            import csv
+            import threading
+            from statistics import Statistics
+            
+            stats = Statistics('test_buffered', log_dir=self.make_temp_dir('logs_'))
+            
+            def log_batch():
+                for i in range(250):
+                    stats.log_event('SEARCH_RESULT', query='twilight', hops=i % 5,
+                                    latency_ms=1.5, sender_ip='127.0.0.1', sender_port=5001)
+            
+            # Handlers keep logging while the node shuts down
+            loggers = [threading.Thread(target=log_batch) for _ in range(4)]
+            for thread in loggers:
+                thread.start()
+            stats.stop()
+            for thread in loggers:
+                thread.join()
+            stats.log_event('QUERY_ISSUED', query='glee')
+            
+            with open(stats.log_file, 'r') as f:
+                rows = list(csv.DictReader(f))
+            columns_ok = rows and list(rows[0].keys())[:7] == [
+                'timestamp', 'event_type', 'query', 'hops',
+                'latency_ms', 'sender_ip', 'sender_port'
+            ]
+            dropped = stats.get_stats()['events_dropped']
+            
+            if len(rows) == 1001 and columns_ok and dropped == 0:
+                self.log_test("CSV Logging (Buffered Writer)", True, 
+                             "1000 events logged across stop() and 1 after it all written\n" +
+                             "Original columns kept")
+            else:
+                self.log_test("CSV Logging (Buffered Writer)", False, 
+                             f"Rows written: {len(rows)}, Columns ok: {columns_ok}, Dropped: {dropped}")
+        except Exception as e:
+            self.log_test("CSV Logging (Buffered Writer)", False, str(e))
+    
     def test_statistical_calculations(self):
         """Test statistical analysis functions."""
         try:
@@ -754,6 +2110,163 @@ server.start()
         except Exception as e:
             self.log_test("CDF Plot Generation", False, str(e))
     
+    def test_vectorized_log_aggregation(self):
+        """Test log_aggregator matches the event rows, skips summaries and tolerates old or bad rows."""
+        try:
+            import csv
+            import tempfile
+            import shutil
+            from log_aggregator import aggregate_logs, aggregate_node_log, find_node_logs
+            
+            log_dir = tempfile.mkdtemp(prefix='logs_')
+            try:
+                header = ['timestamp', 'event_type', 'query', 'hops', 'latency_ms',
+                          'sender_ip', 'sender_port', 'size_bytes', 'status']
+                with open(os.path.join(log_dir, 'node_a.csv'), 'w', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(header)
+                    writer.writerow(['t', 'FILE_HOSTED', 'Glee', 0, 0, '', '', '', ''])
+                    writer.writerow(['t', 'SEARCH_RESULT', 'glee', 2, 10.0, '127.0.0.1', 5002, '', ''])
+                    writer.writerow(['t', 'SEARCH_RESULT', 'glee', 4, 30.0, '127.0.0.1', 5003, '', ''])
+                    writer.writerow(['t', 'DOWNLOAD_RESULT', 'Glee', 0, 2000.0, '127.0.0.1', 5002, 4194304, 'PASSED'])
+                    writer.writerow(['t', 'FETCH_RESULT', 'glee', 0, 2500.0, '', '', 4194304, 'PASSED'])
+                    writer.writerow(['t', 'FETCH_RESULT', 'glee', 0, 900.0, '', '', '', 'FAILED'])
+                # Log from before size_bytes/status existed, with one corrupt latency
+                with open(os.path.join(log_dir, 'node_b.csv'), 'w', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(header[:7])
+                    writer.writerow(['t', 'SEARCH_RESULT', 'glee', 1, 20.0, '127.0.0.1', 5001])
+                    writer.writerow(['t', 'SEARCH_RESULT', 'glee', 1, 'oops', '127.0.0.1', 5001])
+                with open(os.path.join(log_dir, 'node_a_summary.csv'), 'w', newline='') as f:
+                    csv.writer(f).writerows([['metric', 'value'], ['messages_sent', 7], ['messages_received', 5]])
+                
+                # A corrupt value in a later block must not re-read earlier blocks
+                late_corrupt = os.path.join(log_dir, 'late_corrupt.csv')
+                with open(late_corrupt, 'w', newline='') as f:
+                    writer = csv.writer(f)
+                    writer.writerow(header)
+                    for i in range(11):
+                        writer.writerow(['t', 'SEARCH_RESULT', 'glee', 1, 'oops' if i == 9 else 5.0,
+                                         '127.0.0.1', 5001, '', ''])
+                late_samples = len(aggregate_node_log(late_corrupt, block_bytes=128)['latencies'])
+                
+                data = aggregate_logs(log_dir, workers=2)
+                event_logs = find_node_logs(log_dir)
+            finally:
+                shutil.rmtree(log_dir, ignore_errors=True)
+            
+            if (len(event_logs) == 2 and
+                    sorted(data['latencies'].tolist()) == [10.0, 20.0, 30.0] and
+                    sorted(data['hops'].tolist()) == [1, 2, 4] and
+                    data['download_throughputs'].tolist() == [2.0] and
+                    data['fetch_times'].tolist() == [2500.0] and
+                    list(data['initial_holders']) == ['Glee'] and
+                    data['messages_per_node'] == [12] and late_samples == 10):
+                self.log_test("CDF Log Aggregation (Vectorized)", True, 
+                             f"{len(data['latencies'])} search results from {len(event_logs)} logs, "
+                             "summary file excluded\n" +
+                             f"Corrupt row in a later block: {late_samples} of 11 samples kept")
+            else:
+                self.log_test("CDF Log Aggregation (Vectorized)", False, 
+                             f"Logs: {event_logs}, latencies: {data['latencies']}, hops: {data['hops']}, "
+                             f"late corrupt samples: {late_samples}")
+        except Exception as e:
+            self.log_test("CDF Log Aggregation (Vectorized)", False, str(e))
+    
+    def test_incremental_analysis_cache(self):
+        """Test the analysis cache resumes at byte offsets, waits for partial rows and notices rewrites."""
+        try:
+            import tempfile
+            import shutil
+            from log_aggregator import aggregate_logs_incremental
+            
+            log_dir = tempfile.mkdtemp(prefix='logs_')
+            log_file = os.path.join(log_dir, 'node_a.csv')
+            header = 'timestamp,event_type,query,hops,latency_ms,sender_ip,sender_port,size_bytes,status\n'
+            row = 't,SEARCH_RESULT,glee,2,10.0,127.0.0.1,5002,,\n'
+            try:
+                with open(log_file, 'w') as f:
+                    f.write(header + row * 100)
+                first = aggregate_logs_incremental(log_dir, workers=1)
+                
+                # One complete row and one still being written
+                with open(log_file, 'a') as f:
+                    f.write(row + 't,SEARCH_RES')
+                second = aggregate_logs_incremental(log_dir, workers=1)
+                
+                with open(log_file, 'a') as f:
+                    f.write('ULT,glee,4,30.0,127.0.0.1,5003,,\n')
+                third = aggregate_logs_incremental(log_dir, workers=1)
+                unchanged = aggregate_logs_incremental(log_dir, workers=1)
+                
+                # A restarted node rewrites its log from scratch
+                with open(log_file, 'w') as f:
+                    f.write(header + row * 3)
+                restarted = aggregate_logs_incremental(log_dir, workers=1)
+            finally:
+                shutil.rmtree(log_dir, ignore_errors=True)
+            
+            counts = [len(r['latencies']) for r in (first, second, third, unchanged, restarted)]
+            if (counts == [100, 101, 102, 102, 3] and
+                    second['parsed_bytes'] == len(row) and unchanged['parsed_bytes'] == 0 and
+                    third['hops'].max == 4 and third['latencies'].mean == (101 * 10.0 + 30.0) / 102):
+                self.log_test("CDF Incremental Analysis Cache", True, 
+                             f"Samples per run: {counts}, second run parsed {second['parsed_bytes']} bytes")
+            else:
+                self.log_test("CDF Incremental Analysis Cache", False, 
+                             f"Samples per run: {counts}, parsed: {second['parsed_bytes']}, "
+                             f"{unchanged['parsed_bytes']}")
+        except Exception as e:
+            self.log_test("CDF Incremental Analysis Cache", False, str(e))
+    
+    def test_run_comparison(self):
+        """Test compare_runs flags a slower, less successful candidate and counts query success."""
+        try:
+            import tempfile
+            import shutil
+            import random
+            from compare_runs import compare
+            
+            header = 'timestamp,event_type,query,hops,latency_ms,sender_ip,sender_port,size_bytes,status\n'
+            rng = random.Random(7)
+            
+            def write_run(latency, answered):
+                log_dir = tempfile.mkdtemp(prefix='logs_')
+                with open(os.path.join(log_dir, 'node_a.csv'), 'w') as f:
+                    f.write(header)
+                    for i in range(200):
+                        f.write('t,QUERY_ISSUED,glee,,,,,,\n')
+                        if i % 10 < answered:
+                            f.write(f't,SEARCH_RESULT,glee,{rng.randint(1, 3)},'
+                                    f'{rng.gauss(latency, 5):.3f},127.0.0.1,5002,,\n')
+                return log_dir
+            
+            baseline_dir = write_run(50.0, 10)
+            same_dir = tempfile.mkdtemp(prefix='logs_')
+            shutil.copy(os.path.join(baseline_dir, 'node_a.csv'), same_dir)
+            candidate_dir = write_run(80.0, 6)
+            try:
+                regressed, base, cand = compare(baseline_dir, candidate_dir, resamples=200)
+                unchanged, _, _ = compare(baseline_dir, same_dir, resamples=200)
+            finally:
+                for log_dir in (baseline_dir, same_dir, candidate_dir):
+                    shutil.rmtree(log_dir, ignore_errors=True)
+            
+            verdicts = {row['metric']: row['verdict'] for row in regressed}
+            if (base['queries_issued'] == 200 and base['queries_succeeded'] == 200 and
+                    cand['queries_succeeded'] == 120 and
+                    verdicts['Latency p50 (ms)'] == 'REGRESSION' and
+                    verdicts['Query success rate (%)'] == 'REGRESSION' and
+                    verdicts['Hops mean'] == '-' and
+                    not any(row['verdict'] == 'REGRESSION' for row in unchanged)):
+                self.log_test("Statistical Run Comparison", True, 
+                             "Latency and success-rate regressions flagged, identical run clean")
+            else:
+                self.log_test("Statistical Run Comparison", False, 
+                             f"Verdicts: {verdicts}, unchanged: {[r['verdict'] for r in unchanged]}")
+        except Exception as e:
+            self.log_test("Statistical Run Comparison", False, str(e))
+    
     def test_automated_query_runner(self):
         """Test automated query execution."""
         try:
@@ -982,6 +2495,10 @@ server.start()
         except:
             pass
         
+        # Remove temporary storage and log directories
+        for path in self.temp_dirs:
+            shutil.rmtree(path, ignore_errors=True)
+        
         print("✅ All processes terminated")
     
     def generate_report(self):